@@ -0,0 +1,121 @@
+"""生成文件的内容哈希与按需写入
+
+每个生成的文件（RSS、邮件 HTML 等）先计算内容哈希，哈希计算时去掉
+lastBuildDate 这类每次都会变的字段。哈希与上次相同就不重写文件，
+feed 阅读器和 Pages 部署都不会看到变化。
+
+每个输出目录下维护一个 manifest.json（子目录中的文件以相对路径记录）：
+    {"files": {"v2ex-digest.xml": {"sha256": "...", "size": 字节数}, "archive/days/...": ...}}
+manifest 与生成文件一起部署，下次运行（工作流先检出已发布的文件）据此判断是否有变化。
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Pattern
+
+MANIFEST_NAME = "manifest.json"
+
+# 按扩展名列出计算哈希时忽略的易变字段
+VOLATILE_FIELDS: Dict[str, List[Pattern]] = {
+    ".xml": [re.compile(rb"<lastBuildDate>[^<]*</lastBuildDate>")],
+}
+
+# 本次运行写入过的文件：{manifest 所在目录: {相对路径: (哈希, 大小, 是否变化)}}
+_written: Dict[str, Dict[str, tuple]] = {}
+
+# 本次运行已读取的 manifest（写入大量索引分片时避免重复读取）
+_manifests: Dict[str, Dict[str, Dict]] = {}
+
+# 打印变化文件时最多列出的文件名数
+CHANGED_PRINT_LIMIT = 10
+
+
+def reset():
+    """开始新的一次运行：丢弃上次运行（包括中途失败的运行）留下的写入记录和 manifest 缓存"""
+    _written.clear()
+    _manifests.clear()
+
+
+def content_hash(data: bytes, name: str = "") -> str:
+    """去掉易变字段后的 sha256"""
+    for pattern in VOLATILE_FIELDS.get(os.path.splitext(name)[1], []):
+        data = pattern.sub(b"", data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_manifest(directory: str) -> Dict[str, Dict]:
+    """读取目录下的 manifest，不存在或损坏时返回空表"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except Exception as e:
+        print(f"Warning: Failed to load manifest: {e}")
+        return {}
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_if_changed(path: str, content: str, root: Optional[str] = None) -> bool:
+    """内容（忽略易变字段）有变化时原子写入，返回是否有变化
+
+    上次的哈希优先取 manifest，没有 manifest 时与磁盘上的现有文件比较。
+    工作流只下载已发布的 manifest：manifest 中哈希相同但本地不存在的文件照常写入，
+    保证输出目录完整，但不算作变化，不会单独触发部署。
+
+    root 为 manifest 所在目录，默认是文件所在目录；文件在 root 的子目录中时以相对路径记录
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    root = os.path.abspath(root if root is not None else directory)
+    name = os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+    data = content.encode("utf-8")
+    digest = content_hash(data, name)
+
+    if root not in _manifests:
+        _manifests[root] = load_manifest(root)
+    previous = _manifests[root].get(name, {}).get("sha256")
+    exists = os.path.exists(path)
+    if previous is None and exists:
+        with open(path, "rb") as f:
+            previous = content_hash(f.read(), name)
+
+    changed = digest != previous
+    if changed or not exists:
+        _atomic_write(path, data)
+    _written.setdefault(root, {})[name] = (digest, len(data), changed)
+    return changed
+
+
+def save_manifest(directory: str) -> bool:
+    """把本次写入的文件哈希合并进 manifest，返回是否有文件变化
+
+    没有变化时 manifest 也保持不变
+    """
+    root = os.path.abspath(directory)
+    written = _written.pop(root, {})
+    _manifests.pop(root, None)
+    changed = sorted(name for name, (_, _, is_changed) in written.items() if is_changed)
+    if not changed:
+        return False
+
+    files = load_manifest(directory)
+    for name, (digest, size, _) in written.items():
+        files[name] = {"sha256": digest, "size": size}
+    content = json.dumps({"files": files}, ensure_ascii=False, indent=2, sort_keys=True)
+    _atomic_write(os.path.join(directory, MANIFEST_NAME), content.encode("utf-8"))
+
+    shown = ", ".join(changed[:CHANGED_PRINT_LIMIT])
+    if len(changed) > CHANGED_PRINT_LIMIT:
+        shown += f" (+{len(changed) - CHANGED_PRINT_LIMIT} more)"
+    print(f"  Changed: {shown}")
+    return True
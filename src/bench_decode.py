@@ -0,0 +1,78 @@
+"""解码微基准：比较各 JSON 后端解析节点列表并 parse_topic 的耗时，并校验结果一致
+
+用法：python src/bench_decode.py [帖子数] [重复次数]
+"""
+import importlib
+import json
+import os
+import sys
+import time
+
+import fast_json
+import scraper
+
+
+def make_payload(count: int) -> bytes:
+    """构造接近真实 V2EX 节点列表的响应（含较大的 content_rendered）"""
+    topics = []
+    for i in range(count):
+        body = f"这是第 {i} 个帖子的正文，讨论一些技术问题。" * 20
+        topics.append({
+            "id": 1000000 + i,
+            "title": f"帖子标题 {i}",
+            "url": f"https://www.v2ex.com/t/{1000000 + i}",
+            "content": body,
+            "content_rendered": "<p>" + body.replace("。", "。</p><p>") + "</p>",
+            "replies": i % 50,
+            "created": 1760000000 + i * 60,
+            "last_modified": 1760000000 + i * 60,
+            "last_touched": 1760000000 + i * 90,
+            "last_reply_by": "someone",
+            "member": {
+                "id": i, "username": f"user{i}", "url": "https://www.v2ex.com/u/x",
+                "avatar_mini": "//cdn.v2ex.com/avatar/mini.png",
+                "avatar_normal": "//cdn.v2ex.com/avatar/normal.png",
+                "avatar_large": "//cdn.v2ex.com/avatar/large.png",
+                "created": 1500000000, "tagline": "", "bio": "", "website": "",
+            },
+            "node": {
+                "id": 1, "name": "programmer", "title": "程序员", "url": "https://www.v2ex.com/go/programmer",
+                "topics": 100000, "avatar_large": "", "header": "", "footer": "",
+            },
+        })
+    return json.dumps(topics, ensure_ascii=False).encode("utf-8")
+
+
+def run_backend(backend: str, payload: bytes, repeat: int):
+    """用指定后端解码 + parse_topic，返回 (每次耗时毫秒, 结果序列化字节)"""
+    os.environ["V2EX_JSON_BACKEND"] = backend
+    module = importlib.reload(fast_json)
+    if module.BACKEND != backend:
+        return None, None
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        records = [scraper.parse_topic(t, "programmer") for t in module.decode_topics(payload)]
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return elapsed, json.dumps(records, ensure_ascii=False).encode("utf-8")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    payload = make_payload(count)
+    print(f"Payload: {count} topics, {len(payload) / 1024:.0f} KB, {repeat} runs")
+
+    baseline_ms, baseline = run_backend("stdlib", payload, repeat)
+    print(f"  {'stdlib':<8} {baseline_ms:8.2f} ms")
+    for backend in ("orjson", "msgspec"):
+        elapsed, result = run_backend(backend, payload, repeat)
+        if elapsed is None:
+            print(f"  {backend:<8} not installed")
+            continue
+        status = "identical" if result == baseline else "MISMATCH"
+        print(f"  {backend:<8} {elapsed:8.2f} ms  x{baseline_ms / elapsed:.1f}  {status}")
+
+
+if __name__ == "__main__":
+    main()
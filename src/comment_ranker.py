@@ -0,0 +1,102 @@
+"""评论抽取式预筛选 - 在调用模型前挑出值得看的评论
+
+- 去掉近乎空白的评论（"+1"、"mark"、纯表情、只有 @ 的回复等）和重复评论
+- 其余评论按 长度 + 词汇新颖度（与正文和前面评论相比的新字符二元组比例）
+  + @ 结构（参与讨论、被他人回复）打分，只把得分最高的几条发给模型
+- pick_featured 不调用模型，直接挑出精彩评论，用于 API 不可用时降级
+"""
+import math
+import re
+from typing import Dict, List, Set
+
+# 有效字符（去掉 @、链接、标点和表情后）少于该值的评论视为噪音
+MIN_CHARS = 4
+
+# 常见的无信息回复（归一化后完全匹配；更短的已被 MIN_CHARS 过滤）
+NOISE = {
+    "mark", "ding", "thanks", "感谢分享", "谢谢分享", "马克一下", "先马一下",
+    "同问楼主", "坐等更新", "前排围观", "学习一下",
+}
+
+# 与已保留评论的二元组 Jaccard 相似度超过该值视为重复
+DUPLICATE_THRESHOLD = 0.8
+
+# 长度得分封顶的字符数
+LENGTH_CAP = 120
+
+_MENTION_RE = re.compile(r"@([\w-]+)")
+_URL_RE = re.compile(r"https?://\S+")
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    """去掉 @、链接、标点、空白和表情，转小写"""
+    text = _MENTION_RE.sub("", text)
+    text = _URL_RE.sub("", text)
+    return _NON_WORD_RE.sub("", text).lower()
+
+
+def _bigrams(text: str) -> Set[str]:
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def is_noise(text: str) -> bool:
+    """近乎空白的评论"""
+    normalized = normalize(text)
+    if normalized in NOISE:
+        return True
+    return len(normalized) < MIN_CHARS
+
+
+def rank_replies(replies: List[Dict], context: str = "", limit: int = 8) -> List[Dict]:
+    """过滤噪音和重复评论，按得分从高到低返回前 limit 条
+
+    Args:
+        replies: [{"content": "...", "author": "..."}, ...]（按楼层顺序）
+        context: 帖子标题和正文，只复述正文的评论新颖度较低
+        limit: 最多返回的条数
+
+    返回: 原评论字典的浅拷贝，附带 "score" 字段
+    """
+    # 被其他评论 @ 的次数
+    mentioned: Dict[str, int] = {}
+    for reply in replies:
+        for name in set(_MENTION_RE.findall(reply["content"])):
+            mentioned[name] = mentioned.get(name, 0) + 1
+
+    seen = _bigrams(normalize(context))
+    kept: List[Dict] = []
+    kept_grams: List[Set[str]] = []
+    for reply in replies:
+        content = reply["content"]
+        if is_noise(content):
+            continue
+        normalized = normalize(content)
+        grams = _bigrams(normalized)
+        if any(len(grams & other) / len(grams | other) >= DUPLICATE_THRESHOLD for other in kept_grams):
+            continue
+
+        length_score = math.log1p(min(len(normalized), LENGTH_CAP)) / math.log1p(LENGTH_CAP)
+        novelty = len(grams - seen) / len(grams)
+        # 回复他人且有实质内容：参与讨论；被他人回复：引发讨论
+        mention_score = 0.3 if _MENTION_RE.search(content) else 0.0
+        mention_score += min(mentioned.get(reply.get("author", ""), 0) * 0.3, 0.9)
+
+        kept.append({**reply, "score": round(length_score + novelty + mention_score, 3)})
+        kept_grams.append(grams)
+        seen |= grams
+
+    kept.sort(key=lambda r: r["score"], reverse=True)
+    return kept[:limit]
+
+
+def pick_featured(replies: List[Dict], limit: int = 3, context: str = "") -> List[Dict]:
+    """不调用模型直接挑选精彩评论，格式与模型输出一致
+
+    replies 已经排好序（带 score）时直接取前几条
+    """
+    if replies and "score" not in replies[0]:
+        replies = rank_replies(replies, context, limit)
+    return [{"author": r.get("author", ""), "content": r["content"]} for r in replies[:limit]]
@@ -0,0 +1,215 @@
+"""节点配置模型 - 启动时校验并编译一次
+
+配置来源（优先级从高到低）：V2EX_NODES 环境变量、config.json、内置默认节点。
+V2EX_NODES 可以是节点列表，也可以是与 config.json 相同结构的对象。
+
+config.json 示例：
+    {
+        "defaults": {"limit": 10, "window_hours": 48, "sort": "replies", "summary": "compact"},
+        "hot": {"limit": 20},
+        "nodes": [
+            {"name": "programmer", "title": "程序员", "emoji": "👨‍💻", "limit": 5, "priority": 10},
+            {"name": "all4all", "title": "二手交易", "emoji": "🛒", "summary": "none"}
+        ]
+    }
+
+每个节点的策略：
+- limit：去重后保留的帖子数
+- window_hours：只保留最近多少小时内发布的帖子
+- sort：replies（回复数）/ created（发布时间）
+- summary：hot（详细摘要 + 精彩评论）/ compact（简短摘要）/ none（不调用模型）
+- priority：越大越先抓取；同一帖子出现在多个节点时归入优先级高的节点，邮件中也排在前面
+- theme：主题（如 "技术"、"生活"），DIGEST_EMAIL_SPLIT=1 拆分邮件时同一主题的节点放在同一封邮件
+"""
+import json
+import os
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config.json")
+
+SORT_KEYS = ("replies", "created")
+SUMMARY_TIERS = ("hot", "compact", "none")
+
+HOT_NODE = "_hot"
+
+# 默认节点配置
+DEFAULT_NODES = [
+    {"name": "create", "title": "分享创造", "emoji": "🎨"},
+    {"name": "ideas", "title": "奇思妙想", "emoji": "💡"},
+    {"name": "programmer", "title": "程序员", "emoji": "👨‍💻"},
+    {"name": "all4all", "title": "二手交易", "emoji": "🛒"},
+]
+
+
+class ConfigError(ValueError):
+    """配置不合法"""
+
+
+@dataclass(frozen=True)
+class NodePolicy:
+    """单个节点的抓取和摘要策略"""
+    name: str
+    title: str = ""
+    emoji: str = "📌"
+    limit: int = 10
+    window_hours: float = 48.0
+    sort: str = "replies"
+    summary: str = "compact"
+    priority: int = 0
+    theme: str = ""
+
+    @property
+    def fetch_limit(self) -> int:
+        """抓取的候选帖子数（留出与其他节点去重的余量）"""
+        return self.limit * 2
+
+    def as_dict(self) -> Dict[str, Any]:
+        """写入 all_data 的节点配置（渲染和快照使用普通字典）"""
+        return asdict(self)
+
+
+# 全站热门的默认策略
+HOT_POLICY = NodePolicy(name=HOT_NODE, title="全站热门", emoji="🔥", limit=20, summary="hot")
+
+
+@dataclass(frozen=True)
+class DigestConfig:
+    """编译后的配置：节点已按优先级排好序"""
+    hot: NodePolicy = HOT_POLICY
+    nodes: Tuple[NodePolicy, ...] = field(default_factory=tuple)
+
+    def policy(self, name: str) -> Optional[NodePolicy]:
+        if name == HOT_NODE:
+            return self.hot
+        for policy in self.nodes:
+            if policy.name == name:
+                return policy
+        return None
+
+    def all_policies(self) -> List[NodePolicy]:
+        """全站热门 + 各节点（抓取和去重顺序）"""
+        return [self.hot, *self.nodes]
+
+
+_FIELD_NAMES = {f.name for f in fields(NodePolicy)}
+
+
+def _check_policy(values: Dict[str, Any], where: str) -> Dict[str, Any]:
+    """校验策略字段，返回规范化后的字段"""
+    unknown = set(values) - _FIELD_NAMES
+    if unknown:
+        raise ConfigError(f"{where}: unknown field(s) {', '.join(sorted(unknown))}")
+
+    checked = dict(values)
+    for key in ("limit", "priority"):
+        if key in checked:
+            value = checked[key]
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ConfigError(f"{where}.{key}: expected an integer, got {value!r}")
+    if "limit" in checked and checked["limit"] < 0:
+        raise ConfigError(f"{where}.limit: must be >= 0")
+    if "window_hours" in checked:
+        value = checked["window_hours"]
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+            raise ConfigError(f"{where}.window_hours: expected a positive number, got {value!r}")
+        checked["window_hours"] = float(value)
+    if "sort" in checked and checked["sort"] not in SORT_KEYS:
+        raise ConfigError(f"{where}.sort: expected one of {', '.join(SORT_KEYS)}")
+    if "summary" in checked and checked["summary"] not in SUMMARY_TIERS:
+        raise ConfigError(f"{where}.summary: expected one of {', '.join(SUMMARY_TIERS)}")
+    for key in ("name", "title", "emoji", "theme"):
+        if key in checked and not isinstance(checked[key], str):
+            raise ConfigError(f"{where}.{key}: expected a string")
+    return checked
+
+
+def compile_config(raw: Any) -> DigestConfig:
+    """校验原始配置（节点列表或 {"defaults", "hot", "nodes"} 对象）并编译"""
+    if isinstance(raw, list):
+        raw = {"nodes": raw}
+    if not isinstance(raw, dict):
+        raise ConfigError("config: expected an object or a list of nodes")
+
+    defaults = raw.get("defaults", {})
+    if not isinstance(defaults, dict):
+        raise ConfigError("defaults: expected an object")
+    defaults = _check_policy(defaults, "defaults")
+    if "name" in defaults:
+        raise ConfigError("defaults.name: not allowed")
+
+    hot = raw.get("hot", {})
+    if not isinstance(hot, dict):
+        raise ConfigError("hot: expected an object")
+    hot = _check_policy(hot, "hot")
+    if "name" in hot:
+        raise ConfigError("hot.name: not allowed")
+    hot_policy = replace(HOT_POLICY, **hot)
+
+    nodes_raw = raw.get("nodes", DEFAULT_NODES)
+    if not isinstance(nodes_raw, list):
+        raise ConfigError("nodes: expected a list")
+
+    nodes = []
+    names = set()
+    for index, node in enumerate(nodes_raw):
+        where = f"nodes[{index}]"
+        if not isinstance(node, dict):
+            raise ConfigError(f"{where}: expected an object")
+        values = _check_policy(node, where)
+        name = values.get("name")
+        if not name:
+            raise ConfigError(f"{where}.name: required")
+        if name in names or name == HOT_NODE:
+            raise ConfigError(f"{where}.name: duplicate node {name!r}")
+        names.add(name)
+        merged = {**defaults, **values}
+        merged.setdefault("title", name)
+        nodes.append(NodePolicy(**merged))
+
+    # 稳定排序：同优先级保持配置中的顺序
+    nodes.sort(key=lambda p: -p.priority)
+    return DigestConfig(hot=hot_policy, nodes=tuple(nodes))
+
+
+def _read_raw() -> Any:
+    nodes_env = os.environ.get("V2EX_NODES")
+    if nodes_env:
+        try:
+            return json.loads(nodes_env)
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"V2EX_NODES: invalid JSON ({e})") from e
+
+    if os.path.exists(CONFIG_PATH):
+        try:
+            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"config.json: invalid JSON ({e})") from e
+        # daemon 字段由 daemon.py 读取
+        return {k: v for k, v in config.items() if k != "daemon"}
+
+    return {"nodes": DEFAULT_NODES}
+
+
+# 编译结果缓存：(V2EX_NODES, config.json 修改时间) -> DigestConfig
+_compiled: Optional[Tuple[tuple, DigestConfig]] = None
+
+
+def get_config() -> DigestConfig:
+    """获取编译好的配置
+
+    配置来源不变时直接返回缓存；常驻进程中 config.json 修改后下次调用会重新编译。
+
+    Raises:
+        ConfigError: 配置不合法
+    """
+    global _compiled
+    try:
+        mtime = os.path.getmtime(CONFIG_PATH)
+    except OSError:
+        mtime = 0.0
+    key = (os.environ.get("V2EX_NODES"), mtime)
+    if _compiled is None or _compiled[0] != key:
+        _compiled = (key, compile_config(_read_raw()))
+    return _compiled[1]
@@ -0,0 +1,274 @@
+"""常驻调度进程 - 按 cron 表达式定时执行每日汇总
+
+与 GitHub Actions 每次冷启动不同，常驻进程在多次运行之间保留：
+- 已导入的 openai / resend SDK
+- HTTP 会话与 Azure OpenAI 客户端（保持连接）
+- 摘要内存缓存（回复数未变化的帖子不再重复调用模型）
+
+本地 HTTP 接口：
+    GET  /status  查看调度状态和最近一次运行结果
+    POST /run     立即触发一次运行
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set
+
+from main import run_digest, stage_publish
+
+# 默认调度：每天 UTC 0:00（北京时间 8:00），与工作流保持一致
+DEFAULT_SCHEDULE = "0 0 * * *"
+
+# 本地接口默认地址
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+
+# 调度循环检查间隔（秒）
+TICK_SECONDS = 5
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config.json")
+
+# cron 各字段取值范围：分 时 日 月 周（周日可写作 0 或 7）
+_CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """解析单个 cron 字段，支持 *、数字、列表、范围和步长"""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = end = int(part)
+        if start < low or end > high or step < 1:
+            raise ValueError(f"cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """简化版 cron 调度（UTC，5 个字段：分 时 日 月 周）
+
+    与标准 cron 一致：日和周都有限定（都不以 * 开头）时，满足其中一个即可
+    """
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression: {expr}")
+        self.expr = expr
+        self.fields: List[Set[int]] = [
+            _parse_cron_field(part, low, high)
+            for part, (low, high) in zip(parts, _CRON_FIELDS)
+        ]
+        if 7 in self.fields[4]:
+            self.fields[4] = (self.fields[4] - {7}) | {0}
+        self.day_or_weekday = not parts[2].startswith("*") and not parts[4].startswith("*")
+
+    def matches(self, dt: datetime) -> bool:
+        minute, hour, day, month, weekday = self.fields
+        if dt.minute not in minute or dt.hour not in hour or dt.month not in month:
+            return False
+        # cron 中周日为 0，Python 中周一为 0
+        day_match = dt.day in day
+        weekday_match = (dt.weekday() + 1) % 7 in weekday
+        if self.day_or_weekday:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def next_after(self, dt: datetime) -> datetime:
+        """返回 dt 之后第一个匹配的时间点"""
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 最多向前查找一年
+        for _ in range(366 * 24 * 60):
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        raise ValueError(f"cron expression never matches: {self.expr}")
+
+
+def load_daemon_config() -> Dict:
+    """读取调度配置：config.json 的 daemon 字段，环境变量优先"""
+    config = {}
+    if os.path.exists(CONFIG_PATH):
+        try:
+            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+                config = json.load(f).get("daemon", {})
+        except Exception as e:
+            print(f"Warning: Failed to load config.json: {e}")
+
+    return {
+        "schedule": os.environ.get("DIGEST_SCHEDULE") or config.get("schedule", DEFAULT_SCHEDULE),
+        "host": os.environ.get("DIGEST_DAEMON_HOST") or config.get("host", DEFAULT_HOST),
+        "port": int(os.environ.get("DIGEST_DAEMON_PORT") or config.get("port", DEFAULT_PORT)),
+    }
+
+
+class DigestDaemon:
+    """调度器 + 运行状态"""
+
+    def __init__(self, to_email: str):
+        self.to_email = to_email
+        self.config = load_daemon_config()
+        self.schedule = CronSchedule(self.config["schedule"])
+        self.config_mtime = self._config_mtime()
+        self.next_run = self.schedule.next_after(datetime.now(timezone.utc))
+
+        self.lock = threading.Lock()
+        self.running = False
+        self.run_count = 0
+        self.last_started: Optional[str] = None
+        self.last_finished: Optional[str] = None
+        self.last_success: Optional[bool] = None
+        self.last_duration: Optional[float] = None
+
+    def _config_mtime(self) -> float:
+        try:
+            return os.path.getmtime(CONFIG_PATH)
+        except OSError:
+            return 0.0
+
+    def reload_if_changed(self):
+        """config.json 变化时重新加载调度
+
+        节点配置本身在每次运行时由 config.get_config 检查并按需重新编译；
+        本地接口已经绑定，host / port 的修改需要重启进程才会生效
+        """
+        mtime = self._config_mtime()
+        if mtime == self.config_mtime:
+            return
+        self.config_mtime = mtime
+
+        config = load_daemon_config()
+        try:
+            schedule = CronSchedule(config["schedule"])
+        except ValueError as e:
+            print(f"Warning: {e}, keeping schedule {self.schedule.expr}")
+            return
+
+        print(f"🔄 config.json changed, schedule: {schedule.expr}")
+        if (config["host"], config["port"]) != (self.config["host"], self.config["port"]):
+            print(f"Warning: Control endpoint address changed to {config['host']}:{config['port']}, "
+                  f"restart the daemon to apply (still listening on {self.config['host']}:{self.config['port']})")
+        self.config = {**config, "host": self.config["host"], "port": self.config["port"]}
+        self.schedule = schedule
+        self.next_run = schedule.next_after(datetime.now(timezone.utc))
+
+    def trigger(self) -> bool:
+        """在后台线程中启动一次运行，已有运行进行中时返回 False"""
+        with self.lock:
+            if self.running:
+                return False
+            self.running = True
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def _run(self):
+        started = time.time()
+        self.last_started = datetime.now(timezone.utc).isoformat()
+        success = False
+        try:
+            success = run_digest(self.to_email)
+            if success:
+                stage_publish()
+        except Exception as e:
+            print(f"❌ Digest run failed: {e}")
+        finally:
+            self.last_duration = round(time.time() - started, 2)
+            self.last_finished = datetime.now(timezone.utc).isoformat()
+            self.last_success = success
+            self.run_count += 1
+            with self.lock:
+                self.running = False
+
+    def status(self) -> Dict:
+        return {
+            "schedule": self.schedule.expr,
+            "next_run": self.next_run.isoformat(),
+            "running": self.running,
+            "run_count": self.run_count,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_success": self.last_success,
+            "last_duration": self.last_duration,
+        }
+
+    def loop(self):
+        """调度主循环"""
+        print(f"⏰ Schedule: {self.schedule.expr} (UTC), next run at {self.next_run.isoformat()}")
+        while True:
+            self.reload_if_changed()
+            now = datetime.now(timezone.utc)
+            if now >= self.next_run:
+                if not self.trigger():
+                    print("Previous run still in progress, skipping this slot")
+                self.next_run = self.schedule.next_after(now)
+                print(f"⏰ Next run at {self.next_run.isoformat()}")
+            time.sleep(TICK_SECONDS)
+
+
+def make_handler(daemon: DigestDaemon):
+    """生成绑定到 daemon 的 HTTP 请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, payload: Dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._reply(200, daemon.status())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path == "/run":
+                if daemon.trigger():
+                    self._reply(202, {"started": True})
+                else:
+                    self._reply(409, {"started": False, "error": "run in progress"})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            # 静默访问日志
+            pass
+
+    return Handler
+
+
+def main():
+    to_email = os.environ.get("TO_EMAIL")
+    if not to_email:
+        print("Error: TO_EMAIL environment variable not set")
+        exit(1)
+
+    daemon = DigestDaemon(to_email)
+    host, port = daemon.config["host"], daemon.config["port"]
+    server = ThreadingHTTPServer((host, port), make_handler(daemon))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🌐 Control endpoint: http://{host}:{port}/status")
+
+    try:
+        daemon.loop()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
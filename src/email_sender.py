@@ -1,28 +1,25 @@
 """邮件发送模块 - 使用 Resend"""
+import hashlib
 import os
-import resend
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+import re
+from typing import Dict, List, Any, Optional, Tuple
 
+from resilience import call_with_retry
+from rss_generator import FEED_URL, variant_feed_url
+from timeutil import format_created, now
+from variants import VARIANTS, select_variant
 
-def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str = "") -> str:
-    """生成 HTML 格式的邮件内容
-    
-    新布局：
-    1. 今日一句话概览
-    2. 热门 Top 5 卡片样式（大标题、完整摘要、精彩评论引用）
-    3. 各节点紧凑列表（标题 + 简短摘要）
-    """
+# 熔断器名称
+EMAIL_BACKEND = "resend"
 
-    today = datetime.now().strftime("%Y年%m月%d日")
+# 邮件大小预算（字节），低于 Gmail 约 102KB 的截断阈值
+EMAIL_BUDGET_BYTES = 100 * 1024
 
-    html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body {{
+CSS_PLACEHOLDER = "/*__EMAIL_CSS__*/"
+
+# 邮件样式：finalize_email 只保留正文用到的规则
+EMAIL_CSS = """
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             line-height: 1.6;
             color: #333;
@@ -30,22 +27,22 @@ def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str
             margin: 0 auto;
             padding: 20px;
             background-color: #f5f5f5;
-        }}
-        .container {{
+        }
+        .container {
             background: white;
             border-radius: 12px;
             padding: 30px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
+        }
+        h1 {
             color: #1a1a2e;
             border-bottom: 3px solid #4a90d9;
             padding-bottom: 15px;
             margin-bottom: 20px;
-        }}
+        }
         
         /* 今日概览 */
-        .daily-overview {{
+        .daily-overview {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 20px 24px;
@@ -53,15 +50,15 @@ def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str
             margin-bottom: 30px;
             font-size: 16px;
             line-height: 1.6;
-        }}
-        .daily-overview-label {{
+        }
+        .daily-overview-label {
             font-size: 13px;
             opacity: 0.9;
             margin-bottom: 8px;
-        }}
+        }
         
         /* 节点标题 */
-        h2 {{
+        h2 {
             color: #4a90d9;
             margin-top: 30px;
             margin-bottom: 15px;
@@ -69,10 +66,10 @@ def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str
             background: #f0f7ff;
             border-radius: 8px;
             font-size: 16px;
-        }}
+        }
         
         /* 热门帖子卡片 */
-        .hot-card {{
+        .hot-card {
             background: #fff;
             border: 1px solid #e8e8e8;
             border-radius: 12px;
@@ -80,24 +77,24 @@ def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str
             margin-bottom: 16px;
             box-shadow: 0 2px 8px rgba(0,0,0,0.06);
             transition: box-shadow 0.2s;
-        }}
-        .hot-card:hover {{
+        }
+        .hot-card:hover {
             box-shadow: 0 4px 16px rgba(0,0,0,0.1);
-        }}
-        .hot-card-title {{
+        }
+        .hot-card-title {
             font-size: 17px;
             font-weight: 600;
             margin-bottom: 12px;
             line-height: 1.4;
-        }}
-        .hot-card-title a {{
+        }
+        .hot-card-title a {
             color: #1a1a2e;
             text-decoration: none;
-        }}
-        .hot-card-title a:hover {{
+        }
+        .hot-card-title a:hover {
             color: #4a90d9;
-        }}
-        .hot-card-summary {{
+        }
+        .hot-card-summary {
             font-size: 14px;
             color: #444;
             margin-bottom: 14px;
@@ -106,110 +103,139 @@ def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str
             border-left: 4px solid #4a90d9;
             border-radius: 4px;
             line-height: 1.6;
-        }}
+        }
         
         /* 精彩评论引用块 */
-        .featured-comments {{
+        .featured-comments {
             background: #fffbf0;
             border-radius: 8px;
             padding: 14px 16px;
             margin-bottom: 12px;
-        }}
-        .featured-comments-label {{
+        }
+        .featured-comments-label {
             font-size: 12px;
             color: #b8860b;
             font-weight: 500;
             margin-bottom: 10px;
-        }}
-        .featured-comment {{
+        }
+        .featured-comment {
             font-size: 13px;
             color: #555;
             padding: 8px 0;
             border-bottom: 1px dashed #e8e0d0;
             line-height: 1.5;
-        }}
-        .featured-comment:last-child {{
+        }
+        .featured-comment:last-child {
             border-bottom: none;
             padding-bottom: 0;
-        }}
-        .featured-comment-author {{
+        }
+        .featured-comment-author {
             color: #b8860b;
             font-weight: 500;
-        }}
+        }
         
-        .hot-card-meta {{
+        .hot-card-meta {
             font-size: 12px;
             color: #888;
             margin-top: 10px;
-        }}
-        .replies-badge {{
+        }
+        .replies-badge {
             background: #e8f4e8;
             color: #2d862d;
             padding: 3px 10px;
             border-radius: 12px;
             font-size: 11px;
             font-weight: 500;
-        }}
+        }
         
         /* 紧凑列表样式 */
-        .compact-list {{
+        .compact-list {
             margin: 0;
             padding: 0;
             list-style: none;
-        }}
-        .compact-item {{
+        }
+        .compact-item {
             padding: 10px 0;
             border-bottom: 1px solid #f0f0f0;
             display: flex;
             align-items: flex-start;
-        }}
-        .compact-item:last-child {{
+        }
+        .compact-item:last-child {
             border-bottom: none;
-        }}
-        .compact-bullet {{
+        }
+        .compact-bullet {
             color: #4a90d9;
             margin-right: 10px;
             flex-shrink: 0;
-        }}
-        .compact-content {{
+        }
+        .compact-content {
             flex: 1;
-        }}
-        .compact-title {{
+        }
+        .compact-title {
             font-size: 14px;
             margin-bottom: 3px;
-        }}
-        .compact-title a {{
+        }
+        .compact-title a {
             color: #1a1a2e;
             text-decoration: none;
-        }}
-        .compact-title a:hover {{
+        }
+        .compact-title a:hover {
             color: #4a90d9;
-        }}
-        .compact-summary {{
+        }
+        .compact-summary {
             font-size: 12px;
             color: #666;
             line-height: 1.4;
-        }}
-        .compact-meta {{
+        }
+        .compact-meta {
             font-size: 11px;
             color: #999;
             margin-top: 4px;
-        }}
+        }
         
-        .empty {{
+        .empty {
             color: #999;
             font-style: italic;
             padding: 20px;
             text-align: center;
-        }}
-        .footer {{
+        }
+        .footer {
             margin-top: 30px;
             padding-top: 20px;
             border-top: 1px solid #eee;
             text-align: center;
             color: #888;
             font-size: 12px;
-        }}
+        }
+"""
+
+_CSS_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_CLASS_RE = re.compile(r"\.([\w-]+)")
+_HTML_CLASS_RE = re.compile(r'class="([^"]*)"')
+
+# [(选择器, 声明块, 选择器中的 class 集合), ...]
+_CSS_RULES = [
+    (selector.strip(), body, set(_CSS_CLASS_RE.findall(selector)))
+    for selector, body in _CSS_RULE_RE.findall(_CSS_COMMENT_RE.sub("", EMAIL_CSS))
+]
+
+
+def render_email_header(daily_overview: str = "") -> str:
+    """生成邮件头部：标题和今日概览
+
+    样式位置先放占位符，由 finalize_email 按正文实际用到的 class 填入
+    """
+
+    today = now().strftime("%Y年%m月%d日")
+
+    html = f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+{CSS_PLACEHOLDER}
     </style>
 </head>
 <body>
@@ -225,45 +251,63 @@ def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str
             {daily_overview}
         </div>
 """
+    return html
 
-    total_count = 0
+
+def render_hot_section(hot_topics: List[Dict]) -> str:
+    """生成热门帖子卡片区（只展示 Top 5）"""
+    hot_topics = hot_topics[:5]
+    if not hot_topics:
+        return ""
     
-    # 热门帖子 Top 5（卡片样式）
-    hot_data = all_data.get("_hot", {})
-    hot_topics = hot_data.get("topics", [])[:5]  # 只展示 Top 5
+    html = f'<h2>🔥 今日热门 TOP {len(hot_topics)}</h2>'
+    for topic in hot_topics:
+        html += generate_hot_card(topic)
+    return html
+
+
+def render_rising_section(rising: List[Dict]) -> str:
+    """生成“正在升温”列表（按回复速度）"""
+    if not rising:
+        return ""
     
-    if hot_topics:
-        html += f'<h2>🔥 今日热门 TOP {len(hot_topics)}</h2>'
-        
-        for topic in hot_topics:
-            total_count += 1
-            html += generate_hot_card(topic)
+    html = '<h2>📈 正在升温</h2><ul class="compact-list">'
+    for topic in rising:
+        html += f"""
+        <li class="compact-item">
+            <span class="compact-bullet">•</span>
+            <div class="compact-content">
+                <div class="compact-title">
+                    <a href="{topic['url']}" target="_blank">{topic['title']}</a>
+                </div>
+                <div class="compact-meta">🚀 约 {topic.get('velocity', 0):.0f} 回复/小时 · 共 {topic.get('replies', 0)} 回复</div>
+            </div>
+        </li>
+"""
+    html += '</ul>'
+    return html
+
+
+def render_node_section(node_name: str, config: Dict, topics: List[Dict]) -> str:
+    """生成单个节点的紧凑列表区"""
+    if not topics:
+        return ""
     
-    # 其他节点（紧凑列表）
-    for node_name, data in all_data.items():
-        if node_name == "_hot":
-            continue
-            
-        config = data["config"]
-        topics = data["topics"]
-        
-        if not topics:
-            continue
-        
-        emoji = config.get("emoji", "📌")
-        title = config.get("title", node_name)
-        node_display = f"{emoji} {title}"
-        
-        html += f'<h2>{node_display} ({len(topics)})</h2>'
-        html += '<ul class="compact-list">'
-        
-        for topic in topics:
-            total_count += 1
-            html += generate_compact_item(topic)
-        
-        html += '</ul>'
+    emoji = config.get("emoji", "📌")
+    title = config.get("title", node_name)
+    node_display = f"{emoji} {title}"
+    
+    html = f'<h2 id="node-{node_name}">{node_display} ({len(topics)})</h2>'
+    html += '<ul class="compact-list">'
+    for topic in topics:
+        html += generate_compact_item(topic)
+    html += '</ul>'
+    return html
 
-    html += f"""
+
+def render_email_footer(total_count: int) -> str:
+    """生成邮件尾部"""
+    return f"""
         <div class="footer">
             共收录 {total_count} 篇帖子 · 由 V2EX Daily Digest 自动生成<br>
             <a href="https://www.v2ex.com" style="color: #4a90d9;">访问 V2EX</a>
@@ -272,7 +316,197 @@ def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str
 </body>
 </html>
 """
-    return html
+
+
+def render_stats_section(stats, node_names: List[str]) -> str:
+    """生成统计区：各节点近 7 天日均帖子数 / 回复中位数，以及 7/30/90 天活跃作者"""
+    if stats is None or not stats.days:
+        return ""
+    
+    from stats import WINDOWS
+    
+    node_lines = []
+    for node_name in node_names:
+        node_stat = stats.node_stats(node_name, days=7)
+        if node_stat["topics"]:
+            node_lines.append(
+                f"{node_name}: 日均 {node_stat['daily_volume']} 帖 · 回复中位数 {node_stat['median_replies']:g}"
+            )
+    
+    author_lines = []
+    for days in WINDOWS:
+        authors = stats.top_authors(days=days, limit=5)
+        if authors:
+            names = "、".join(f"{name}({count})" for name, count in authors)
+            author_lines.append(f"近 {days} 天活跃作者：{names}")
+    
+    if not node_lines and not author_lines:
+        return ""
+    lines = "<br>".join(node_lines + author_lines)
+    return f"""
+        <h2>📊 社区统计</h2>
+        <div class="compact-meta">{lines}</div>
+"""
+
+
+def render_overflow_section(skipped: List[Tuple[str, str, int]], feed_url: str = FEED_URL) -> str:
+    """超出预算未展开的节点：只列出节点名和帖子数，引导到 RSS"""
+    if not skipped:
+        return ""
+    nodes = " · ".join(f"{display} ({count})" for _, display, count in skipped)
+    total = sum(count for _, _, count in skipped)
+    return f"""
+        <h2>📦 更多内容</h2>
+        <div class="compact-summary">
+            还有 {len(skipped)} 个节点共 {total} 篇帖子未在邮件中展开：{nodes}<br>
+            <a href="{feed_url}" style="color: #4a90d9;">在 RSS 中查看完整内容 →</a>
+        </div>
+"""
+
+
+def prune_css(html: str) -> str:
+    """只保留 html 中用到的 class 对应的样式规则（元素选择器始终保留）"""
+    used = set()
+    for classes in _HTML_CLASS_RE.findall(html):
+        used.update(classes.split())
+    rules = []
+    for selector, body, classes in _CSS_RULES:
+        if classes <= used:
+            declarations = " ".join(body.split())
+            rules.append(f"{selector} {{ {declarations} }}")
+    return "\n".join(rules)
+
+
+def finalize_email(html: str) -> str:
+    """把精简后的样式填入邮件头部"""
+    return html.replace(CSS_PLACEHOLDER, prune_css(html), 1)
+
+
+def _byte_size(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def _theme_order(sections: List[Tuple]) -> List[Tuple]:
+    """按主题分组（主题按首次出现的顺序，组内保持原顺序）"""
+    themes: Dict[str, List[Tuple]] = {}
+    for section in sections:
+        themes.setdefault(section[4], []).append(section)
+    return [section for group in themes.values() for section in group]
+
+
+def build_digest_emails(all_data: Dict[str, Dict[str, Any]], daily_overview: str = "",
+                        rising: Optional[List[Dict]] = None,
+                        budget: Optional[int] = EMAIL_BUDGET_BYTES, split: bool = False,
+                        stats=None, variant: Optional[str] = None) -> List[str]:
+    """按大小预算生成邮件，返回一封或多封邮件的 HTML
+    
+    热门卡片和升温列表总是放在第一封的最前面；之后逐个节点累加片段字节数，
+    页脚和统计区也计入预算，超出预算时：
+    - split=False：剩余节点折叠为“在 RSS 中查看”的链接
+    - split=True：节点按主题（节点配置的 theme）分组，每个主题单独成邮件，
+      同一主题超出预算时再拆成多封
+    
+    stats 为 stats.StatsStore 时，在最后一封邮件末尾附上统计区；
+    variant 指定摘要变体时使用该变体的摘要，折叠链接指向该变体的 feed
+    """
+    all_data = select_variant(all_data, variant)
+    # 样式最多占用的字节数，提前从预算中扣除
+    reserve = _byte_size(EMAIL_CSS) + 1024
+    limit = None if budget is None else budget - reserve
+    
+    header = render_email_header(daily_overview)
+    hot_topics = all_data.get("_hot", {}).get("topics", [])
+    lead = render_hot_section(hot_topics) + render_rising_section(rising or [])
+    lead_count = len(hot_topics[:5])
+    
+    # [(节点名, 显示名, 片段, 帖子数, 主题), ...]
+    sections = []
+    for node_name, data in all_data.items():
+        if node_name == "_hot" or not data["topics"]:
+            continue
+        config = data["config"]
+        display = f"{config.get('emoji', '📌')} {config.get('title', node_name)}"
+        sections.append((node_name, display, render_node_section(node_name, config, data["topics"]),
+                         len(data["topics"]), config.get("theme", "")))
+    
+    node_names = [name for name in all_data if name != "_hot"]
+    stats_html = render_stats_section(stats, node_names)
+    # 页脚只有帖子数会变，按全部帖子数估算
+    footer_size = _byte_size(render_email_footer(lead_count + sum(s[3] for s in sections)))
+    
+    def assemble(part_header: str, body: str, count: int) -> str:
+        return finalize_email(part_header + body + render_email_footer(count))
+    
+    skipped = []
+    if not split:
+        included = []
+        size = _byte_size(header) + _byte_size(lead) + _byte_size(stats_html) + footer_size
+        for section in sections:
+            section_size = _byte_size(section[2])
+            if limit is not None and size + section_size > limit and (lead or included):
+                skipped.append(section)
+                continue
+            included.append(section)
+            size += section_size
+        
+        def single() -> str:
+            body = lead + "".join(s[2] for s in included)
+            body += render_overflow_section([(s[0], s[1], s[3]) for s in skipped], variant_feed_url(variant))
+            return assemble(header, body + stats_html, lead_count + sum(s[3] for s in included))
+        
+        emails = [single()]
+        # 折叠链接本身也占空间：仍超出预算时把最后展开的节点也折叠起来
+        while budget is not None and _byte_size(emails[0]) > budget and included and (lead or len(included) > 1):
+            skipped.insert(0, included.pop())
+            emails = [single()]
+    else:
+        parts = []
+        part_header, body, count = header, lead, lead_count
+        size = _byte_size(header) + _byte_size(lead) + footer_size
+        has_nodes = False
+        theme = None
+        for section in _theme_order(sections):
+            section_size = _byte_size(section[2])
+            new_theme = has_nodes and section[4] != theme
+            over = limit is not None and size + section_size > limit and body
+            if new_theme or over:
+                # 当前邮件已满或主题变化，开始下一封
+                parts.append((part_header, body, count))
+                part_header = render_email_header()
+                body, count, has_nodes = "", 0, False
+                size = _byte_size(part_header) + footer_size
+            body += section[2]
+            size += section_size
+            count += section[3]
+            has_nodes = True
+            theme = section[4]
+        
+        if stats_html and limit is not None and size + _byte_size(stats_html) > limit and body:
+            parts.append((part_header, body, count))
+            part_header, body, count = render_email_header(), "", 0
+        parts.append((part_header, body + stats_html, count))
+        emails = [assemble(*part) for part in parts]
+    
+    sizes = ", ".join(f"{_byte_size(html) / 1024:.1f} KB" for html in emails)
+    print(f"  Email size: {sizes}" + (f" ({len(skipped)} nodes moved to RSS link)" if skipped else ""))
+    return emails
+
+
+def generate_html_email(all_data: Dict[str, Dict[str, Any]], daily_overview: str = "",
+                        rising: Optional[List[Dict]] = None,
+                        budget: Optional[int] = EMAIL_BUDGET_BYTES, stats=None,
+                        variant: Optional[str] = None) -> str:
+    """生成 HTML 格式的邮件内容
+    
+    新布局：
+    1. 今日一句话概览
+    2. 热门 Top 5 卡片样式（大标题、完整摘要、精彩评论引用）
+    3. 正在升温（回复速度最快的帖子）
+    4. 各节点紧凑列表（标题 + 简短摘要），超出大小预算的节点折叠为 RSS 链接
+    5. 社区统计（可选）
+    """
+    return build_digest_emails(all_data, daily_overview, rising, budget=budget,
+                               stats=stats, variant=variant)[0]
 
 
 def generate_hot_card(topic: Dict) -> str:
@@ -280,7 +514,7 @@ def generate_hot_card(topic: Dict) -> str:
     title = topic["title"]
     url = topic["url"]
     author = topic["author"]
-    created = topic["created"]
+    created = format_created(topic)
     replies = topic.get("replies", 0)
     summary = topic.get("summary", "")
     featured_comments = topic.get("featured_comments", [])
@@ -356,32 +590,59 @@ def generate_compact_item(topic: Dict) -> str:
 """
 
 
-def send_email(to_email: str, all_data: Dict[str, Dict[str, Any]], daily_overview: str = "") -> bool:
-    """发送邮件"""
+def send_html_email(to_email: str, html_content: str, total: int, subject_suffix: str = "") -> bool:
+    """发送已渲染好的邮件 HTML"""
     api_key = os.environ.get("RESEND_API_KEY")
     if not api_key:
         print("Error: RESEND_API_KEY not set")
         return False
 
-    resend.api_key = api_key
+    # 延迟导入 resend SDK，只渲染不发送时无需导入
+    import resend
 
-    today = datetime.now().strftime("%m/%d")
-    html_content = generate_html_email(all_data, daily_overview)
+    resend.api_key = api_key
 
-    # 计算总帖子数
-    total = sum(len(data["topics"]) for data in all_data.values())
+    today = now().strftime("%m/%d")
 
     try:
         params = {
             "from": "V2EX Daily <digest@resend.dev>",
             "to": [to_email],
-            "subject": f"📰 V2EX 每日精选 ({today}) - {total}篇新帖",
+            "subject": f"📰 V2EX 每日精选 ({today}) - {total}篇新帖{subject_suffix}",
             "html": html_content
         }
 
-        email = resend.Emails.send(params)
+        # 幂等键由收件人、标题和正文决定：服务端已受理但响应超时后重试，不会重复发送
+        key_source = f"{to_email}\n{params['subject']}\n{html_content}".encode("utf-8")
+        options = {"idempotency_key": hashlib.sha256(key_source).hexdigest()}
+
+        # resend SDK 不支持单次请求超时，timeout 参数不使用；options 参数需要 resend>=2.8.0
+        email = call_with_retry(lambda timeout: resend.Emails.send(params, options), EMAIL_BACKEND,
+                                max_attempts=3, base_delay=2)
         print(f"Email sent successfully! ID: {email['id']}")
         return True
     except Exception as e:
         print(f"Failed to send email: {e}")
         return False
+
+
+def send_email(to_email: str, all_data: Dict[str, Dict[str, Any]], daily_overview: str = "",
+               rising: Optional[List[Dict]] = None, stats=None, variant: Optional[str] = None) -> bool:
+    """发送邮件
+    
+    设置 DIGEST_EMAIL_SPLIT=1 时，超出大小预算的内容拆成多封邮件发送，
+    否则折叠为 RSS 链接。variant 指定摘要变体时标题中会注明变体名
+    """
+    split = os.environ.get("DIGEST_EMAIL_SPLIT", "").lower() in ("1", "true", "yes")
+    emails = build_digest_emails(all_data, daily_overview, rising, split=split,
+                                 stats=stats, variant=variant)
+    label = f" [{VARIANTS[variant]['label']}]" if variant else ""
+
+    # 计算总帖子数
+    total = sum(len(data["topics"]) for data in all_data.values())
+
+    success = True
+    for index, html_content in enumerate(emails):
+        suffix = label + (f" ({index + 1}/{len(emails)})" if len(emails) > 1 else "")
+        success = send_html_email(to_email, html_content, total, suffix) and success
+    return success
@@ -0,0 +1,89 @@
+"""V2EX 接口响应的快速解码
+
+优先级：msgspec（按结构体只解码需要的字段）> orjson > 标准库 json。
+三种方式产出的帖子 / 评论字典在下游用到的字段上完全一致（包括显式的 null 和缺失字段），
+下游 parse_topic 的结果也一致。
+可用 V2EX_JSON_BACKEND=msgspec|orjson|stdlib 强制指定（未安装时回退）。
+"""
+import json
+import os
+from typing import Any, Callable, Dict, List, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if msgspec is not None:
+    # 字段默认 UNSET：缺失的字段转回字典时同样缺失，显式的 null 保留为 None，
+    # 与标准库解码后 .get 的行为一致
+    _UNSET = msgspec.UNSET
+
+    class _Member(msgspec.Struct):
+        username: Any = _UNSET
+
+    class _Node(msgspec.Struct):
+        name: Any = _UNSET
+        title: Any = _UNSET
+
+    class _Topic(msgspec.Struct):
+        id: Any = _UNSET
+        title: Any = _UNSET
+        replies: Any = _UNSET
+        created: Any = _UNSET
+        content: Any = _UNSET
+        member: Union[_Member, None, msgspec.UnsetType] = _UNSET
+        node: Union[_Node, None, msgspec.UnsetType] = _UNSET
+
+    class _Reply(msgspec.Struct):
+        content: Any = _UNSET
+        created: Any = _UNSET
+        member: Union[_Member, None, msgspec.UnsetType] = _UNSET
+
+    _topics_decoder = msgspec.json.Decoder(List[_Topic])
+    _replies_decoder = msgspec.json.Decoder(List[_Reply])
+
+
+def _select_backend() -> str:
+    requested = os.environ.get("V2EX_JSON_BACKEND", "").lower()
+    available = ["stdlib"]
+    if orjson is not None:
+        available.insert(0, "orjson")
+    if msgspec is not None:
+        available.insert(0, "msgspec")
+    if requested in available:
+        return requested
+    return available[0]
+
+
+BACKEND = _select_backend()
+
+
+def loads(data: bytes) -> Any:
+    """解码任意 JSON"""
+    if BACKEND == "orjson" or (BACKEND == "msgspec" and orjson is not None):
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+
+def _typed(decoder) -> Callable[[bytes], List[Dict]]:
+    def decode(data: bytes) -> List[Dict]:
+        return msgspec.to_builtins(decoder.decode(data))
+    return decode
+
+
+if BACKEND == "msgspec":
+    decode_topics = _typed(_topics_decoder)
+    decode_replies = _typed(_replies_decoder)
+else:
+    # 整体解码后由 parse_topic 等按需取字段
+    decode_topics = loads
+    decode_replies = loads
@@ -0,0 +1,190 @@
+"""V2EX 接口的磁盘 HTTP 缓存
+
+- 响应体 zlib 压缩后存盘，同时保存 ETag / Last-Modified
+- 未过期的条目直接读本地；过期条目带 If-None-Match / If-Modified-Since 重新验证，
+  304 时只刷新时间戳
+- 请求失败时退回过期条目（stale-if-error）
+- 总大小超过上限时按最近访问时间（LRU）淘汰
+
+条目索引存放在缓存目录下的 SQLite 文件中，每次存储、命中只更新对应的一行，
+多个进程（如任务队列的多个 worker）共用同一个缓存目录时不会互相覆盖条目。
+与任务队列一样，缓存目录必须在本地磁盘上。
+
+TTL 可以是秒数，也可以是根据解码后响应计算秒数的函数。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, Union
+
+import requests
+
+Ttl = Union[float, Callable[[Any], float]]
+
+INDEX_FILE = "index.sqlite"
+
+# 旧版本整体读写的 JSON 索引，首次打开时导入
+LEGACY_INDEX_FILE = "index.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    ttl REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+
+class HTTPCache:
+    """按 URL 缓存 JSON 响应"""
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # 常驻进程中可能被多个线程使用，访问都在 self.lock 内
+        self.conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), timeout=30,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(_SCHEMA)
+        self._import_legacy_index()
+
+    def _import_legacy_index(self):
+        path = os.path.join(self.directory, LEGACY_INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            for key, entry in index.items():
+                self.conn.execute(
+                    """INSERT OR IGNORE INTO entries
+                       (key, url, etag, last_modified, stored_at, last_access, ttl, size)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (key, entry["url"], entry.get("etag"), entry.get("last_modified"),
+                     entry["stored_at"], entry["last_access"], entry["ttl"], entry["size"]),
+                )
+        except Exception:
+            # 索引损坏时丢弃，对应的响应体文件在同一 URL 再次缓存时被覆盖
+            pass
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # 另一个进程已经导入
+            pass
+
+    def close(self):
+        self.conn.close()
+
+    def _entry(self, key: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def _touch(self, key: str, now: float, revalidated: bool = False):
+        """记录访问时间（LRU 淘汰依据）；重新验证通过时同时刷新存储时间"""
+        if revalidated:
+            self.conn.execute("UPDATE entries SET stored_at = ?, last_access = ? WHERE key = ?",
+                              (now, now, key))
+        else:
+            self.conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".z")
+
+    def _read_body(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._body_path(key), "rb") as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+
+    def _store(self, key: str, url: str, body: bytes, response: requests.Response, ttl: float):
+        compressed = zlib.compress(body, 6)
+        # 先写临时文件再替换，其他进程不会读到写了一半的响应体
+        path = self._body_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        now = time.time()
+        self.conn.execute(
+            """INSERT OR REPLACE INTO entries
+               (key, url, etag, last_modified, stored_at, last_access, ttl, size)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (key, url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+             now, now, ttl, len(compressed)),
+        )
+        self._evict()
+
+    def _evict(self):
+        """总大小超过上限时淘汰最久未访问的条目"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        for row in rows:
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (row["key"],))
+            total -= row["size"]
+            try:
+                os.remove(self._body_path(row["key"]))
+            except OSError:
+                pass
+            if total <= self.max_bytes:
+                break
+
+    def get_json(self, session: requests.Session, url: str, ttl: Ttl = 0, timeout: float = 30,
+                 decode: Callable[[bytes], Any] = json.loads) -> Any:
+        """获取 URL 的 JSON 内容，按需使用或重新验证缓存
+
+        decode 把响应体字节解码为对象，缓存中保存的始终是原始字节
+        """
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        now = time.time()
+
+        with self.lock:
+            entry = self._entry(key)
+            body = self._read_body(key) if entry else None
+            if body is None:
+                entry = None
+            elif now - entry["stored_at"] < entry["ttl"]:
+                self._touch(key, now)
+                return decode(body)
+
+        # 过期条目带上验证头
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and entry:
+                with self.lock:
+                    self._touch(key, time.time(), revalidated=True)
+                return decode(body)
+            response.raise_for_status()
+        except requests.RequestException:
+            if entry:
+                print(f"Warning: request failed, serving stale cache for {url}")
+                return decode(body)
+            raise
+
+        data = decode(response.content)
+        seconds = ttl(data) if callable(ttl) else ttl
+        if seconds > 0:
+            with self.lock:
+                self._store(key, url, response.content, response, seconds)
+        return data
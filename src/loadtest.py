@@ -0,0 +1,502 @@
+"""端到端压测：模拟成百上千个节点和订阅者，找出最先饱和的阶段
+
+本地起一个替身服务（V2EX 接口 + Azure OpenAI 接口 + Resend 接口，可配置延迟），
+把真实的 fetch_all_nodes → summarize_topics → generate_rss → 邮件渲染 → 逐个订阅者发送
+整条链路指向它。每个规模档位在独立的子进程中运行（峰值 RSS 互不影响），报告：
+- 各阶段耗时、吞吐量和单次操作的 p50 / p95 / p99 延迟
+- 子进程峰值 RSS
+- 最先饱和的阶段：与上一档相比吞吐量下降超过 20%，或单次延迟 p95 增长超过 50%
+
+规模档位写成 节点数x每节点帖子数x每帖评论数x订阅者数，多个档位用逗号分隔。
+
+用法：
+    python src/loadtest.py
+    python src/loadtest.py --steps 10x10x20x10,100x10x20x200 --llm-ms 200 --json report.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_STEPS = "10x10x20x10,50x10x20x100,200x10x20x500"
+
+# 按流水线顺序排列的阶段；per_item 为 True 的阶段按单个条目（节点 / 帖子 / 订阅者）计延迟，
+# 其余阶段一次处理全部帖子，延迟即整次调用耗时
+STAGES = [
+    ("fetch", "nodes", True),
+    ("summarize", "topics", True),
+    ("rss", "topics", False),
+    ("email", "topics", False),
+    ("deliver", "subscribers", True),
+]
+
+# 饱和判定：吞吐量低于上一档的该比例，或单次延迟 p95 超过上一档的该倍数
+SATURATION_THROUGHPUT = 0.8
+SATURATION_LATENCY = 1.5
+
+# 合成数据
+NODE_PREFIX = "lt"
+TOPIC_ID_BASE = 1_000_000
+HOT_TOPICS = 20
+WORDS = [
+    "Python", "Rust", "Go", "数据库", "缓存", "部署", "性能", "内存", "并发", "接口",
+    "重构", "测试", "监控", "容器", "前端", "后端", "索引", "日志", "队列", "协程",
+    "显示器", "键盘", "工资", "远程", "面试", "租房", "二手", "域名", "服务器", "VPS",
+]
+NOISE_REPLIES = ["+1", "mark", "同问楼主", "感谢分享", "👍", "@someone"]
+
+
+def parse_steps(value: str) -> List[Dict[str, int]]:
+    """解析 "节点x帖子x评论x订阅者,..." 形式的规模档位"""
+    steps = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.lower().split("x")
+        if len(parts) != 4 or not all(p.isdigit() for p in parts):
+            raise ValueError(f"invalid step '{item}', expected NODESxTOPICSxREPLIESxSUBSCRIBERS")
+        nodes, topics, replies, subscribers = map(int, parts)
+        steps.append({"nodes": nodes, "topics": topics, "replies": replies, "subscribers": subscribers})
+    if not steps:
+        raise ValueError("no scale steps given")
+    return steps
+
+
+def step_label(step: Dict[str, int]) -> str:
+    return f"{step['nodes']}x{step['topics']}x{step['replies']}x{step['subscribers']}"
+
+
+# ---------------------------------------------------------------------------
+# 本地替身服务
+# ---------------------------------------------------------------------------
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return "".join(rng.choice(WORDS) + rng.choice(["，", "的", "和", "。"]) for _ in range(words))
+
+
+def make_topic(node_index: int, index: int, step: Dict[str, int], now: float) -> Dict:
+    """合成一个节点列表中的帖子（字段与 V2EX 接口一致）"""
+    topic_id = TOPIC_ID_BASE + node_index * 1000 + index
+    rng = random.Random(topic_id)
+    node = f"{NODE_PREFIX}{node_index:04d}"
+    return {
+        "id": topic_id,
+        "title": f"[{node}] " + _sentence(rng, 4),
+        "url": f"https://www.v2ex.com/t/{topic_id}",
+        "content": "<p>" + _sentence(rng, 40) + "</p>",
+        "replies": step["replies"],
+        # 均匀分布在最近 24 小时内，全部落在默认的 48 小时窗口中
+        "created": int(now - (index + 1) * 86400 / (step["topics"] + 1)),
+        "member": {"username": f"user{rng.randrange(500)}"},
+        "node": {"name": node, "title": f"压测节点 {node_index}"},
+    }
+
+
+def make_replies(topic_id: int, count: int) -> List[Dict]:
+    """合成评论：混入噪音、重复和 @ 回复，覆盖本地预筛选的各个分支"""
+    rng = random.Random(topic_id)
+    replies = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.2:
+            content = rng.choice(NOISE_REPLIES)
+        elif roll < 0.3 and replies:
+            content = replies[-1]["content"]
+        elif roll < 0.5:
+            content = f"@user{rng.randrange(500)} " + _sentence(rng, rng.randint(3, 12))
+        else:
+            content = _sentence(rng, rng.randint(3, 30))
+        replies.append({
+            "content": content,
+            "created": int(time.time()) - (count - i) * 60,
+            "member": {"username": f"user{rng.randrange(500)}"},
+        })
+    return replies
+
+
+LLM_OUTPUT = """【帖子摘要】
+{summary}
+
+【评论精华】
+@user1: {comment}
+@user2: {comment2}
+
+【精彩评论】
+@user3: {comment}
+@user4: {comment2}"""
+
+
+class StandInServer:
+    """V2EX / Azure OpenAI / Resend 替身服务，在后台线程中运行
+
+    每个接口先等待配置的延迟（在 0.5~1.5 倍之间抖动，slow_ratio 比例的请求慢 10 倍，
+    用来观察尾延迟），再返回合成数据。step 决定节点列表和评论的规模
+    """
+
+    def __init__(self, v2ex_ms: float, llm_ms: float, email_ms: float, slow_ratio: float = 0.01):
+        self.latency = {"v2ex": v2ex_ms / 1000, "llm": llm_ms / 1000, "email": email_ms / 1000}
+        self.slow_ratio = slow_ratio
+        self.step = {"nodes": 0, "topics": 0, "replies": 0, "subscribers": 0}
+        self.now = time.time()
+        self._rng = random.Random(0)
+        self._lock = threading.Lock()
+        self._listings: Dict[str, bytes] = {}
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="loadtest-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def set_step(self, step: Dict[str, int]):
+        with self._lock:
+            self.step = dict(step)
+            self.now = time.time()
+            self._listings.clear()
+
+    def delay(self, kind: str):
+        with self._lock:
+            factor = self._rng.uniform(0.5, 1.5)
+            if self._rng.random() < self.slow_ratio:
+                factor *= 10
+        time.sleep(self.latency[kind] * factor)
+
+    def listing(self, node: str) -> bytes:
+        """节点列表（同一档位内缓存，替身服务本身不应成为瓶颈）"""
+        with self._lock:
+            cached = self._listings.get(node)
+            step, now = self.step, self.now
+        if cached is not None:
+            return cached
+        if node == "_hot":
+            # 全站热门取前几个节点的第一个帖子，与节点列表重复，覆盖去重逻辑
+            topics = [make_topic(i, 0, step, now) for i in range(min(HOT_TOPICS, step["nodes"]))]
+        else:
+            try:
+                node_index = int(node[len(NODE_PREFIX):])
+            except ValueError:
+                node_index = -1
+            if not node.startswith(NODE_PREFIX) or not 0 <= node_index < step["nodes"]:
+                topics = []
+            else:
+                topics = [make_topic(node_index, i, step, now) for i in range(step["topics"])]
+        body = json.dumps(topics, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._listings[node] = body
+        return body
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头和正文分两次写出，不关闭 Nagle 算法会与延迟确认叠加出约 40ms 的假延迟
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload):
+                body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/api/topics/hot.json":
+                    server.delay("v2ex")
+                    self._send(200, server.listing("_hot"))
+                elif url.path == "/api/topics/show.json" and "node_name" in query:
+                    server.delay("v2ex")
+                    self._send(200, server.listing(query["node_name"][0]))
+                elif url.path == "/api/replies/show.json" and "topic_id" in query:
+                    server.delay("v2ex")
+                    self._send(200, make_replies(int(query["topic_id"][0]), server.step["replies"]))
+                else:
+                    self._send(404, {"message": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                path = urlparse(self.path).path
+                if path.endswith("/chat/completions"):
+                    server.delay("llm")
+                    rng = random.Random(len(request.get("messages", [{}])[0].get("content", "")))
+                    content = LLM_OUTPUT.format(summary=_sentence(rng, 20), comment=_sentence(rng, 8),
+                                                comment2=_sentence(rng, 8))
+                    self._send(200, {
+                        "id": "chatcmpl-loadtest", "object": "chat.completion", "created": int(time.time()),
+                        "model": request.get("model", ""),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": content}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    })
+                elif path == "/emails":
+                    server.delay("email")
+                    self._send(200, {"id": f"loadtest-{time.monotonic_ns()}"})
+                else:
+                    self._send(404, {"message": "not found"})
+
+        return Handler
+
+
+# ---------------------------------------------------------------------------
+# 子进程：跑一个规模档位
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩百分位（q 取 0~100）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值 RSS（MB），不支持的平台返回 0"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Recorder:
+    """记录各阶段的单次操作延迟
+
+    通过替换模块属性给真实函数计时（只测量，不改变行为），
+    调用方按模块全局名查找这些函数，所以替换后的版本会被流水线调用到
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {name: [] for name, _, _ in STAGES}
+
+    def wrap(self, module, name: str, stage: str):
+        original = getattr(module, name)
+        samples = self.samples[stage]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        setattr(module, name, timed)
+
+
+def run_step(step: Dict[str, int], base_url: str, request_delay: float) -> Dict:
+    """在当前进程中跑完整条流水线，返回各阶段指标"""
+    workdir = tempfile.mkdtemp(prefix="digest-loadtest-")
+    nodes = [{"name": f"{NODE_PREFIX}{i:04d}", "title": f"压测节点 {i}"} for i in range(step["nodes"])]
+    os.environ.update({
+        "V2EX_NODES": json.dumps({"defaults": {"limit": step["topics"]}, "nodes": nodes}),
+        "V2EX_HTTP_CACHE": "0",
+        "AZURE_OPENAI_KEY": "loadtest",
+        "RESEND_API_KEY": "loadtest",
+        "RESEND_API_URL": base_url,
+        "DIGEST_SUMMARY_VARIANTS": "zh",
+        "DIGEST_STATE_DIR": workdir,
+    })
+
+    import email_sender
+    import rss_generator
+    import scraper
+    import summarizer
+
+    scraper.V2EX_HOT_API = f"{base_url}/api/topics/hot.json"
+    scraper.V2EX_TOPICS_API = f"{base_url}/api/topics/show.json"
+    scraper.V2EX_REPLIES_API = f"{base_url}/api/replies/show.json"
+    summarizer.AZURE_ENDPOINT = f"{base_url}/"
+    summarizer.REQUEST_DELAY = request_delay
+
+    recorder = Recorder()
+    recorder.wrap(scraper, "fetch_policy_topics", "fetch")
+    recorder.wrap(summarizer, "summarize_topic_variants", "summarize")
+    recorder.wrap(email_sender, "send_html_email", "deliver")
+
+    stages: Dict[str, Dict] = {}
+
+    def measure(name: str, items: Callable[[object], int], fn: Callable):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = fn()
+        wall = time.perf_counter() - start
+        if name in ("rss", "email"):
+            recorder.samples[name].append(wall)
+        stages[name] = {
+            "wall": wall,
+            "cpu": time.process_time() - cpu_start,
+            "items": items(result),
+            "latencies": recorder.samples[name],
+            "rss_mb": peak_rss_mb(),
+        }
+        return result
+
+    def summarize(all_data):
+        for node_name, data in all_data.items():
+            data["topics"] = summarizer.summarize_node(node_name, data)
+
+    def deliver(html: str, total: int) -> int:
+        sent = 0
+        for i in range(step["subscribers"]):
+            sent += email_sender.send_html_email(f"subscriber{i}@loadtest.invalid", html, total)
+        return sent
+
+    # 流水线逐条打印的进度在压测规模下没有意义，只保留最终报告
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        all_data = measure("fetch", len, scraper.fetch_all_nodes)
+        total = sum(len(data["topics"]) for data in all_data.values())
+        measure("summarize", lambda _: total, lambda: summarize(all_data))
+        measure("rss", lambda _: total,
+                lambda: rss_generator.generate_rss(all_data, os.path.join(workdir, "v2ex-digest.xml")))
+        emails = measure("email", lambda _: total, lambda: email_sender.build_digest_emails(all_data))
+        sent = measure("deliver", lambda _: step["subscribers"], lambda: deliver(emails[0], total))
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    summarized = sum(1 for data in all_data.values() for t in data["topics"] if t.get("summary"))
+    return {
+        "step": step,
+        "topics": total,
+        "summarized": summarized,
+        "sent": sent,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+
+def run_worker(step: Dict[str, int], base_url: str, request_delay: float):
+    """子进程入口：把指标以一行 JSON 写到标准输出"""
+    result = run_step(step, base_url, request_delay)
+    for stage in result["stages"].values():
+        latencies = stage.pop("latencies")
+        stage.update({
+            "calls": len(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "throughput": stage["items"] / stage["wall"] if stage["wall"] > 0 else 0.0,
+        })
+    print(json.dumps(result))
+
+
+# ---------------------------------------------------------------------------
+# 父进程：逐档运行并判断饱和
+# ---------------------------------------------------------------------------
+
+def find_saturated(current: Dict, previous: Optional[Dict]) -> Optional[str]:
+    """按流水线顺序返回第一个饱和的阶段，第一档没有参照时返回 None"""
+    if previous is None:
+        return None
+    for name, _, per_item in STAGES:
+        now, before = current["stages"][name], previous["stages"][name]
+        if before["throughput"] > 0 and now["throughput"] < before["throughput"] * SATURATION_THROUGHPUT:
+            return name
+        if per_item and before["p95"] > 0 and now["p95"] > before["p95"] * SATURATION_LATENCY:
+            return name
+    return None
+
+
+def print_report(result: Dict):
+    stages = result["stages"]
+    total_wall = sum(stage["wall"] for stage in stages.values()) or 1.0
+    print(f"\n▶ {step_label(result['step'])}: {result['topics']} topics, "
+          f"{result['summarized']} summarized, {result['sent']} emails sent, "
+          f"peak RSS {result['peak_rss_mb']:.1f} MB")
+    print(f"  {'stage':<10} {'wall':>8} {'share':>6} {'items':>6} {'throughput':>15} "
+          f"{'p50':>9} {'p95':>9} {'p99':>9} {'rss':>8}")
+    for name, unit, _ in STAGES:
+        stage = stages[name]
+        print(f"  {name:<10} {stage['wall']:7.2f}s {stage['wall'] / total_wall:6.0%} {stage['items']:6d} "
+              f"{stage['throughput']:9.1f} {unit[:5]}/s "
+              f"{stage['p50'] * 1000:7.1f}ms {stage['p95'] * 1000:7.1f}ms {stage['p99'] * 1000:7.1f}ms "
+              f"{stage['rss_mb']:6.1f}MB")
+    bottleneck = max(stages, key=lambda name: stages[name]["wall"])
+    saturated = result["saturated"] or "-"
+    print(f"  bottleneck: {bottleneck}, first saturated stage: {saturated}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="V2EX Daily Digest 端到端压测")
+    parser.add_argument("--steps", default=DEFAULT_STEPS,
+                        help=f"规模档位 节点x帖子x评论x订阅者，逗号分隔（默认 {DEFAULT_STEPS}）")
+    parser.add_argument("--v2ex-ms", type=float, default=10, help="V2EX 接口延迟（毫秒）")
+    parser.add_argument("--llm-ms", type=float, default=30, help="模型接口延迟（毫秒）")
+    parser.add_argument("--email-ms", type=float, default=10, help="邮件接口延迟（毫秒）")
+    parser.add_argument("--slow-ratio", type=float, default=0.01, help="慢 10 倍的请求比例")
+    parser.add_argument("--request-delay", type=float, default=0,
+                        help="摘要请求间隔（秒，生产环境为 summarizer.REQUEST_DELAY）")
+    parser.add_argument("--json", default="", help="把完整结果写入 JSON 文件")
+    parser.add_argument("--worker", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--url", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(json.loads(args.worker), args.url, args.request_delay)
+        return
+
+    try:
+        steps = parse_steps(args.steps)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = StandInServer(args.v2ex_ms, args.llm_ms, args.email_ms, args.slow_ratio)
+    server.start()
+    print(f"Stand-in server at {server.url} "
+          f"(v2ex {args.v2ex_ms:.0f}ms, llm {args.llm_ms:.0f}ms, email {args.email_ms:.0f}ms)")
+
+    results = []
+    previous = None
+    try:
+        for step in steps:
+            server.set_step(step)
+            command = [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(step),
+                       "--url", server.url, "--request-delay", str(args.request_delay)]
+            completed = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+            if completed.returncode != 0:
+                print(f"\n▶ {step_label(step)}: worker failed (exit {completed.returncode})")
+                break
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            result["saturated"] = find_saturated(result, previous)
+            print_report(result)
+            results.append(result)
+            previous = result
+    finally:
+        server.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
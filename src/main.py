@@ -1,66 +1,595 @@
-"""V2EX 每日汇总 - 主程序"""
+"""V2EX 每日汇总 - 主程序
+
+子命令：
+    fetch      抓取帖子，写入快照
+    summarize  读取快照，生成概览和 AI 摘要后写回
+    rss        读取快照，生成 RSS feed
+    email      读取快照，发送邮件
+    run        完整流程（默认）
+    render     只渲染：读取快照生成 RSS 和邮件 HTML（写入磁盘，不发送）
+    worker     任务队列模式：领取并执行抓取 / 摘要任务
+    coordinate 任务队列模式：分发任务，汇总结果后生成 RSS 并发送邮件
+    profile-imports  测量各阶段模块的冷启动导入耗时
+
+各阶段模块（以及 openai / resend SDK）只在对应阶段执行时才导入。
+"""
+import argparse
 import os
-from scraper import fetch_all_nodes
-from summarizer import summarize_topics, generate_daily_overview, get_client
-from email_sender import send_email
-from rss_generator import generate_rss
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
 
+from artifacts import reset as reset_artifacts, save_manifest, write_if_changed
+from profiling import profiled
+from resilience import start_run
+from snapshot import load_snapshot, save_snapshot
 
-def main():
-    # 收件人邮箱
-    to_email = os.environ.get("TO_EMAIL")
-    if not to_email:
-        print("Error: TO_EMAIL environment variable not set")
-        exit(1)
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(SRC_DIR, "..", "output")
+RSS_OUTPUT = os.path.join(OUTPUT_DIR, "v2ex-digest.xml")
+STATS_RSS_OUTPUT = os.path.join(OUTPUT_DIR, "v2ex-stats.xml")
+DEFAULT_SNAPSHOT_PATH = os.path.join(OUTPUT_DIR, "digest-snapshot.json.gz")
+DEFAULT_RENDER_DIR = os.path.join(OUTPUT_DIR, "render")
+DEFAULT_QUEUE_PATH = os.path.join(OUTPUT_DIR, "work-queue.db")
+
+# 各阶段需要导入的模块（用于导入耗时分析）
+STAGE_MODULES = {
+    "cli": ["main"],
+    "fetch": ["scraper"],
+    "summarize": ["summarizer", "openai"],
+    "rss": ["rss_generator"],
+    "email": ["email_sender", "resend"],
+}
+
+# 默认冷启动导入预算（毫秒），只约束 CLI 本身
+DEFAULT_IMPORT_BUDGET_MS = 150
 
-    print("=" * 50)
-    print("V2EX Daily Digest")
-    print("=" * 50)
 
-    # 1. 抓取所有节点
+def count_topics(all_data: Dict[str, Dict]) -> int:
+    return sum(len(data["topics"]) for data in all_data.values())
+
+
+@profiled("fetch")
+def stage_fetch() -> Dict[str, Dict]:
+    """抓取所有节点"""
+    from scraper import fetch_all_nodes
+
     print("\n📡 Fetching topics from V2EX...")
     all_data = fetch_all_nodes()
+    print(f"\n📊 Total topics found: {count_topics(all_data)}")
+    return all_data
 
-    # 统计
-    total = sum(len(data["topics"]) for data in all_data.values())
-    print(f"\n📊 Total topics found: {total}")
 
-    if total == 0:
-        print("No new topics in the last 48 hours. Skipping email.")
-        return
+def stage_trending(all_data: Dict[str, Dict]) -> List[Dict]:
+    """记录回复数快照，返回正在升温的帖子"""
+    from trending import update_trending, node_velocity
+
+    print("\n📈 Updating reply trends...")
+    rising = update_trending(all_data)
+    for topic in rising:
+        print(f"  {topic['velocity']:6.1f}/h  {topic['title'][:30]}")
+    for node_name, velocity in sorted(node_velocity(all_data).items(), key=lambda x: -x[1])[:3]:
+        print(f"  node {node_name}: {velocity:.1f}/h")
+    return rising
+
+
+def stage_stats(all_data: Dict[str, Dict]):
+    """把本次帖子计入跨运行的节点 / 作者统计，返回 StatsStore"""
+    from stats import update_stats
+
+    print("\n📊 Updating node and author stats...")
+    return update_stats(all_data)
+
+
+def load_stats():
+    """只读加载已有统计（从快照渲染时使用）"""
+    from stats import StatsStore
+
+    return StatsStore()
+
+
+def stage_overview(all_data: Dict[str, Dict], rising: Optional[List[Dict]] = None) -> str:
+    """基于热门帖子（和上升榜）生成今日概览"""
+    from summarizer import generate_daily_overview, get_client
 
-    # 2. 生成今日概览
     print("\n💬 Generating daily overview...")
     daily_overview = ""
     hot_topics = all_data.get("_hot", {}).get("topics", [])
     client = get_client()
     if client and hot_topics:
-        daily_overview = generate_daily_overview(client, hot_topics)
+        daily_overview = generate_daily_overview(client, hot_topics, rising)
         if daily_overview:
             print(f"  Overview: {daily_overview[:50]}...")
+    return daily_overview
+
+
+@profiled("summarize")
+def stage_summarize(all_data: Dict[str, Dict], rising: Optional[List[Dict]] = None) -> str:
+    """生成今日概览和 AI 摘要（原地更新 all_data），返回概览"""
+    from summarizer import summarize_node
+
+    daily_overview = stage_overview(all_data, rising)
 
-    # 3. AI 摘要（区分热门和普通帖子）
+    # AI 摘要（按节点策略的摘要档位：详细 / 简短 / 不摘要）
     print("\n🤖 Generating AI summaries...")
     for node_name, data in all_data.items():
-        if data["topics"]:
-            # 热门帖子用更详细的摘要
-            is_hot = (node_name == "_hot")
-            data["topics"] = summarize_topics(data["topics"], is_hot=is_hot)
+        data["topics"] = summarize_node(node_name, data)
+
+    return daily_overview
+
+
+@profiled("rss")
+def stage_rss(all_data: Dict[str, Dict], stats=None) -> bool:
+    """生成 RSS feed（传入 stats 时同时生成统计 feed）"""
+    from rss_generator import generate_rss, generate_stats_rss
+    from variants import get_variants
 
-    # 4. 生成 RSS feed
     print("\n📰 Generating RSS feed...")
-    rss_output = os.path.join(os.path.dirname(__file__), "..", "output", "v2ex-digest.xml")
-    generate_rss(all_data, rss_output)
+    success = generate_rss(all_data, RSS_OUTPUT)
+    for variant in get_variants()[1:]:
+        generate_rss(all_data, os.path.join(OUTPUT_DIR, f"v2ex-digest-{variant}.xml"), variant=variant)
+    if stats is not None:
+        generate_stats_rss(stats, STATS_RSS_OUTPUT)
+    return success
+
+
+@profiled("archive")
+def stage_archive(all_data: Dict[str, Dict], daily_overview: str = "", output_dir: str = OUTPUT_DIR) -> bool:
+    """更新静态网页归档（当天 JSON + 索引分片）"""
+    from web_generator import generate_archive
+
+    print("\n🗄️ Updating web archive...")
+    return generate_archive(all_data, output_dir, daily_overview)
+
+
+@profiled("email")
+def stage_email(to_email: str, all_data: Dict[str, Dict], daily_overview: str = "",
+                rising: Optional[List[Dict]] = None, stats=None) -> bool:
+    """发送邮件
+
+    其他摘要变体发送给 TO_EMAIL_<变体名>（如 TO_EMAIL_EN），未设置则不发送
+    """
+    from email_sender import send_email
+    from variants import get_variants
 
-    # 5. 发送邮件
     print(f"\n📧 Sending email to {to_email}...")
-    success = send_email(to_email, all_data, daily_overview=daily_overview)
+    success = send_email(to_email, all_data, daily_overview=daily_overview, rising=rising, stats=stats)
+    for variant in get_variants()[1:]:
+        variant_email = os.environ.get(f"TO_EMAIL_{variant.upper()}")
+        if variant_email:
+            print(f"\n📧 Sending {variant} email to {variant_email}...")
+            success = send_email(variant_email, all_data, daily_overview=daily_overview,
+                                 rising=rising, stats=stats, variant=variant) and success
+    return success
+
+
+@profiled("render")
+def stage_render(all_data: Dict[str, Dict], daily_overview: str, out_dir: str,
+                 rising: Optional[List[Dict]] = None, stats=None) -> Dict[str, float]:
+    """只渲染：生成 RSS 和邮件 HTML 并写入 out_dir，不发送邮件
+
+    返回: 各渲染阶段耗时（秒）
+    """
+    from rss_generator import generate_rss, generate_stats_rss
+    from email_sender import generate_html_email
+    from variants import get_variants
+    from web_generator import generate_archive
+
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    timings = {}
+
+    start = time.perf_counter()
+    generate_rss(all_data, os.path.join(out_dir, "v2ex-digest.xml"))
+    if stats is not None:
+        generate_stats_rss(stats, os.path.join(out_dir, "v2ex-stats.xml"))
+    timings["rss"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    html = generate_html_email(all_data, daily_overview, rising, stats=stats)
+    timings["email"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generate_archive(all_data, out_dir, daily_overview)
+    timings["archive"] = time.perf_counter() - start
+
+    html_path = os.path.join(out_dir, "email.html")
+    write_if_changed(html_path, html)
+    print(f"✅ Email HTML written: {html_path} ({len(html.encode('utf-8'))} bytes)")
+
+    # 其他摘要变体（不计入耗时）
+    for variant in get_variants()[1:]:
+        generate_rss(all_data, os.path.join(out_dir, f"v2ex-digest-{variant}.xml"), variant=variant)
+        html = generate_html_email(all_data, daily_overview, rising, stats=stats, variant=variant)
+        html_path = os.path.join(out_dir, f"email-{variant}.html")
+        write_if_changed(html_path, html)
+        print(f"✅ Email HTML written: {html_path} ({len(html.encode('utf-8'))} bytes)")
+    return timings
+
+
+def stage_publish(output_dir: str = OUTPUT_DIR) -> bool:
+    """更新输出目录的 manifest，返回本次是否有文件变化
+
+    在 GitHub Actions 中同时写入 changed=true/false 到 GITHUB_OUTPUT，供部署步骤判断
+    """
+    print("\n🗂️ Checking generated files...")
+    changed = save_manifest(output_dir)
+    if not changed:
+        print("  No generated files changed")
+
+    github_output = os.environ.get("GITHUB_OUTPUT")
+    if github_output:
+        with open(github_output, "a", encoding="utf-8") as f:
+            f.write(f"changed={'true' if changed else 'false'}\n")
+    return changed
+
+
+def run_digest(to_email: str, snapshot_path: str = "", dry_run: bool = False) -> bool:
+    """执行一次完整流程：抓取 → 摘要 → RSS → 邮件
+
+    Args:
+        to_email: 收件人邮箱
+        snapshot_path: 摘要完成后保存快照的路径，为空则不保存
+        dry_run: 只把邮件 HTML 写入磁盘，不发送
+
+    返回: 是否成功（没有新帖子时也视为成功）
+    """
+    print("=" * 50)
+    print("V2EX Daily Digest")
+    print("=" * 50)
+    start_run()
+    reset_artifacts()
+
+    all_data = stage_fetch()
+    if count_topics(all_data) == 0:
+        print("No new topics in the last 48 hours. Skipping email.")
+        return True
+
+    rising = stage_trending(all_data)
+    stats = stage_stats(all_data)
+    daily_overview = stage_summarize(all_data, rising)
+    if snapshot_path:
+        size = save_snapshot(snapshot_path, all_data, daily_overview, rising)
+        print(f"💾 Snapshot saved: {snapshot_path} ({size} bytes)")
+
+    if dry_run:
+        stage_render(all_data, daily_overview, DEFAULT_RENDER_DIR, rising, stats)
+        return True
+
+    stage_rss(all_data, stats)
+    stage_archive(all_data, daily_overview)
+    success = stage_email(to_email, all_data, daily_overview, rising, stats)
 
     if success:
         print("\n✅ Done!")
     else:
         print("\n❌ Failed to send email")
+    return success
+
+
+@profiled("stream")
+def run_digest_streaming(to_email: str, dry_run: bool = False) -> bool:
+    """流式流程：每个节点依次 抓取 → 摘要 → 追加 RSS → 渲染邮件片段，处理完即丢弃
+
+    邮件片段暂存在临时文件中，内存里只保留节点名和总数所需的少量字段，
+    峰值内存不随节点数增长。适合 V2EX_NODES 配置了大量节点的场景。
+
+    统计逐个节点累加；回复趋势（正在升温）、摘要变体和网页归档需要全部节点的数据，
+    流式模式下不生成，启动时会打印提示。
+    """
+    from scraper import iter_nodes
+    from stats import StatsStore
+    from summarizer import summarize_node, generate_daily_overview, get_client
+    from rss_generator import (
+        DEFAULT_MAX_ITEMS, create_channel, append_item, select_items, write_rss, generate_stats_rss,
+    )
+    from email_sender import (
+        EMAIL_BUDGET_BYTES, EMAIL_CSS, render_email_header, render_hot_section,
+        render_node_section, render_overflow_section, render_stats_section, render_email_footer,
+        finalize_email, send_html_email,
+    )
+    from variants import get_variants
+
+    print("=" * 50)
+    print("V2EX Daily Digest (streaming)")
+    print("=" * 50)
+    skipped_features = ["reply trends", "web archive"]
+    if len(get_variants()) > 1:
+        skipped_features.append("summary variants (only the primary variant is generated)")
+    print(f"⚠️ Streaming mode skips: {', '.join(skipped_features)}")
+    start_run()
+    reset_artifacts()
+
+    client = get_client()
+    stats = StatsStore()
+    rss, channel = create_channel()
+    rss_topics = []  # 按节点顺序最多保留 DEFAULT_MAX_ITEMS 条，全部节点处理完后再排序写入
+    daily_overview = ""
+    node_names = []
+    skipped = []  # 超出邮件预算、折叠为 RSS 链接的节点
+    total = 0
+    total_in_email = 0
+    # 邮件片段预算（扣除样式、头尾和统计区作者榜的余量）
+    email_budget = EMAIL_BUDGET_BYTES - len(EMAIL_CSS.encode("utf-8")) - 4096 - 2048
+    email_size = 0
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as fragments:
+        for node_name, data in iter_nodes():
+            topics = data["topics"]
+            if not topics:
+                continue
+
+            config = data["config"]
+            is_hot = (node_name == "_hot")
+            if is_hot and client:
+                daily_overview = generate_daily_overview(client, topics)
+            summarize_node(node_name, data)
+            stats.add_topics(node_name, topics)
+            if not is_hot:
+                node_names.append(node_name)
+                # 统计区每个节点一行（"节点: 日均 x 帖 · 回复中位数 y"），按上限预留
+                email_size += len(node_name.encode("utf-8")) + 64
+
+            node_display = f"{config.get('emoji', '📌')} {config.get('title', node_name)}"
+            for topic in topics[:DEFAULT_MAX_ITEMS - len(rss_topics)]:
+                topic["_node_display"] = node_display
+                rss_topics.append(topic)
+
+            if is_hot:
+                fragment = render_hot_section(topics)
+                total_in_email += min(len(topics), 5)
+            else:
+                fragment = render_node_section(node_name, config, topics)
+                fragment_size = len(fragment.encode("utf-8"))
+                if email_size + fragment_size > email_budget:
+                    skipped.append((node_name, node_display, len(topics)))
+                    fragment = ""
+                else:
+                    total_in_email += len(topics)
+            email_size += len(fragment.encode("utf-8"))
+            fragments.write(fragment)
+            total += len(topics)
+
+        print(f"\n📊 Total topics found: {total}")
+        if total == 0:
+            print("No new topics in the last 48 hours. Skipping email.")
+            return True
+
+        stats.prune()
+        stats.save()
+
+        output_dir = DEFAULT_RENDER_DIR if dry_run else OUTPUT_DIR
+        rss_path = os.path.join(output_dir, "v2ex-digest.xml")
+        # 与 generate_rss 相同的选取和排序
+        for topic in select_items(rss_topics):
+            append_item(channel, topic, topic["_node_display"])
+        if write_rss(rss, rss_path):
+            print(f"✅ RSS feed generated: {rss_path} ({len(rss_topics)} items)")
+        else:
+            print(f"✅ RSS feed unchanged: {rss_path}")
+        generate_stats_rss(stats, os.path.join(output_dir, os.path.basename(STATS_RSS_OUTPUT)))
+
+        fragments.seek(0)
+        html = finalize_email(
+            render_email_header(daily_overview) + fragments.read()
+            + render_overflow_section(skipped) + render_stats_section(stats, node_names)
+            + render_email_footer(total_in_email)
+        )
+
+    if dry_run:
+        html_path = os.path.join(output_dir, "email.html")
+        write_if_changed(html_path, html)
+        print(f"✅ Email HTML written: {html_path} ({len(html.encode('utf-8'))} bytes)")
+        return True
+
+    print(f"\n📧 Sending email to {to_email}...")
+    success = send_html_email(to_email, html, total)
+    if success:
+        print("\n✅ Done!")
+    else:
+        print("\n❌ Failed to send email")
+    return success
+
+
+def measure_imports(modules: List[str]) -> Dict:
+    """在全新解释器中导入模块，解析 -X importtime 输出
+
+    返回: {"total_ms": 总耗时, "top": [(模块名, 累计毫秒), ...]}
+    """
+    code = "import " + ", ".join(modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    # 格式: "import time:   self [us] | cumulative | imported package"
+    top_level = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and not match.group(3):
+            top_level.append((match.group(4), int(match.group(2)) / 1000))
+
+    top_level.sort(key=lambda x: x[1], reverse=True)
+    return {"total_ms": sum(ms for _, ms in top_level), "top": top_level[:5]}
+
+
+def profile_imports(budget_ms: float) -> bool:
+    """打印各阶段冷启动导入耗时，CLI 超出预算时返回 False"""
+    within_budget = True
+    for stage, modules in STAGE_MODULES.items():
+        try:
+            result = measure_imports(modules)
+        except RuntimeError as e:
+            print(f"{stage:<10} failed: {e}")
+            continue
+
+        print(f"{stage:<10} {result['total_ms']:8.1f} ms  ({', '.join(modules)})")
+        for name, ms in result["top"]:
+            print(f"    {name:<30} {ms:8.1f} ms")
+
+        if stage == "cli" and result["total_ms"] > budget_ms:
+            print(f"  ⚠️ CLI import time exceeds budget of {budget_ms:.0f} ms")
+            within_budget = False
+    return within_budget
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="V2EX Daily Digest")
+    parser.add_argument("--profile", default="",
+                        help="按阶段剖析：cprofile / sample（可用逗号组合），结果写入 output/profile")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run = subparsers.add_parser("run", help="完整流程：抓取 → 摘要 → RSS → 邮件")
+    run.add_argument("--snapshot", default="", help="摘要完成后保存快照到该路径")
+    run.add_argument("--dry-run", action="store_true", help="邮件 HTML 写入磁盘，不发送")
+    run.add_argument("--stream", action="store_true", help="逐节点流式处理，适合大量节点")
+    run.add_argument("--unchanged-exit-code", type=int, default=0,
+                     help="生成的文件都没有变化时使用的退出码，便于工作流跳过部署")
+    for name, help_text in [
+        ("fetch", "抓取帖子并写入快照"),
+        ("summarize", "为快照生成 AI 摘要"),
+        ("rss", "从快照生成 RSS"),
+        ("email", "从快照发送邮件"),
+    ]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--snapshot", default=DEFAULT_SNAPSHOT_PATH, help="快照文件路径")
+
+    render = subparsers.add_parser("render", help="读取快照，只渲染 RSS 和邮件 HTML")
+    render.add_argument("--snapshot", default=DEFAULT_SNAPSHOT_PATH, help="快照文件路径")
+    render.add_argument("--out-dir", default=DEFAULT_RENDER_DIR, help="渲染结果输出目录")
+
+    worker = subparsers.add_parser("worker", help="领取并执行队列中的任务")
+    worker.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="队列文件路径")
+    worker.add_argument("--idle-exit", type=float, default=60,
+                        help="连续空闲多少秒后退出（<= 0 表示一直运行）")
+
+    coordinator = subparsers.add_parser("coordinate", help="分发任务并汇总结果")
+    coordinator.add_argument("--queue", default=DEFAULT_QUEUE_PATH, help="队列文件路径")
+    coordinator.add_argument("--run-id", default="", help="运行 ID，默认每次新建（UTC 时间 + 进程号）；传入之前的 ID 可续跑，已完成的任务不再执行")
+    coordinator.add_argument("--timeout", type=float, default=3600, help="每个阶段的等待超时（秒）")
+    coordinator.add_argument("--dry-run", action="store_true", help="邮件 HTML 写入磁盘，不发送")
+
+    profile = subparsers.add_parser("profile-imports", help="测量各阶段导入耗时")
+    profile.add_argument(
+        "--budget-ms", type=float,
+        default=float(os.environ.get("DIGEST_IMPORT_BUDGET_MS", DEFAULT_IMPORT_BUDGET_MS)),
+        help="CLI 冷启动导入预算（毫秒）",
+    )
+    return parser
+
+
+def get_to_email() -> str:
+    # 收件人邮箱
+    to_email = os.environ.get("TO_EMAIL")
+    if not to_email:
+        print("Error: TO_EMAIL environment variable not set")
         exit(1)
+    return to_email
+
+
+def main():
+    args = build_parser().parse_args()
+    command = args.command or "run"
+    if command in ("run", "fetch", "coordinate"):
+        # 启动时校验节点配置，配置错误不必等到抓取阶段才发现
+        from config import ConfigError, get_config
+
+        try:
+            get_config()
+        except ConfigError as e:
+            print(f"Error: Invalid node config: {e}")
+            exit(2)
+    if args.profile:
+        from profiling import enable
+
+        enable(args.profile)
+
+    if command == "run":
+        dry_run = getattr(args, "dry_run", False)
+        to_email = "" if dry_run else get_to_email()
+        if getattr(args, "stream", False):
+            success = run_digest_streaming(to_email, dry_run)
+        else:
+            success = run_digest(to_email, getattr(args, "snapshot", ""), dry_run)
+        if not success:
+            exit(1)
+        if not stage_publish(DEFAULT_RENDER_DIR if dry_run else OUTPUT_DIR):
+            exit(getattr(args, "unchanged_exit_code", 0))
+
+    elif command == "fetch":
+        all_data = stage_fetch()
+        rising = stage_trending(all_data)
+        stage_stats(all_data)
+        save_snapshot(args.snapshot, all_data, rising=rising)
+        print(f"💾 Saved: {args.snapshot}")
+
+    elif command == "summarize":
+        all_data, _, rising = load_snapshot(args.snapshot)
+        daily_overview = stage_summarize(all_data, rising)
+        save_snapshot(args.snapshot, all_data, daily_overview, rising)
+        print(f"💾 Saved: {args.snapshot}")
+
+    elif command == "rss":
+        all_data, _, _ = load_snapshot(args.snapshot)
+        if not stage_rss(all_data, load_stats()):
+            exit(1)
+        stage_publish(OUTPUT_DIR)
+
+    elif command == "email":
+        to_email = get_to_email()
+        all_data, daily_overview, rising = load_snapshot(args.snapshot)
+        if not stage_email(to_email, all_data, daily_overview, rising, load_stats()):
+            exit(1)
+
+    elif command == "render":
+        start = time.perf_counter()
+        all_data, daily_overview, rising = load_snapshot(args.snapshot)
+        load_time = time.perf_counter() - start
+        timings = stage_render(all_data, daily_overview, args.out_dir, rising, load_stats())
+        save_manifest(args.out_dir)
+        print(f"⏱️ load {load_time * 1000:.1f} ms · rss {timings['rss'] * 1000:.1f} ms"
+              f" · email {timings['email'] * 1000:.1f} ms · archive {timings['archive'] * 1000:.1f} ms")
+
+    elif command == "worker":
+        from work_queue import run_worker
+
+        run_worker(args.queue, args.idle_exit)
+
+    elif command == "coordinate":
+        from work_queue import coordinate
+
+        to_email = "" if args.dry_run else get_to_email()
+        start_run()
+        reset_artifacts()
+        run_id = args.run_id or f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{os.getpid()}"
+        all_data = coordinate(args.queue, run_id, args.timeout)
+        if all_data is None:
+            exit(1)
+        if count_topics(all_data) == 0:
+            print("No new topics in the last 48 hours. Skipping email.")
+            return
+
+        rising = stage_trending(all_data)
+        stats = stage_stats(all_data)
+        daily_overview = stage_overview(all_data, rising)
+        if args.dry_run:
+            stage_render(all_data, daily_overview, DEFAULT_RENDER_DIR, rising, stats)
+            stage_publish(DEFAULT_RENDER_DIR)
+            return
+        stage_rss(all_data, stats)
+        stage_archive(all_data, daily_overview)
+        stage_publish(OUTPUT_DIR)
+        if not stage_email(to_email, all_data, daily_overview, rising, stats):
+            exit(1)
+
+    elif command == "profile-imports":
+        if not profile_imports(args.budget_ms):
+            exit(1)
 
 
 if __name__ == "__main__":
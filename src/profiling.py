@@ -0,0 +1,176 @@
+"""按阶段的性能剖析（默认关闭）
+
+DIGEST_PROFILE 或命令行 --profile 开启，取值（可用逗号组合）：
+- cprofile：用 cProfile 记录每个阶段，写入 <阶段>.prof（可用 snakeviz / pstats 查看）
+- sample：采样调用栈（默认每 5ms 一次），写入 <阶段>.collapsed（折叠栈格式，
+  可直接交给 flamegraph.pl / speedscope 生成火焰图）；同时用 tracemalloc
+  记录内存分配，写入 <阶段>.mem.txt
+
+结果写入 DIGEST_PROFILE_DIR（默认 output/profile）。
+关闭时被包装的阶段只多一次集合判断，没有额外开销。
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Optional, Set
+
+PROFILE_MODES = {"cprofile", "sample"}
+
+PROFILE_DIR = os.environ.get(
+    "DIGEST_PROFILE_DIR", os.path.join(os.path.dirname(__file__), "..", "output", "profile")
+)
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = float(os.environ.get("DIGEST_PROFILE_INTERVAL", "0.005"))
+
+# 内存报告中列出的分配位置数
+MEMORY_TOP = 15
+
+
+def _parse_modes(value: str) -> Set[str]:
+    modes = set()
+    for mode in value.split(","):
+        mode = mode.strip().lower()
+        if not mode:
+            continue
+        if mode not in PROFILE_MODES:
+            print(f"Warning: Unknown profile mode '{mode}', expected one of {sorted(PROFILE_MODES)}")
+            continue
+        modes.add(mode)
+    return modes
+
+
+_modes: Set[str] = _parse_modes(os.environ.get("DIGEST_PROFILE", ""))
+
+
+def enable(value: str):
+    """开启剖析（命令行 --profile 使用）"""
+    global _modes
+    _modes = _parse_modes(value)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """后台线程定期采样调用栈，统计折叠栈出现次数
+
+    只采样启动采样的线程和采样期间新建的线程（如摘要变体的线程池），
+    忽略常驻模式下空闲的 HTTP 服务线程等
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ignored: Set[int] = set()
+
+    def start(self):
+        current = threading.get_ident()
+        self._ignored = {ident for ident in sys._current_frames() if ident != current}
+        self._thread = threading.Thread(target=self._run, name="digest-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me or ident in self._ignored:
+                    continue
+                stack = []
+                # 阶段线程只保留被剖析函数以下的帧
+                while frame is not None and frame.f_code is not _run_profiled.__code__:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str, root: str = ""):
+        """写出折叠栈文件：每行 "帧;帧;帧 次数"，root 作为最外层帧"""
+        prefix = f"{root};" if root else ""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{prefix}{stack} {count}\n")
+
+
+def _write_memory_report(path: str, snapshot, peak: int):
+    stats = snapshot.statistics("lineno")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"peak traced memory: {peak / 1024:.1f} KB\n\n")
+        for stat in stats[:MEMORY_TOP]:
+            frame = stat.traceback[0]
+            f.write(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  "
+                    f"{frame.filename}:{frame.lineno}\n")
+
+
+def _run_profiled(stage: str, fn: Callable, args, kwargs):
+    if not os.path.exists(PROFILE_DIR):
+        os.makedirs(PROFILE_DIR)
+    base = os.path.join(PROFILE_DIR, stage)
+
+    profiler = sampler = None
+    tracing = False
+    if "cprofile" in _modes:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    if "sample" in _modes:
+        import tracemalloc
+
+        sampler = StackSampler()
+        tracing = not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        sampler.start()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if profiler:
+        profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        if profiler:
+            profiler.disable()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        outputs = []
+
+        if profiler:
+            profiler.dump_stats(base + ".prof")
+            outputs.append(base + ".prof")
+        if sampler:
+            import tracemalloc
+
+            sampler.stop()
+            sampler.write_collapsed(base + ".collapsed", root=stage)
+            _, peak = tracemalloc.get_traced_memory()
+            _write_memory_report(base + ".mem.txt", tracemalloc.take_snapshot(), peak)
+            if tracing:
+                tracemalloc.stop()
+            outputs += [base + ".collapsed", base + ".mem.txt"]
+
+        print(f"⏱️ profile {stage}: {wall:.2f}s wall, {cpu:.2f}s cpu → {', '.join(outputs)}")
+
+
+def profiled(stage: str):
+    """装饰器：剖析开启时记录被装饰阶段的耗时、调用栈和内存"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _modes:
+                return fn(*args, **kwargs)
+            return _run_profiled(stage, fn, args, kwargs)
+        return wrapper
+    return decorator
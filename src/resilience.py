@@ -0,0 +1,212 @@
+"""重试与熔断 - 抓取、摘要、邮件共用
+
+- 指数退避 + 全抖动（full jitter）
+- 截止时间传递：每次尝试的超时不超过剩余时间，超时后不再重试
+- 每个后端一个熔断器：连续失败达到阈值后熔断，冷却期内的调用直接失败，
+  调用方立即走降级逻辑；冷却期结束放行一次试探调用，成功即恢复
+"""
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 可重试的 HTTP 状态码
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# 熔断默认参数：连续失败次数、冷却时间（秒）
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 120
+
+
+class CircuitOpenError(Exception):
+    """后端已熔断，调用被直接拒绝"""
+
+
+class DeadlineExceeded(Exception):
+    """已超过截止时间"""
+
+
+class CircuitBreaker:
+    """单个后端的熔断器（线程安全）"""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self.lock:
+            return (self.opened_at is not None
+                    and time.monotonic() - self.opened_at < self.reset_timeout)
+
+    def allow(self) -> bool:
+        """是否放行本次调用；冷却期结束后只放行一个试探调用"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def release(self):
+        """结束试探调用但不计成功或失败（调用方自身的错误、被中断等），下一次调用可以重新试探"""
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    print(f"      ⚡ Circuit '{self.name}' opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+# 本次运行的整体截止时间（time.monotonic()），None 表示不限制
+_run_deadline: Optional[float] = None
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取（或创建）指定后端的熔断器"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def start_run(budget_seconds: Optional[float] = None):
+    """开始一次运行：重置整体截止时间
+
+    budget_seconds 为空时读取 DIGEST_RUN_BUDGET_SECONDS，都未设置则不限制
+    """
+    global _run_deadline
+    if budget_seconds is None:
+        env = os.environ.get("DIGEST_RUN_BUDGET_SECONDS")
+        budget_seconds = float(env) if env else None
+    _run_deadline = time.monotonic() + budget_seconds if budget_seconds else None
+
+
+def deadline_in(seconds: float) -> float:
+    """seconds 秒之后的截止时间"""
+    return time.monotonic() + seconds
+
+
+def _effective_deadline(deadline: Optional[float]) -> Optional[float]:
+    candidates = [d for d in (deadline, _run_deadline) if d is not None]
+    return min(candidates) if candidates else None
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_transport_error(error: Exception) -> bool:
+    """网络层错误：超时、连接失败、DNS 解析失败，以及 requests 的网络异常
+
+    不把所有 OSError 都算进来：磁盘写满、权限不足（如 HTTP 缓存写失败）重试也不会好，
+    还会把后端的熔断器打开。requests 未被导入时不可能抛出它的异常，不为判断而导入
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, socket.gaierror)):
+        return True
+    requests = sys.modules.get("requests")
+    # InvalidURL、MissingSchema 等参数错误同时是 ValueError，不重试
+    return (requests is not None and isinstance(error, requests.RequestException)
+            and not isinstance(error, ValueError))
+
+
+def is_retryable(error: Exception) -> bool:
+    """限流、超时、连接错误和 5xx 可以重试，其他错误（如 4xx、本地 I/O 错误）直接失败"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if _is_transport_error(error):
+        return True
+    if isinstance(error, OSError):
+        return False
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name or "RateLimit" in name
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """第 attempt 次失败后的等待时间（全抖动）"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retry(fn: Callable[[float], T], backend: str, max_attempts: int = 3,
+                    timeout: float = 30, base_delay: float = 1, max_delay: float = 30,
+                    deadline: Optional[float] = None) -> T:
+    """带重试、截止时间和熔断的调用
+
+    Args:
+        fn: 被调用的函数，参数为本次尝试可用的超时（秒）
+        backend: 后端名称，同名后端共享一个熔断器
+        max_attempts: 最多尝试次数
+        timeout: 单次尝试的超时上限
+        base_delay / max_delay: 退避基数和上限
+        deadline: 截止时间（time.monotonic()），与本次运行的整体截止时间取较早者
+
+    Raises:
+        CircuitOpenError: 后端已熔断
+        DeadlineExceeded: 没有剩余时间
+        其他异常: 不可重试的错误，或重试次数用尽后的最后一个错误
+    """
+    breaker = get_breaker(backend)
+    deadline = _effective_deadline(deadline)
+
+    for attempt in range(max_attempts):
+        # 先检查截止时间再申请放行，避免占用试探名额后直接退出
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"{backend} call deadline exceeded")
+
+        if not breaker.allow():
+            raise CircuitOpenError(f"{backend} circuit is open")
+
+        try:
+            result = fn(timeout if remaining is None else min(timeout, remaining))
+        except Exception as e:
+            if not is_retryable(e):
+                # 调用方自身的问题（如参数错误）不计入后端故障，也不能让熔断器恢复
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if attempt == max_attempts - 1:
+                raise
+
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            print(f"      Retrying {backend} in {delay:.1f}s ({type(e).__name__})")
+            time.sleep(delay)
+        except BaseException:
+            # 被中断（KeyboardInterrupt 等）时释放试探名额
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            return result
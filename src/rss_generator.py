@@ -1,14 +1,136 @@
 """V2EX RSS Feed 生成器"""
-import os
 from datetime import datetime
 from email.utils import formatdate
 from xml.etree.ElementTree import Element, SubElement, ElementTree, tostring
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import time
 
+from artifacts import write_if_changed
+from timeutil import TZ, created_ts
+from variants import VARIANTS, select_variant
+
+# feed 默认最大条目数
+DEFAULT_MAX_ITEMS = 30
+
+# feed 发布地址
+FEED_URL = "https://zero469.github.io/v2ex-daily-digest/v2ex-digest.xml"
+STATS_FEED_URL = "https://zero469.github.io/v2ex-daily-digest/v2ex-stats.xml"
+
+
+def variant_feed_url(variant: Optional[str] = None) -> str:
+    """摘要变体 feed 的发布地址（主变体为 FEED_URL）"""
+    return FEED_URL.replace(".xml", f"-{variant}.xml") if variant else FEED_URL
+
+
+def create_channel(channel_title: str = "V2EX 每日汇总",
+                   channel_description: str = "V2EX 精选帖子每日摘要 - 自动抓取热门内容，AI 智能总结",
+                   self_url: str = FEED_URL) -> Tuple[Element, Element]:
+    """创建 RSS 根元素和带元信息的 channel，返回 (rss, channel)"""
+    rss = Element("rss", version="2.0")
+    rss.set("xmlns:atom", "http://www.w3.org/2005/Atom")
+    
+    channel = SubElement(rss, "channel")
+    
+    # 频道元信息
+    title = SubElement(channel, "title")
+    title.text = channel_title
+    
+    link = SubElement(channel, "link")
+    link.text = "https://www.v2ex.com"
+    
+    description = SubElement(channel, "description")
+    description.text = channel_description
+    
+    language = SubElement(channel, "language")
+    language.text = "zh-cn"
+    
+    # 最后构建时间
+    last_build = SubElement(channel, "lastBuildDate")
+    last_build.text = formatdate(time.time(), usegmt=True)
+    
+    # 生成器信息
+    generator = SubElement(channel, "generator")
+    generator.text = "V2EX Daily Digest RSS Generator"
+    
+    # Atom self link (RSS 最佳实践)
+    atom_link = SubElement(channel, "{http://www.w3.org/2005/Atom}link")
+    atom_link.set("href", self_url)
+    atom_link.set("rel", "self")
+    atom_link.set("type", "application/rss+xml")
+    
+    return rss, channel
+
+
+def append_item(channel: Element, topic: Dict, node_display: str):
+    """向 channel 追加一个帖子 item"""
+    item = SubElement(channel, "item")
+    
+    # 标题：带节点前缀
+    item_title = SubElement(item, "title")
+    item_title.text = f"[{node_display}] {topic.get('title', '无标题')}"
+    
+    # 链接
+    item_link = SubElement(item, "link")
+    item_link.text = topic.get("url", "")
+    
+    # 描述：使用 AI 摘要或原标题
+    item_desc = SubElement(item, "description")
+    summary = topic.get("summary", "")
+    if summary:
+        # 使用 CDATA 包裹，避免 HTML 字符问题
+        item_desc.text = summary
+    else:
+        # 如果没有摘要，显示基本信息
+        author = topic.get("author", "unknown")
+        replies = topic.get("replies", 0)
+        item_desc.text = f"作者: {author} | 回复数: {replies}"
+    
+    # GUID (唯一标识)
+    item_guid = SubElement(item, "guid", isPermaLink="true")
+    item_guid.text = topic.get("url", "")
+    
+    # 发布时间（epoch 直接转 RFC 822，不依赖运行环境时区）
+    # 没有时间时不输出 pubDate（可选字段），不能用当前时间，否则每次运行内容哈希都会变
+    ts = created_ts(topic)
+    if ts:
+        SubElement(item, "pubDate").text = formatdate(ts, usegmt=True)
+    
+    # 作者
+    if topic.get("author"):
+        item_author = SubElement(item, "author")
+        item_author.text = topic.get("author")
+
+
+def write_rss(rss: Element, output_path: str) -> bool:
+    """格式化并写入 RSS 文件，返回内容是否有变化
+    
+    除 lastBuildDate 外内容不变时不重写文件
+    """
+    # 手动生成 XML 声明和格式化
+    xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
+    xml_content += _pretty_xml(rss)
+    
+    return write_if_changed(output_path, xml_content)
+
+
+def select_items(topics: List[Dict], max_items: int = DEFAULT_MAX_ITEMS,
+                 window_hours: Optional[float] = None) -> List[Dict]:
+    """从按节点优先级（热门在前）排列的帖子中选出 feed 条目
+    
+    先做时间窗口过滤，取前 max_items 条，再按发布时间倒序输出。
+    批量和流式流程共用，保证两者生成的 feed 一致
+    """
+    if window_hours is not None:
+        cutoff = time.time() - window_hours * 3600
+        topics = [t for t in topics if created_ts(t) >= cutoff]
+    selected = topics[:max_items]
+    selected.sort(key=created_ts, reverse=True)
+    return selected
+
 
 def generate_rss(all_data: Dict[str, Dict], output_path: str = "output/v2ex-digest.xml", 
-                 max_items: int = 30) -> bool:
+                 max_items: int = DEFAULT_MAX_ITEMS, window_hours: Optional[float] = None,
+                 variant: Optional[str] = None) -> bool:
     """
     生成 RSS 2.0 格式的 feed 文件
     
@@ -24,43 +146,21 @@ def generate_rss(all_data: Dict[str, Dict], output_path: str = "output/v2ex-dige
             }
         output_path: RSS 文件输出路径
         max_items: 最大条目数限制
+        window_hours: 只保留最近多少小时内发布的帖子，None 表示不限制
+        variant: 使用哪个摘要变体（见 variants.py），None 表示主变体
         
     Returns:
         bool: 是否成功生成
     """
     try:
-        # 创建 RSS 根元素
-        rss = Element("rss", version="2.0")
-        rss.set("xmlns:atom", "http://www.w3.org/2005/Atom")
-        
-        channel = SubElement(rss, "channel")
-        
-        # 频道元信息
-        title = SubElement(channel, "title")
-        title.text = "V2EX 每日汇总"
-        
-        link = SubElement(channel, "link")
-        link.text = "https://www.v2ex.com"
-        
-        description = SubElement(channel, "description")
-        description.text = "V2EX 精选帖子每日摘要 - 自动抓取热门内容，AI 智能总结"
-        
-        language = SubElement(channel, "language")
-        language.text = "zh-cn"
-        
-        # 最后构建时间
-        last_build = SubElement(channel, "lastBuildDate")
-        last_build.text = formatdate(time.time(), usegmt=True)
-        
-        # 生成器信息
-        generator = SubElement(channel, "generator")
-        generator.text = "V2EX Daily Digest RSS Generator"
-        
-        # Atom self link (RSS 最佳实践)
-        atom_link = SubElement(channel, "{http://www.w3.org/2005/Atom}link")
-        atom_link.set("href", "https://zero469.github.io/v2ex-daily-digest/v2ex-digest.xml")
-        atom_link.set("rel", "self")
-        atom_link.set("type", "application/rss+xml")
+        if variant:
+            all_data = select_variant(all_data, variant)
+            rss, channel = create_channel(
+                f"V2EX 每日汇总 ({VARIANTS[variant]['label']})",
+                self_url=variant_feed_url(variant),
+            )
+        else:
+            rss, channel = create_channel()
         
         # 收集所有帖子并生成 items
         all_topics = []
@@ -75,80 +175,76 @@ def generate_rss(all_data: Dict[str, Dict], output_path: str = "output/v2ex-dige
                 topic["_node_display"] = f"{node_emoji} {node_title}"
                 all_topics.append(topic)
         
-        # 按创建时间排序（如果有的话），限制数量
-        # 注意：created 可能是字符串格式 "2024-01-01 08:00"
-        all_topics = all_topics[:max_items]
+        all_topics = select_items(all_topics, max_items, window_hours)
         
         # 生成 RSS items
         for topic in all_topics:
-            item = SubElement(channel, "item")
-            
-            # 标题：带节点前缀
-            item_title = SubElement(item, "title")
-            node_display = topic.get("_node_display", "")
-            item_title.text = f"[{node_display}] {topic.get('title', '无标题')}"
-            
-            # 链接
-            item_link = SubElement(item, "link")
-            item_link.text = topic.get("url", "")
-            
-            # 描述：使用 AI 摘要或原标题
-            item_desc = SubElement(item, "description")
-            summary = topic.get("summary", "")
-            if summary:
-                # 使用 CDATA 包裹，避免 HTML 字符问题
-                item_desc.text = summary
-            else:
-                # 如果没有摘要，显示基本信息
-                author = topic.get("author", "unknown")
-                replies = topic.get("replies", 0)
-                item_desc.text = f"作者: {author} | 回复数: {replies}"
-            
-            # GUID (唯一标识)
-            item_guid = SubElement(item, "guid", isPermaLink="true")
-            item_guid.text = topic.get("url", "")
-            
-            # 发布时间
-            item_pub_date = SubElement(item, "pubDate")
-            created = topic.get("created", "")
-            if created:
-                try:
-                    # 尝试解析时间字符串
-                    if isinstance(created, str):
-                        dt = datetime.strptime(created, "%Y-%m-%d %H:%M")
-                    else:
-                        dt = datetime.now()
-                    item_pub_date.text = formatdate(dt.timestamp(), usegmt=True)
-                except (ValueError, TypeError):
-                    item_pub_date.text = formatdate(time.time(), usegmt=True)
-            else:
-                item_pub_date.text = formatdate(time.time(), usegmt=True)
-            
-            # 作者
-            if topic.get("author"):
-                item_author = SubElement(item, "author")
-                item_author.text = topic.get("author")
+            append_item(channel, topic, topic.get("_node_display", ""))
         
-        # 确保输出目录存在
-        output_dir = os.path.dirname(output_path)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        if write_rss(rss, output_path):
+            print(f"✅ RSS feed generated: {output_path} ({len(all_topics)} items)")
+        else:
+            print(f"✅ RSS feed unchanged: {output_path}")
+        return True
         
-        # 写入文件
-        tree = ElementTree(rss)
+    except Exception as e:
+        print(f"❌ Failed to generate RSS feed: {e}")
+        return False
+
+
+def generate_stats_rss(stats, output_path: str = "output/v2ex-stats.xml", days: int = 14) -> bool:
+    """生成统计 feed：每天一条，包含各节点帖子数、当天活跃作者和滚动窗口统计
+    
+    Args:
+        stats: stats.StatsStore
+        output_path: RSS 文件输出路径
+        days: 输出最近多少天
+    """
+    from stats import WINDOWS
+    
+    try:
+        rss, channel = create_channel(
+            "V2EX 每日统计", "V2EX 各节点发帖量、回复中位数与活跃作者", STATS_FEED_URL
+        )
         
-        # 手动生成 XML 声明和格式化
-        xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        xml_content += _pretty_xml(rss)
+        # 滚动窗口统计对所有条目相同，只计算一次
+        window_lines = []
+        for window in WINDOWS:
+            authors = stats.top_authors(days=window, limit=5)
+            if authors:
+                names = "、".join(f"{name}({count})" for name, count in authors)
+                window_lines.append(f"近 {window} 天活跃作者：{names}")
         
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(xml_content)
+        for day in sorted(stats.days, reverse=True)[:days]:
+            summary = stats.daily_summary(day)
+            nodes = sorted(summary["nodes"].items(), key=lambda x: x[1], reverse=True)
+            node_lines = []
+            for node, count in nodes:
+                node_stat = stats.node_stats(node, days=7)
+                node_lines.append(
+                    f"{node}: {count} 帖（近 7 天日均 {node_stat['daily_volume']}，"
+                    f"回复中位数 {node_stat['median_replies']:g}）"
+                )
+            authors = "、".join(f"{name}({count})" for name, count in summary["authors"])
+            
+            item = SubElement(channel, "item")
+            SubElement(item, "title").text = f"V2EX 统计 {day}"
+            SubElement(item, "link").text = "https://www.v2ex.com"
+            SubElement(item, "description").text = "\n".join(
+                node_lines + [f"当天活跃作者：{authors}"] + window_lines
+            )
+            SubElement(item, "guid", isPermaLink="false").text = f"v2ex-stats-{day}"
+            pub_ts = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=TZ).timestamp()
+            SubElement(item, "pubDate").text = formatdate(pub_ts, usegmt=True)
         
-        print(f"✅ RSS feed generated: {output_path} ({len(all_topics)} items)")
+        if write_rss(rss, output_path):
+            print(f"✅ Stats feed generated: {output_path}")
+        else:
+            print(f"✅ Stats feed unchanged: {output_path}")
         return True
-        
+    
     except Exception as e:
-        print(f"❌ Failed to generate RSS feed: {e}")
+        print(f"❌ Failed to generate stats feed: {e}")
         return False
 
 
@@ -204,7 +300,7 @@ if __name__ == "__main__":
                     "url": "https://www.v2ex.com/t/123456",
                     "author": "testuser",
                     "replies": 42,
-                    "created": "2026-02-02 10:00",
+                    "created": 1769997600,
                     "summary": "这是一个测试摘要，展示 AI 生成的内容概述。"
                 }
             ]
@@ -218,7 +314,7 @@ if __name__ == "__main__":
                     "url": "https://www.v2ex.com/t/789012",
                     "author": "developer",
                     "replies": 15,
-                    "created": "2026-02-02 09:30",
+                    "created": 1769995800,
                     "summary": "一个很棒的开源工具，解决了某个痛点问题。"
                 }
             ]
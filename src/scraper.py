@@ -1,45 +1,91 @@
 """V2EX 节点帖子抓取器"""
-import json
+import html
 import os
+import re
 import requests
-from datetime import datetime, timedelta
-from typing import List, Dict
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import NodePolicy, get_config
+from fast_json import decode_replies, decode_topics, loads
+from http_cache import HTTPCache, Ttl
+from resilience import call_with_retry
 
 # V2EX API
 V2EX_TOPICS_API = "https://www.v2ex.com/api/topics/show.json"
 V2EX_HOT_API = "https://www.v2ex.com/api/topics/hot.json"
 V2EX_REPLIES_API = "https://www.v2ex.com/api/replies/show.json"
 
-# 默认节点配置
-DEFAULT_NODES = [
-    {"name": "create", "title": "分享创造", "emoji": "🎨"},
-    {"name": "ideas", "title": "奇思妙想", "emoji": "💡"},
-    {"name": "programmer", "title": "程序员", "emoji": "👨‍💻"},
-    {"name": "all4all", "title": "二手交易", "emoji": "🛒"},
-]
+# 帖子正文保留长度（字符）
+CONTENT_MAX_LENGTH = 300
 
+# 一次匹配 HTML 标签和连续空白，清洗正文只需扫描一遍
+_TAG_OR_SPACE_RE = re.compile(r"(?:<[^>]*>|\s)+")
 
-def load_config() -> List[Dict]:
-    """加载节点配置"""
-    # 优先从环境变量读取
-    nodes_env = os.environ.get("V2EX_NODES")
-    if nodes_env:
-        try:
-            return json.loads(nodes_env)
-        except json.JSONDecodeError:
-            print("Warning: Invalid V2EX_NODES format, using default")
-    
-    # 其次从配置文件读取
-    config_path = os.path.join(os.path.dirname(__file__), "..", "config.json")
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                return config.get("nodes", DEFAULT_NODES)
-        except Exception as e:
-            print(f"Warning: Failed to load config.json: {e}")
-    
-    return DEFAULT_NODES
+# HTTP 缓存（V2EX_HTTP_CACHE=0 关闭）
+HTTP_CACHE_DIR = os.environ.get(
+    "V2EX_HTTP_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", ".cache", "http")
+)
+HTTP_CACHE_MAX_MB = int(os.environ.get("V2EX_HTTP_CACHE_MB", "64"))
+
+# 各接口缓存时长（秒）
+HOT_TTL = 10 * 60
+TOPICS_TTL = 30 * 60
+REPLIES_TTL = 15 * 60
+# 最后一条回复已超过 48 小时的帖子基本不会再变，评论缓存一天
+QUIET_REPLIES_TTL = 24 * 60 * 60
+
+# 熔断器名称
+V2EX_BACKEND = "v2ex"
+
+# 复用的 HTTP 会话（保持连接，常驻进程中跨运行复用）
+_session: Optional[requests.Session] = None
+_http_cache: Optional[HTTPCache] = None
+
+
+def get_session() -> requests.Session:
+    """获取共享的 HTTP 会话"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.headers["User-Agent"] = "V2EX-Daily-Digest/1.0"
+    return _session
+
+
+def get_http_cache() -> Optional[HTTPCache]:
+    """获取共享的 HTTP 缓存，未启用时返回 None"""
+    global _http_cache
+    if os.environ.get("V2EX_HTTP_CACHE", "1").lower() in ("0", "off", "false"):
+        return None
+    if _http_cache is None:
+        _http_cache = HTTPCache(HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024)
+    return _http_cache
+
+
+def get_json(url: str, ttl: Ttl = 0, decode: Callable[[bytes], Any] = loads):
+    """请求 V2EX 接口并解码 JSON
+
+    启用缓存时经过磁盘缓存；网络错误、限流和 5xx 按 resilience 策略重试，
+    V2EX 连续失败后熔断，后续请求直接失败
+    """
+    cache = get_http_cache()
+
+    def call(timeout: float):
+        if cache is not None:
+            return cache.get_json(get_session(), url, ttl=ttl, timeout=timeout, decode=decode)
+        response = get_session().get(url, timeout=timeout)
+        response.raise_for_status()
+        return decode(response.content)
+
+    return call_with_retry(call, V2EX_BACKEND, max_attempts=3, timeout=30, base_delay=2)
+
+
+def _replies_ttl(replies: List[Dict]) -> float:
+    """评论缓存时长：讨论已经沉寂的帖子缓存更久"""
+    last_reply = max((r.get("created") or 0 for r in replies), default=0)
+    if last_reply and time.time() - last_reply > 48 * 3600:
+        return QUIET_REPLIES_TTL
+    return REPLIES_TTL
 
 
 def get_node_display(node_config: Dict) -> str:
@@ -49,30 +95,54 @@ def get_node_display(node_config: Dict) -> str:
     return f"{emoji} {title}"
 
 
+def clean_content(text: str, max_length: int = CONTENT_MAX_LENGTH) -> str:
+    """去掉 HTML 标签、合并空白并截断正文"""
+    if not text:
+        return ""
+    # 先粗截断，避免长帖全文参与扫描（标签和空白会被压缩，多留一些余量）
+    text = text[:max_length * 4]
+    if "<" in text:
+        text = _TAG_OR_SPACE_RE.sub(" ", text).strip()
+    else:
+        # 纯文本（列表接口的 content 多为 Markdown）走更快的 C 实现
+        text = " ".join(text.split())
+    if "&" in text:
+        text = html.unescape(text)
+    if len(text) > max_length:
+        text = text[:max_length] + "..."
+    return text
+
+
 def parse_topic(topic: Dict, node: str = "") -> Dict:
-    """解析帖子数据为统一格式"""
-    created_time = datetime.fromtimestamp(topic.get("created", 0))
+    """解析帖子数据为统一格式
+
+    created 保留接口返回的 epoch 秒，展示格式由渲染端通过 timeutil 生成。
+    接口字段为 null（如已注销用户的 member）时与缺失同样处理
+    """
+    member = topic.get("member") or {}
+    node_info = topic.get("node") or {}
     return {
         "id": topic.get("id"),
         "title": topic.get("title"),
         "url": f"https://www.v2ex.com/t/{topic.get('id')}",
-        "author": topic.get("member", {}).get("username", "unknown"),
-        "replies": topic.get("replies", 0),
-        "created": created_time.strftime("%Y-%m-%d %H:%M"),
-        "node": node or topic.get("node", {}).get("name", ""),
-        "node_title": topic.get("node", {}).get("title", ""),
+        "author": member.get("username") or "unknown",
+        "replies": topic.get("replies") or 0,
+        "created": topic.get("created") or 0,
+        "node": node or node_info.get("name") or "",
+        "node_title": node_info.get("title") or "",
+        "content": clean_content(topic.get("content") or ""),
     }
 
 
-def fetch_hot_topics(limit: int = 20) -> List[Dict]:
-    """获取全站热门帖子 Top N"""
+def fetch_hot_topics(limit: int = 20, raise_errors: bool = False) -> List[Dict]:
+    """获取全站热门帖子 Top N
+    
+    Args:
+        limit: 返回数量限制
+        raise_errors: 出错时抛出异常而不是返回空列表（任务队列据此重试）
+    """
     try:
-        headers = {
-            "User-Agent": "V2EX-Daily-Digest/1.0"
-        }
-        response = requests.get(V2EX_HOT_API, headers=headers, timeout=30)
-        response.raise_for_status()
-        topics = response.json()
+        topics = get_json(V2EX_HOT_API, ttl=HOT_TTL, decode=decode_topics)
         
         result = []
         for topic in topics[:limit]:
@@ -80,43 +150,43 @@ def fetch_hot_topics(limit: int = 20) -> List[Dict]:
         
         return result
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error fetching hot topics: {e}")
         return []
 
 
-def fetch_node_topics(node: str, limit: int = 20, sort_by_replies: bool = False) -> List[Dict]:
+def fetch_node_topics(node: str, limit: int = 20, sort: str = "created",
+                      window_hours: float = 48, raise_errors: bool = False) -> List[Dict]:
     """获取指定节点的帖子
     
     Args:
         node: 节点名称
         limit: 返回数量限制
-        sort_by_replies: 是否按回复数排序（热度）
+        sort: replies 按回复数排序（热度），created 按发布时间（接口默认顺序）
+        window_hours: 只取最近多少小时内发布的帖子
+        raise_errors: 出错时抛出异常而不是返回空列表（任务队列据此重试）
     """
     try:
         url = f"{V2EX_TOPICS_API}?node_name={node}"
-        headers = {
-            "User-Agent": "V2EX-Daily-Digest/1.0"
-        }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        topics = response.json()
+        topics = get_json(url, ttl=TOPICS_TTL, decode=decode_topics)
 
-        # 只取最近48小时的帖子
-        now = datetime.now()
-        cutoff = now - timedelta(hours=48)
+        cutoff = time.time() - window_hours * 3600
 
         recent_topics = []
         for topic in topics:
-            created_time = datetime.fromtimestamp(topic.get("created", 0))
-            if created_time > cutoff:
+            if (topic.get("created") or 0) > cutoff:
                 recent_topics.append(parse_topic(topic, node))
         
-        # 按回复数排序（热度）
-        if sort_by_replies:
+        if sort == "replies":
             recent_topics.sort(key=lambda x: x["replies"], reverse=True)
+        else:
+            recent_topics.sort(key=lambda x: x["created"], reverse=True)
         
         return recent_topics[:limit]
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error fetching node {node}: {e}")
         return []
 
@@ -128,18 +198,13 @@ def fetch_topic_replies(topic_id: int, max_replies: int = 20) -> List[Dict]:
     """
     try:
         url = f"{V2EX_REPLIES_API}?topic_id={topic_id}"
-        headers = {
-            "User-Agent": "V2EX-Daily-Digest/1.0"
-        }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        replies = response.json()
+        replies = get_json(url, ttl=_replies_ttl, decode=decode_replies)
         
         # 提取评论内容和作者，最多取 max_replies 条
         reply_list = []
         for reply in replies[:max_replies]:
-            content = reply.get("content", "").strip()
-            author = reply.get("member", {}).get("username", "anonymous")
+            content = (reply.get("content") or "").strip()
+            author = (reply.get("member") or {}).get("username") or "anonymous"
             if content:
                 # 限制单条评论长度
                 if len(content) > 200:
@@ -152,40 +217,99 @@ def fetch_topic_replies(topic_id: int, max_replies: int = 20) -> List[Dict]:
         return []
 
 
-def fetch_all_nodes() -> Dict[str, Dict]:
-    """获取所有帖子：全站热门 + 各节点热门"""
-    result = {}
+def fetch_topic_details(topics: List[Dict]) -> List[Dict]:
+    """批量补全帖子正文和回复数（原地更新）
+
+    只处理没有 content 字段的帖子（如旧快照）。先按节点分组，每个节点请求一次列表接口即可拿到
+    该节点下所有帖子的正文和回复数；列表中找不到的（已沉底的旧帖）再逐个
+    请求详情接口。
+    """
+    missing = [t for t in topics if "content" not in t]
+    if not missing:
+        return topics
+
+    by_node: Dict[str, List[Dict]] = {}
+    for topic in missing:
+        by_node.setdefault(topic.get("node", ""), []).append(topic)
+
+    leftovers = []
+    for node, node_topics in by_node.items():
+        listing = {}
+        if node:
+            try:
+                topics_json = get_json(f"{V2EX_TOPICS_API}?node_name={node}", ttl=TOPICS_TTL,
+                                       decode=decode_topics)
+                listing = {t.get("id"): t for t in topics_json}
+            except Exception as e:
+                print(f"Error fetching details for node {node}: {e}")
+
+        for topic in node_topics:
+            raw = listing.get(topic["id"])
+            if raw is None:
+                leftovers.append(topic)
+                continue
+            topic["content"] = clean_content(raw.get("content") or "")
+            topic["replies"] = raw.get("replies", topic.get("replies", 0))
+
+    for topic in leftovers:
+        try:
+            data = get_json(f"{V2EX_TOPICS_API}?id={topic['id']}", ttl=TOPICS_TTL, decode=decode_topics)
+            if data:
+                topic["content"] = clean_content(data[0].get("content") or "")
+                topic["replies"] = data[0].get("replies", topic.get("replies", 0))
+        except Exception:
+            # 静默失败，没有正文时摘要退回到只看标题
+            pass
+
+    return topics
+
+
+def fetch_policy_topics(policy: NodePolicy, raise_errors: bool = False) -> List[Dict]:
+    """按节点策略抓取候选帖子（去重前）"""
+    if policy.name == "_hot":
+        return fetch_hot_topics(limit=policy.limit, raise_errors=raise_errors)
+    return fetch_node_topics(policy.name, limit=policy.fetch_limit, sort=policy.sort,
+                             window_hours=policy.window_hours, raise_errors=raise_errors)
+
+
+def iter_nodes() -> Iterator[Tuple[str, Dict]]:
+    """逐个产出 (节点名, {"config": ..., "topics": [...]})：先全站热门，再按优先级抓取各节点
+
+    只在内部保留已见帖子 ID 用于去重，调用方处理完一个节点即可丢弃。
+    """
+    config = get_config()
     
-    # 1. 获取全站热门 Top 20
+    # 1. 获取全站热门
     print("Fetching hot topics...")
-    hot_topics = fetch_hot_topics(limit=20)
-    result["_hot"] = {
-        "config": {"name": "_hot", "title": "全站热门", "emoji": "🔥"},
-        "topics": hot_topics
-    }
+    hot_topics = fetch_policy_topics(config.hot)
     print(f"  Found {len(hot_topics)} hot topics")
     
     # 记录已获取的帖子ID，避免重复
     seen_ids = {t["id"] for t in hot_topics}
     
-    # 2. 获取各节点热门 Top 10（按回复数排序）
-    nodes_config = load_config()
+    yield config.hot.name, {
+        "config": config.hot.as_dict(),
+        "topics": hot_topics
+    }
     
-    for node_config in nodes_config:
-        node_name = node_config["name"]
-        print(f"Fetching node: {node_name}")
-        topics = fetch_node_topics(node_name, limit=20, sort_by_replies=True)
+    # 2. 按各节点策略抓取
+    for policy in config.nodes:
+        print(f"Fetching node: {policy.name}")
+        topics = fetch_policy_topics(policy)
         
-        # 过滤掉已在热门中出现的帖子，取 Top 10
-        unique_topics = [t for t in topics if t["id"] not in seen_ids][:10]
+        # 过滤掉已在热门和更高优先级节点中出现的帖子
+        unique_topics = [t for t in topics if t["id"] not in seen_ids][:policy.limit]
         
         # 更新已见ID
         seen_ids.update(t["id"] for t in unique_topics)
         
-        result[node_name] = {
-            "config": node_config,
+        print(f"  Found {len(unique_topics)} unique topics")
+        yield policy.name, {
+            "config": policy.as_dict(),
             "topics": unique_topics
         }
-        print(f"  Found {len(unique_topics)} unique hot topics")
-    
-    return result
+
+
+def fetch_all_nodes() -> Dict[str, Dict]:
+    """获取所有帖子：全站热门 + 各节点热门"""
+    return dict(iter_nodes())
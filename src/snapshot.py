@@ -0,0 +1,80 @@
+"""all_data 快照 - 保存一次运行的抓取和摘要结果，供只渲染模式复用
+
+快照为 gzip 压缩的紧凑 JSON：
+    {"version": 1, "created": 时间戳, "daily_overview": "...", "rising": [帖子ID, ...], "all_data": {...}}
+
+渲染阶段临时写入的私有字段（以下划线开头，如 _node_display）不会保存。
+"""
+import gzip
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+SNAPSHOT_VERSION = 1
+
+
+def _strip_private(all_data: Dict[str, Dict]) -> Dict[str, Dict]:
+    """去掉帖子中以下划线开头的渲染期字段"""
+    return {
+        node_name: {
+            "config": data.get("config", {}),
+            "topics": [
+                {k: v for k, v in topic.items() if not k.startswith("_")}
+                for topic in data.get("topics", [])
+            ],
+        }
+        for node_name, data in all_data.items()
+    }
+
+
+def save_snapshot(path: str, all_data: Dict[str, Dict], daily_overview: str = "",
+                  rising: Optional[List[Dict]] = None) -> int:
+    """写入快照，返回文件字节数
+
+    上升榜只保存帖子 ID，读取时从 all_data 中还原
+    """
+    payload = {
+        "version": SNAPSHOT_VERSION,
+        "created": int(time.time()),
+        "daily_overview": daily_overview,
+        "rising": [t["id"] for t in rising or []],
+        "all_data": _strip_private(all_data),
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    # mtime=0 保证相同内容生成相同字节
+    with open(path, "wb") as f:
+        f.write(gzip.compress(raw, compresslevel=6, mtime=0))
+    return os.path.getsize(path)
+
+
+def load_snapshot(path: str) -> Tuple[Dict[str, Dict], str, List[Dict]]:
+    """读取快照，返回 (all_data, daily_overview, rising)"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    # 兼容未压缩的 JSON
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+    payload = json.loads(raw)
+
+    version = payload.get("version", SNAPSHOT_VERSION)
+    if version > SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+    all_data = payload["all_data"]
+
+    # 缺少发布时间的帖子（旧快照）用快照时间代替：同一份快照每次渲染结果一致，
+    # 不会因为取当前时间导致 RSS 内容哈希每次都变
+    snapshot_ts = payload.get("created", 0)
+    topics_by_id = {}
+    for data in all_data.values():
+        for topic in data["topics"]:
+            if not topic.get("created") and snapshot_ts:
+                topic["created"] = snapshot_ts
+            topics_by_id.setdefault(topic["id"], topic)
+    rising = [topics_by_id[i] for i in payload.get("rising", []) if i in topics_by_id]
+
+    return all_data, payload.get("daily_overview", ""), rising
@@ -0,0 +1,173 @@
+"""跨运行的节点 / 作者统计
+
+按天分桶保存（最多 90 个桶，相当于环形缓冲区），每个桶记录：
+- 各节点的帖子数和各帖子的最新回复数（用于日均帖子量和回复数中位数）
+- 作者发帖数（每天只保留前 AUTHORS_PER_DAY 名，控制文件大小）
+
+帖子只在第一次出现时计入帖子数和作者榜；之后的运行中再次出现时只更新回复数，
+避免回复数停留在刚发帖时的值。每次运行只处理本次抓到的帖子，代价与帖子数成正比。
+统计文件与趋势文件一样放在 DIGEST_STATE_DIR 下。
+"""
+import json
+import os
+import statistics
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from timeutil import now, topic_datetime
+
+STATE_DIR = os.environ.get(
+    "DIGEST_STATE_DIR", os.path.join(os.path.dirname(__file__), "..", ".state")
+)
+STATS_PATH = os.path.join(STATE_DIR, "stats.json")
+
+# 保留天数
+MAX_DAYS = 90
+
+# 每天保留的作者数
+AUTHORS_PER_DAY = 100
+
+# 统计窗口（天）
+WINDOWS = (7, 30, 90)
+
+
+class StatsStore:
+    """按天分桶的统计数据"""
+
+    def __init__(self, path: str = STATS_PATH):
+        self.path = path
+        self.days: Dict[str, Dict] = {}
+        self.seen: Dict[str, List[str]] = {}  # 帖子ID -> [所属日期, 所属节点]
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.days = data.get("days", {})
+                self.seen = data.get("seen", {})
+                self._upgrade()
+            except Exception as e:
+                print(f"Warning: Failed to load stats: {e}")
+
+    def _upgrade(self):
+        """兼容旧格式：回复数列表没有帖子 ID，只能保留原值，不再更新"""
+        for bucket in self.days.values():
+            for node_bucket in bucket["nodes"].values():
+                if isinstance(node_bucket["replies"], list):
+                    node_bucket["replies"] = {
+                        f"_legacy{i}": replies for i, replies in enumerate(node_bucket["replies"])
+                    }
+
+    def update(self, all_data: Dict[str, Dict]) -> int:
+        """加入本次运行中新出现的帖子、更新已见帖子的回复数，返回新增数量"""
+        added = sum(self.add_topics(node_name, data["topics"]) for node_name, data in all_data.items())
+        self.prune()
+        return added
+
+    def add_topics(self, node_name: str, topics: List[Dict]) -> int:
+        """加入一个节点的帖子（流式模式逐个节点调用，全部加入后再 prune），返回新增数量"""
+        added = 0
+        cutoff = self._cutoff()
+        for topic in topics:
+            topic_id = str(topic["id"])
+            replies = topic.get("replies", 0)
+            if topic_id in self.seen:
+                self._update_replies(topic_id, replies)
+                continue
+            day = topic_datetime(topic).strftime("%Y-%m-%d")
+            if day < cutoff:
+                continue
+            node = topic.get("node") or node_name
+            self.seen[topic_id] = [day, node]
+
+            bucket = self.days.setdefault(day, {"nodes": {}, "authors": {}})
+            node_bucket = bucket["nodes"].setdefault(node, {"count": 0, "replies": {}})
+            node_bucket["count"] += 1
+            node_bucket["replies"][topic_id] = replies
+
+            author = topic.get("author")
+            if author:
+                bucket["authors"][author] = bucket["authors"].get(author, 0) + 1
+            added += 1
+        return added
+
+    def _update_replies(self, topic_id: str, replies: int):
+        seen = self.seen[topic_id]
+        # 旧格式只记录了日期，找不到对应的回复数
+        if not isinstance(seen, list):
+            return
+        day, node = seen
+        node_bucket = self.days.get(day, {}).get("nodes", {}).get(node)
+        if node_bucket is not None and topic_id in node_bucket["replies"]:
+            node_bucket["replies"][topic_id] = replies
+
+    @staticmethod
+    def _cutoff() -> str:
+        return (now() - timedelta(days=MAX_DAYS)).strftime("%Y-%m-%d")
+
+    def prune(self):
+        """丢弃超出保留期的日期桶，并裁剪每天的作者表"""
+        cutoff = self._cutoff()
+        for day in [d for d in self.days if d < cutoff]:
+            del self.days[day]
+        self.seen = {k: v for k, v in self.seen.items() if (v[0] if isinstance(v, list) else v) >= cutoff}
+
+        for bucket in self.days.values():
+            authors = bucket["authors"]
+            if len(authors) > AUTHORS_PER_DAY:
+                bucket["authors"] = dict(Counter(authors).most_common(AUTHORS_PER_DAY))
+
+    def save(self):
+        output_dir = os.path.dirname(self.path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"days": self.days, "seen": self.seen}, f,
+                      ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def _window(self, days: int) -> List[Dict]:
+        cutoff = (now() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        return [bucket for day, bucket in self.days.items() if day >= cutoff]
+
+    def node_stats(self, node: str, days: int = 7) -> Dict:
+        """某节点在最近 days 天内的日均帖子数和回复数中位数"""
+        count = 0
+        replies = []
+        for bucket in self._window(days):
+            node_bucket = bucket["nodes"].get(node)
+            if node_bucket:
+                count += node_bucket["count"]
+                replies.extend(node_bucket["replies"].values())
+        return {
+            "topics": count,
+            "daily_volume": round(count / days, 1),
+            "median_replies": statistics.median(replies) if replies else 0,
+        }
+
+    def top_authors(self, days: int = 7, limit: int = 5) -> List[Tuple[str, int]]:
+        """最近 days 天最活跃的作者"""
+        counter = Counter()
+        for bucket in self._window(days):
+            counter.update(bucket["authors"])
+        return counter.most_common(limit)
+
+    def daily_summary(self, day: str) -> Optional[Dict]:
+        """某一天的节点帖子数和作者榜"""
+        bucket = self.days.get(day)
+        if not bucket:
+            return None
+        return {
+            "nodes": {node: b["count"] for node, b in bucket["nodes"].items()},
+            "authors": Counter(bucket["authors"]).most_common(5),
+        }
+
+
+def update_stats(all_data: Dict[str, Dict], path: str = STATS_PATH) -> StatsStore:
+    """加载统计、加入本次帖子并保存"""
+    store = StatsStore(path)
+    added = store.update(all_data)
+    store.save()
+    print(f"  Stats updated with {added} new topics ({len(store.days)} days)")
+    return store
@@ -1,10 +1,18 @@
 """AI 摘要模块 - 使用 Azure OpenAI"""
+from __future__ import annotations
+
 import os
 import time
-from typing import Dict, List, Optional
-from openai import AzureOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from openai import AzureOpenAI
 
-from scraper import fetch_topic_replies
+from comment_ranker import pick_featured, rank_replies
+from resilience import CircuitOpenError, DeadlineExceeded, call_with_retry, get_breaker
+from scraper import fetch_topic_replies, fetch_topic_details
+from variants import DEFAULT_VARIANT, VARIANTS, get_variants
 
 
 # Azure OpenAI 配置
@@ -12,31 +20,96 @@ AZURE_ENDPOINT = "https://ai-imliuyao1639ai979686794225.cognitiveservices.azure.
 AZURE_API_VERSION = "2024-12-01-preview"
 DEPLOYMENT_NAME = "gpt-5.2-chat"
 
-# 最大重试次数
+# 最大尝试次数
 MAX_RETRIES = 3
 
-# 重试延迟
+# 重试退避基数（秒）
 RETRY_DELAY = 3
 
+# 单次模型调用超时（秒）
+LLM_TIMEOUT = 60
+
+# 熔断器名称
+LLM_BACKEND = "azure-openai"
+
 # 请求间延迟（避免限流）
 REQUEST_DELAY = 1
 
+# 每个帖子抓取的评论数，以及预筛选后发给模型的评论数（热门 / 普通）
+REPLY_FETCH_LIMIT = 40
+HOT_PROMPT_REPLIES = 8
+NODE_PROMPT_REPLIES = 6
+
+# 摘要缓存上限（条）
+SUMMARY_CACHE_SIZE = 2000
+
+
+class SummaryError(RuntimeError):
+    """部分帖子没有得到摘要（raise_errors=True 时抛出）"""
+
+
+# 复用的客户端（按 API Key 缓存，常驻进程中保持连接）
+_client: Optional[AzureOpenAI] = None
+_client_key: Optional[str] = None
+
+# 摘要内存缓存：(帖子ID, 回复数, 是否热门, 变体) -> 摘要结果
+# 回复数不变的帖子在下一次运行时直接复用，不再调用模型；每个变体单独缓存
+_summary_cache: Dict[tuple, Dict] = {}
+
 
 def get_client() -> AzureOpenAI | None:
-    """获取 Azure OpenAI 客户端"""
+    """获取 Azure OpenAI 客户端（同一 API Key 复用同一个实例）"""
+    global _client, _client_key
     api_key = os.environ.get("AZURE_OPENAI_KEY")
     if not api_key:
         return None
     
-    return AzureOpenAI(
-        api_version=AZURE_API_VERSION,
-        azure_endpoint=AZURE_ENDPOINT,
-        api_key=api_key,
-    )
+    if _client is None or _client_key != api_key:
+        # 延迟导入 openai SDK，只有真正需要摘要时才付出导入开销
+        from openai import AzureOpenAI
+
+        _client = AzureOpenAI(
+            api_version=AZURE_API_VERSION,
+            azure_endpoint=AZURE_ENDPOINT,
+            api_key=api_key,
+            # 重试统一由 resilience 处理
+            max_retries=0,
+        )
+        _client_key = api_key
+    return _client
+
+
+def _cache_summary(key: tuple, result: Dict):
+    """写入摘要缓存，超出上限时淘汰最早写入的条目"""
+    if len(_summary_cache) >= SUMMARY_CACHE_SIZE:
+        _summary_cache.pop(next(iter(_summary_cache)))
+    _summary_cache[key] = result
+
+
+def complete(client: AzureOpenAI, prompt: str, max_tokens: int) -> str:
+    """调用模型（带重试、截止时间和熔断），返回输出文本"""
+    def call(timeout: float) -> str:
+        response = client.chat.completions.create(
+            model=DEPLOYMENT_NAME,
+            messages=[{"role": "user", "content": prompt}],
+            max_completion_tokens=max_tokens,
+            timeout=timeout,
+        )
+        return response.choices[0].message.content or ""
+    
+    return call_with_retry(call, LLM_BACKEND, max_attempts=MAX_RETRIES,
+                           timeout=LLM_TIMEOUT, base_delay=RETRY_DELAY)
 
 
-def generate_daily_overview(client: AzureOpenAI, hot_topics: List[Dict]) -> str:
-    """基于热门帖子生成今日一句话概览"""
+def generate_daily_overview(client: AzureOpenAI, hot_topics: List[Dict],
+                            rising: Optional[List[Dict]] = None) -> str:
+    """基于热门帖子生成今日一句话概览
+    
+    Args:
+        client: Azure OpenAI 客户端
+        hot_topics: 全站热门帖子
+        rising: 回复速度上升最快的帖子（可选）
+    """
     if not hot_topics:
         return ""
     
@@ -44,11 +117,18 @@ def generate_daily_overview(client: AzureOpenAI, hot_topics: List[Dict]) -> str:
     titles = [t["title"] for t in hot_topics[:15]]
     titles_text = "\n".join([f"- {t}" for t in titles])
     
+    rising_text = ""
+    if rising:
+        rising_lines = "\n".join(
+            f"- {t['title']}（约 {t['velocity']:.0f} 回复/小时）" for t in rising
+        )
+        rising_text = f"\n正在快速升温的帖子：\n{rising_lines}\n"
+    
     prompt = f"""你是V2EX社区的观察员。根据今天的热门帖子标题，用一句话（30-50字）总结今天V2EX社区在讨论什么。
 
 今日热门帖子：
 {titles_text}
-
+{rising_text}
 要求：
 1. 用轻松、有趣的语气
 2. 提炼2-3个核心话题/趋势
@@ -57,51 +137,50 @@ def generate_daily_overview(client: AzureOpenAI, hot_topics: List[Dict]) -> str:
 
 直接输出一句话，不要有其他内容："""
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.chat.completions.create(
-                model=DEPLOYMENT_NAME,
-                messages=[{"role": "user", "content": prompt}],
-                max_completion_tokens=100,
-            )
-            return response.choices[0].message.content.strip() or ""
-        except Exception as e:
-            if "429" in str(e) or "rate" in str(e).lower():
-                time.sleep(RETRY_DELAY * (attempt + 1))
-                continue
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
-    
-    return ""
+    try:
+        return complete(client, prompt, max_tokens=100).strip()
+    except Exception as e:
+        print(f"  Overview failed: {e}")
+        return ""
 
 
-def summarize_single_topic(client: AzureOpenAI, topic: Dict, is_hot: bool = False) -> Dict:
-    """为单个帖子生成摘要和评论精华
+def _empty_result() -> Dict:
+    return {"summary": "", "comments_summary": "", "featured_comments": []}
+
+
+def fetch_ranked_replies(topic: Dict, is_hot: bool = False) -> List[Dict]:
+    """抓取评论并在本地预筛选：去掉噪音和重复评论，只保留得分最高的几条"""
+    if topic.get("replies", 0) <= 0:
+        return []
+    replies = fetch_topic_replies(topic["id"], max_replies=REPLY_FETCH_LIMIT)
+    context = f"{topic['title']} {topic.get('content', '')}"
+    return rank_replies(replies, context, limit=HOT_PROMPT_REPLIES if is_hot else NODE_PROMPT_REPLIES)
+
+
+def build_topic_prompt(topic: Dict, is_hot: bool = False, replies: Optional[List[Dict]] = None) -> str:
+    """构造摘要提示词（不含结尾的输出要求），所有变体共用
     
     Args:
-        client: Azure OpenAI 客户端
         topic: 帖子数据
         is_hot: 是否为热门帖子（热门帖子获取更详细的摘要和评论原文）
-    
-    返回: {"summary": "...", "comments_summary": "...", "featured_comments": [...]}
+        replies: 预筛选后的评论，为空时自动抓取
     """
-    topic_id = topic["id"]
     title = topic["title"]
     replies_count = topic.get("replies", 0)
+    content = topic.get("content", "")
+    content_text = f"\n帖子正文（节选）：\n{content}\n" if content else ""
     
-    # 获取评论内容（现在包含作者信息）
-    replies = []
-    if replies_count > 0:
-        replies = fetch_topic_replies(topic_id, max_replies=20 if is_hot else 15)
+    if replies is None:
+        replies = fetch_ranked_replies(topic, is_hot)
     
     # 热门帖子：更详细的摘要 + 提取精彩评论原文
     if is_hot and replies:
-        replies_text = "\n".join([f"- @{r['author']}: {r['content']}" for r in replies[:15]])
-        prompt = f"""请为这个V2EX热门帖子生成深度摘要。
+        replies_text = "\n".join([f"- @{r['author']}: {r['content']}" for r in replies])
+        return f"""请为这个V2EX热门帖子生成深度摘要。
 
 帖子标题：{title}
-
-评论区（共{replies_count}条，展示部分）：
+{content_text}
+评论区（共{replies_count}条，已筛选）：
 {replies_text}
 
 请按以下格式输出：
@@ -112,15 +191,13 @@ def summarize_single_topic(client: AzureOpenAI, topic: Dict, is_hot: bool = Fals
 【精彩评论】
 （从评论中挑选2-3条最有价值、最有趣或最有争议的评论，保留原文和作者。格式如下）
 @用户名: 评论原文
-@用户名: 评论原文
-
-请直接输出，不要有其他内容："""
+@用户名: 评论原文"""
     elif replies:
-        replies_text = "\n".join([f"- {r['content']}" for r in replies[:10]])
-        prompt = f"""请为这个V2EX帖子生成摘要。
+        replies_text = "\n".join([f"- {r['content']}" for r in replies])
+        return f"""请为这个V2EX帖子生成摘要。
 
 帖子标题：{title}
-
+{content_text}
 热门评论（共{replies_count}条，展示部分）：
 {replies_text}
 
@@ -130,50 +207,95 @@ def summarize_single_topic(client: AzureOpenAI, topic: Dict, is_hot: bool = Fals
 （50-100字，描述帖子的核心内容、作者的主要观点）
 
 【评论精华】
-（30-60字，总结评论区的主要讨论方向、热门观点）
+（30-60字，总结评论区的主要讨论方向、热门观点）"""
+    elif content:
+        return f"""请为这个V2EX帖子生成摘要。
+
+帖子标题：{title}
+{content_text}
+请按以下格式输出：
 
-请直接输出，不要有其他内容："""
+【帖子摘要】
+（50-100字，根据正文描述帖子的核心内容、作者的主要诉求）"""
     else:
-        prompt = f"""请为这个V2EX帖子生成摘要。
+        return f"""请为这个V2EX帖子生成摘要。
 
 帖子标题：{title}
 
 请按以下格式输出：
 
 【帖子摘要】
-（50-100字，根据标题推断帖子的核心内容、可能讨论的话题）
-
-请直接输出，不要有其他内容："""
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.chat.completions.create(
-                model=DEPLOYMENT_NAME,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_completion_tokens=600 if is_hot else 500,
-            )
-            
-            output_text = response.choices[0].message.content or ""
-            
-            if output_text:
-                return parse_summary_response(output_text, is_hot)
-            return {"summary": "", "comments_summary": "", "featured_comments": []}
-            
-        except Exception as e:
-            error_str = str(e)
-            if "429" in error_str or "rate" in error_str.lower():
-                wait_time = RETRY_DELAY * (attempt + 1)
-                print(f"      Rate limited, waiting {wait_time}s...")
-                time.sleep(wait_time)
-                continue
-            
-            print(f"      Error (attempt {attempt + 1}): {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+（50-100字，根据标题推断帖子的核心内容、可能讨论的话题）"""
+
+
+def _complete_variant(client: AzureOpenAI, prompt_body: str, variant: str, is_hot: bool) -> Dict:
+    """用共享的提示词加上变体要求调用模型并解析结果"""
+    instruction = VARIANTS[variant]["instruction"]
+    prompt = prompt_body
+    if instruction:
+        prompt += f"\n\n{instruction}"
+    prompt += "\n\n请直接输出，不要有其他内容："
     
-    return {"summary": "", "comments_summary": "", "featured_comments": []}
+    try:
+        output_text = complete(client, prompt, max_tokens=600 if is_hot else 500)
+    except (CircuitOpenError, DeadlineExceeded):
+        # 后端已熔断或没有剩余时间：直接降级，不再打印每条错误
+        return _empty_result()
+    except Exception as e:
+        print(f"      Error ({variant}): {e}")
+        return _empty_result()
+    
+    if output_text:
+        return parse_summary_response(output_text, is_hot)
+    return _empty_result()
+
+
+def summarize_topic_variants(client: AzureOpenAI, topic: Dict, is_hot: bool = False,
+                             variants: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """为单个帖子生成多个变体的摘要
+    
+    评论只抓取一次、提示词只构造一次，各变体的模型调用并发执行。
+    热门帖子的模型没有给出精彩评论时（包括调用失败），用本地排序结果补上
+    
+    返回: {变体名: {"summary": "...", "comments_summary": "...", "featured_comments": [...]}}
+    """
+    variants = variants or [DEFAULT_VARIANT]
+    
+    # 后端已熔断：普通帖子连评论也不必抓取，热门帖子仍在本地挑选精彩评论
+    if get_breaker(LLM_BACKEND).is_open:
+        featured = pick_featured(fetch_ranked_replies(topic, is_hot)) if is_hot else []
+        return {variant: {**_empty_result(), "featured_comments": featured} for variant in variants}
+    
+    replies = fetch_ranked_replies(topic, is_hot)
+    prompt_body = build_topic_prompt(topic, is_hot, replies)
+    if len(variants) == 1:
+        results = {variants[0]: _complete_variant(client, prompt_body, variants[0], is_hot)}
+    else:
+        with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+            futures = {
+                variant: pool.submit(_complete_variant, client, prompt_body, variant, is_hot)
+                for variant in variants
+            }
+            results = {variant: future.result() for variant, future in futures.items()}
+    
+    if is_hot:
+        for result in results.values():
+            if not result["featured_comments"]:
+                result["featured_comments"] = pick_featured(replies)
+    return results
+
+
+def summarize_single_topic(client: AzureOpenAI, topic: Dict, is_hot: bool = False) -> Dict:
+    """为单个帖子生成（默认变体的）摘要和评论精华
+    
+    Args:
+        client: Azure OpenAI 客户端
+        topic: 帖子数据
+        is_hot: 是否为热门帖子（热门帖子获取更详细的摘要和评论原文）
+    
+    返回: {"summary": "...", "comments_summary": "...", "featured_comments": [...]}
+    """
+    return summarize_topic_variants(client, topic, is_hot)[DEFAULT_VARIANT]
 
 
 def parse_summary_response(text: str, is_hot: bool = False) -> Dict:
@@ -226,41 +348,87 @@ def _save_section(result: Dict, section: str, content: List[str], is_hot: bool):
         result[section] = " ".join(content).strip()
 
 
-def summarize_topics(topics: List[Dict], is_hot: bool = False) -> List[Dict]:
+def summarize_node(node_name: str, data: Dict) -> List[Dict]:
+    """按节点策略的摘要档位处理节点帖子：hot 详细摘要，compact 简短摘要，none 不调用模型
+    
+    旧快照中的节点配置没有 summary 字段，全站热门按 hot、其他节点按 compact 处理
+    """
+    tier = data.get("config", {}).get("summary") or ("hot" if node_name == "_hot" else "compact")
+    if tier == "none" or not data["topics"]:
+        return data["topics"]
+    return summarize_topics(data["topics"], is_hot=(tier == "hot"))
+
+
+def summarize_topics(topics: List[Dict], is_hot: bool = False, raise_errors: bool = False) -> List[Dict]:
     """为帖子列表添加 AI 摘要
     
     Args:
         topics: 帖子列表
         is_hot: 是否为热门帖子（热门帖子获取更详细的摘要）
+        raise_errors: 有帖子没有得到摘要时抛出 SummaryError 而不是降级返回（任务队列据此重试）
     """
+    if not topics:
+        return topics
+    
     client = get_client()
     if not client:
+        if raise_errors:
+            raise SummaryError("AZURE_OPENAI_KEY not set")
         print("Warning: AZURE_OPENAI_KEY not set, skipping summarization")
+        if is_hot:
+            # 不调用模型，直接挑选热门帖子的精彩评论
+            for topic in topics:
+                if not topic.get("featured_comments"):
+                    topic["featured_comments"] = pick_featured(fetch_ranked_replies(topic, is_hot))
         return topics
     
-    if not topics:
-        return topics
-    
+    variants = get_variants()
     label = "hot" if is_hot else "node"
-    print(f"  Summarizing {len(topics)} {label} topics...")
+    print(f"  Summarizing {len(topics)} {label} topics ({', '.join(variants)})...")
+    
+    # 补全缺少正文的帖子（按节点批量请求）
+    fetch_topic_details(topics)
     
     success_count = 0
+    called = False
     for i, topic in enumerate(topics):
-        # 请求间延迟
-        if i > 0:
-            time.sleep(REQUEST_DELAY)
-        
-        print(f"    [{i+1}/{len(topics)}] {topic['title'][:30]}...")
+        results = {}
+        missing = []
+        for variant in variants:
+            cache_key = (topic["id"], topic.get("replies", 0), is_hot, variant)
+            if cache_key in _summary_cache:
+                results[variant] = _summary_cache[cache_key]
+            else:
+                missing.append(variant)
         
-        result = summarize_single_topic(client, topic, is_hot=is_hot)
+        if not missing:
+            print(f"    [{i+1}/{len(topics)}] {topic['title'][:30]}... (cached)")
+        else:
+            # 请求间延迟（熔断期间调用会立即失败，无需等待）
+            if called and not get_breaker(LLM_BACKEND).is_open:
+                time.sleep(REQUEST_DELAY)
+            called = True
+            
+            print(f"    [{i+1}/{len(topics)}] {topic['title'][:30]}...")
+            
+            for variant, result in summarize_topic_variants(client, topic, is_hot, missing).items():
+                if result.get("summary"):
+                    _cache_summary((topic["id"], topic.get("replies", 0), is_hot, variant), result)
+                results[variant] = result
         
+        result = results[variants[0]]
         topic["summary"] = result.get("summary", "")
         topic["comments_summary"] = result.get("comments_summary", "")
         topic["featured_comments"] = result.get("featured_comments", [])
+        if len(variants) > 1:
+            topic["variants"] = {variant: results[variant] for variant in variants[1:]}
         
         if topic["summary"]:
             success_count += 1
     
     print(f"  Total: {success_count}/{len(topics)} topics summarized")
+    if raise_errors and success_count < len(topics):
+        # 成功的摘要已写入缓存，重试时只会重新请求失败的帖子
+        raise SummaryError(f"{len(topics) - success_count} of {len(topics)} topics failed to summarize")
     
     return topics
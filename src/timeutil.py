@@ -0,0 +1,62 @@
+"""时间处理 - 帖子只保存 epoch 秒，渲染时再转成带时区的时间
+
+展示时区由 DIGEST_TZ 指定（默认 Asia/Shanghai），与运行环境的本地时区无关，
+GitHub Actions 的 UTC runner 上也能得到正确的时间。
+"""
+import os
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Dict
+
+DISPLAY_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def _load_timezone() -> tzinfo:
+    name = os.environ.get("DIGEST_TZ", "Asia/Shanghai")
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(name)
+    except Exception:
+        # 系统缺少时区数据库时退回北京时间
+        print(f"Warning: Unknown timezone {name}, using UTC+8")
+        return timezone(timedelta(hours=8), "UTC+8")
+
+
+TZ = _load_timezone()
+
+
+@lru_cache(maxsize=8192)
+def to_datetime(ts: int) -> datetime:
+    """epoch 秒 → 带时区的 datetime（按时间戳缓存，同一帖子多次渲染只转换一次）"""
+    return datetime.fromtimestamp(ts, TZ)
+
+
+def created_ts(topic: Dict) -> int:
+    """帖子创建时间（epoch 秒）
+
+    兼容旧快照中 "YYYY-MM-DD HH:MM" 格式的字符串（按展示时区解析）
+    """
+    created = topic.get("created") or 0
+    if isinstance(created, str):
+        try:
+            return int(datetime.strptime(created, DISPLAY_FORMAT).replace(tzinfo=TZ).timestamp())
+        except ValueError:
+            return 0
+    return int(created)
+
+
+def topic_datetime(topic: Dict) -> datetime:
+    """帖子创建时间（带时区）"""
+    return to_datetime(created_ts(topic))
+
+
+def format_created(topic: Dict, fmt: str = DISPLAY_FORMAT) -> str:
+    """帖子创建时间的展示字符串，只在渲染时调用"""
+    ts = created_ts(topic)
+    return to_datetime(ts).strftime(fmt) if ts else ""
+
+
+def now() -> datetime:
+    """展示时区下的当前时间"""
+    return datetime.now(TZ)
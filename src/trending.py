@@ -0,0 +1,189 @@
+"""帖子回复速度趋势
+
+每次运行把 (帖子ID, 回复数, 时间戳) 追加到一个紧凑的二进制时间序列文件
+（每条 12 字节），再根据同一帖子的最近几个快照计算：
+- 回复速度 velocity：每小时新增回复数
+- 回复加速度 acceleration：速度每小时的变化量
+
+只有一个快照的新帖子用 回复数 / 发布以来小时数 估算速度。
+每次运行只追加本次的记录；过期记录超过一半时才整体重写。
+记录按时间顺序追加，读取时按记录大小二分查找保留期的起点，只读取保留期内的部分。
+"""
+import os
+import struct
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from timeutil import created_ts
+
+STATE_DIR = os.environ.get(
+    "DIGEST_STATE_DIR", os.path.join(os.path.dirname(__file__), "..", ".state")
+)
+TRENDING_PATH = os.path.join(STATE_DIR, "trending.bin")
+
+# 快照保留时长（秒）
+RETENTION_SECONDS = 7 * 24 * 3600
+
+# 每条记录：帖子ID、回复数、时间戳（均为 uint32，小端）
+_RECORD = struct.Struct("<III")
+
+# 上升榜数量
+RISING_LIMIT = 5
+
+
+def _record_count(f) -> int:
+    """文件中完整记录的条数（忽略写入中断留下的不完整记录）"""
+    return os.fstat(f.fileno()).st_size // _RECORD.size
+
+
+def _first_at_or_after(f, count: int, cutoff: int) -> int:
+    """二分查找第一条时间戳 >= cutoff 的记录序号（记录按时间顺序追加）"""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        f.seek(middle * _RECORD.size)
+        if _RECORD.unpack(f.read(_RECORD.size))[2] < cutoff:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _load_columns(path: str, since: int = 0):
+    """读取时间序列文件中时间戳 >= since 的记录，返回 (ids, replies, timestamps) 三列"""
+    flat = array("I")
+    if flat.itemsize != 4:
+        raise RuntimeError("array('I') is not 32-bit on this platform")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            count = _record_count(f)
+            start = _first_at_or_after(f, count, since) if since else 0
+            f.seek(start * _RECORD.size)
+            flat.frombytes(f.read((count - start) * _RECORD.size))
+    return flat[0::3], flat[1::3], flat[2::3]
+
+
+def record_snapshot(all_data: Dict[str, Dict], path: str = TRENDING_PATH, now: Optional[float] = None):
+    """把本次所有帖子的回复数追加到时间序列文件"""
+    ts = int(now or time.time())
+    records = bytearray()
+    seen = set()
+    for data in all_data.values():
+        for topic in data["topics"]:
+            if topic["id"] in seen:
+                continue
+            seen.add(topic["id"])
+            records += _RECORD.pack(topic["id"], topic.get("replies", 0), ts)
+
+    output_dir = os.path.dirname(path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    with open(path, "ab") as f:
+        # 截掉写入中断留下的不完整记录，否则之后追加的记录都会错位
+        whole = _record_count(f) * _RECORD.size
+        if os.fstat(f.fileno()).st_size != whole:
+            f.truncate(whole)
+        f.write(records)
+
+
+def compact(path: str = TRENDING_PATH, now: Optional[float] = None):
+    """过期记录超过一半时重写文件，只保留保留期内的记录"""
+    if not os.path.exists(path):
+        return
+    cutoff = int(now or time.time()) - RETENTION_SECONDS
+    with open(path, "rb") as f:
+        count = _record_count(f)
+        start = _first_at_or_after(f, count, cutoff)
+        if start * 2 < count or not count:
+            return
+        f.seek(start * _RECORD.size)
+        records = f.read((count - start) * _RECORD.size)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(records)
+    os.replace(tmp_path, path)
+
+
+def compute_trends(topic_ids: List[int], path: str = TRENDING_PATH,
+                   now: Optional[float] = None) -> Dict[int, Dict[str, float]]:
+    """计算指定帖子的回复速度和加速度
+
+    返回: {帖子ID: {"velocity": 回复/小时, "acceleration": 回复/小时², "points": 快照数}}
+    """
+    wanted = set(topic_ids)
+    cutoff = int(now or time.time()) - RETENTION_SECONDS
+    ids, replies, stamps = _load_columns(path, since=cutoff)
+
+    # 从最新的记录往前扫描，按帖子分组取最近 3 个快照；所有帖子都凑齐后提前结束
+    series: Dict[int, List] = {}
+    complete = 0
+    for i in range(len(ids) - 1, -1, -1):
+        topic_id = ids[i]
+        if topic_id not in wanted:
+            continue
+        points = series.setdefault(topic_id, [])
+        if len(points) == 3:
+            continue
+        points.append((stamps[i], replies[i]))
+        if len(points) == 3:
+            complete += 1
+            if complete == len(wanted):
+                break
+
+    trends = {}
+    for topic_id, points in series.items():
+        points.sort()
+        velocity = acceleration = 0.0
+        if len(points) >= 2:
+            (t1, r1), (t2, r2) = points[-2], points[-1]
+            velocity = (r2 - r1) / max((t2 - t1) / 3600, 1 / 60)
+        if len(points) == 3:
+            (t0, r0) = points[0]
+            previous = (r1 - r0) / max((t1 - t0) / 3600, 1 / 60)
+            acceleration = (velocity - previous) / max((t2 - t0) / 7200, 1 / 60)
+        trends[topic_id] = {"velocity": velocity, "acceleration": acceleration, "points": len(points)}
+    return trends
+
+
+def update_trending(all_data: Dict[str, Dict], path: str = TRENDING_PATH,
+                    limit: int = RISING_LIMIT) -> List[Dict]:
+    """记录本次快照并返回上升最快的帖子
+
+    返回的帖子字典会附带 velocity / acceleration 字段，同时写回 all_data 中的帖子
+    """
+    now = time.time()
+    record_snapshot(all_data, path, now)
+    compact(path, now)
+
+    topics = {}
+    for data in all_data.values():
+        for topic in data["topics"]:
+            topics.setdefault(topic["id"], topic)
+    trends = compute_trends(list(topics), path, now)
+
+    for topic_id, topic in topics.items():
+        trend = trends.get(topic_id, {})
+        velocity = trend.get("velocity", 0.0)
+        if trend.get("points", 0) < 2:
+            # 首次出现：用发布以来的平均速度估算
+            age_hours = max((now - created_ts(topic)) / 3600, 1)
+            velocity = topic.get("replies", 0) / age_hours
+        topic["velocity"] = round(velocity, 2)
+        topic["acceleration"] = round(trend.get("acceleration", 0.0), 2)
+
+    # 速度为主，正加速度额外加分
+    def score(topic: Dict) -> float:
+        return topic["velocity"] + 0.5 * max(topic["acceleration"], 0)
+
+    ranked = sorted(topics.values(), key=score, reverse=True)
+    return [t for t in ranked if t["velocity"] > 0][:limit]
+
+
+def node_velocity(all_data: Dict[str, Dict]) -> Dict[str, float]:
+    """各节点帖子回复速度之和（需先调用 update_trending）"""
+    return {
+        node_name: round(sum(t.get("velocity", 0) for t in data["topics"]), 2)
+        for node_name, data in all_data.items()
+    }
@@ -0,0 +1,70 @@
+"""摘要变体（语言 / 风格）
+
+同一次抓取可以生成多种摘要：
+- zh：默认中文摘要
+- en：英文摘要
+- tldr：一句话速览
+
+DIGEST_SUMMARY_VARIANTS 指定要生成的变体（逗号分隔，默认 zh），第一个为主变体，
+结果写入帖子的 summary / comments_summary / featured_comments 字段；
+其余变体写入 topic["variants"][变体名]。
+"""
+import os
+from typing import Dict, List, Optional
+
+# 变体名 -> 附加在提示词末尾的要求；主提示词（内容、格式）所有变体共用
+VARIANTS: Dict[str, Dict[str, str]] = {
+    "zh": {
+        "label": "中文",
+        "instruction": "",
+    },
+    "en": {
+        "label": "English",
+        "instruction": "请用英文输出摘要和评论总结（精彩评论保留原文），【帖子摘要】等标记保持不变。",
+    },
+    "tldr": {
+        "label": "TL;DR",
+        "instruction": "只输出【帖子摘要】，用一句话（不超过 30 字）概括，忽略其他部分。",
+    },
+}
+
+DEFAULT_VARIANT = "zh"
+
+# 帖子中属于摘要结果的字段
+SUMMARY_FIELDS = ("summary", "comments_summary", "featured_comments")
+
+
+def get_variants() -> List[str]:
+    """要生成的变体列表（第一个为主变体），忽略未知的变体名"""
+    names = os.environ.get("DIGEST_SUMMARY_VARIANTS", DEFAULT_VARIANT)
+    variants = []
+    for name in names.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in VARIANTS:
+            print(f"Warning: Unknown summary variant '{name}', skipping")
+        elif name not in variants:
+            variants.append(name)
+    return variants or [DEFAULT_VARIANT]
+
+
+def select_variant(all_data: Dict[str, Dict], variant: Optional[str]) -> Dict[str, Dict]:
+    """返回摘要字段替换为指定变体的 all_data 副本，用于渲染该变体的邮件或 feed
+
+    variant 为空或为主变体（帖子没有该变体的结果）时原样返回
+    """
+    if not variant:
+        return all_data
+    selected = {}
+    for node_name, data in all_data.items():
+        topics = []
+        for topic in data["topics"]:
+            result = topic.get("variants", {}).get(variant)
+            if result is not None:
+                topic = dict(topic)
+                for field in SUMMARY_FIELDS:
+                    topic[field] = result.get(field, [] if field == "featured_comments" else "")
+            topics.append(topic)
+        selected[node_name] = {**data, "topics": topics}
+    return selected
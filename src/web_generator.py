@@ -0,0 +1,326 @@
+"""静态网页归档 - 每日 JSON + 预计算索引分片 + 静态 HTML 外壳
+
+目录结构（位于输出目录的 archive/ 下，随 RSS 一起部署到 GitHub Pages）：
+    index.html                  静态外壳，按需加载下面的 JSON
+    days/YYYY-MM-DD.json        当天的完整汇总（概览 + 各节点帖子和摘要）
+    index/months.json           [{"month": "YYYY-MM", "days": 天数}, ...]
+    index/date/YYYY-MM.json     该月每天的帖子数和概览
+    index/nodes.json            {节点: {"title", "emoji", "months": [...]}}
+    index/node/<节点>/YYYY-MM.json  该节点该月的帖子 [[日期, ID, 标题], ...]
+    index/kw/NN.json            关键词倒排分片 {词: [[日期, ID], ...]}
+
+每次运行只写当天的文件和本次涉及的索引分片；内容不变的分片不会重写。
+CI 上输出目录是空的，本地没有的分片会从 DIGEST_ARCHIVE_URL（已发布的 archive/ 地址）
+下载后再合并，未设置时视为空分片。
+"""
+import json
+import os
+import re
+from typing import Dict, List, Optional
+
+from artifacts import write_if_changed
+from timeutil import now
+
+ARCHIVE_DIR = "archive"
+
+# 关键词分片数（客户端用同样的哈希定位分片）
+KEYWORD_SHARDS = 64
+
+# 每个关键词保留的最新帖子数
+KEYWORD_POSTINGS = 200
+
+# 下载已发布分片的超时（秒）
+FETCH_TIMEOUT = 10
+
+_ASCII_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]")
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]{2,}")
+
+# 归档中保留的帖子字段
+TOPIC_FIELDS = ("id", "title", "url", "author", "replies", "created",
+                "summary", "comments_summary", "featured_comments")
+
+
+def tokenize(text: str) -> List[str]:
+    """标题分词：英文单词（>= 2 个字符）+ 连续汉字的二元组（与 index.html 中的实现一致）"""
+    text = text.lower()
+    tokens = set(_ASCII_WORD_RE.findall(text))
+    for run in _CJK_RUN_RE.findall(text):
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return sorted(tokens)
+
+
+def keyword_shard(token: str) -> str:
+    """关键词所在分片（FNV-1a 32 位哈希取模）"""
+    h = 0x811C9DC5
+    for byte in token.encode("utf-8"):
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return f"{h % KEYWORD_SHARDS:02d}"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+class ArchiveWriter:
+    """读取（本地或已发布的）分片、合并后按需写回"""
+
+    def __init__(self, output_dir: str, base_url: Optional[str] = None):
+        self.output_dir = output_dir
+        self.archive_dir = os.path.join(output_dir, ARCHIVE_DIR)
+        if base_url is None:
+            base_url = os.environ.get("DIGEST_ARCHIVE_URL", "")
+        self.base_url = base_url.rstrip("/")
+        self.session = None
+        self.changed = 0
+        self.written = 0
+
+    def load(self, rel_path: str, default):
+        path = os.path.join(self.archive_dir, rel_path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        if not self.base_url:
+            return default
+
+        if self.session is None:
+            from scraper import get_session
+
+            self.session = get_session()
+        try:
+            response = self.session.get(f"{self.base_url}/{rel_path}", timeout=FETCH_TIMEOUT)
+            if response.status_code == 404:
+                return default
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            # 取不到已发布的分片时不能覆盖它，直接中止本次归档
+            raise RuntimeError(f"Failed to fetch archive shard {rel_path}: {e}") from e
+
+    def save(self, rel_path: str, data):
+        content = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        path = os.path.join(self.archive_dir, rel_path)
+        self.written += 1
+        if write_if_changed(path, content, root=self.output_dir):
+            self.changed += 1
+
+
+def _day_digest(all_data: Dict[str, Dict], day: str, daily_overview: str) -> Dict:
+    nodes = {}
+    for node_name, data in all_data.items():
+        if not data["topics"]:
+            continue
+        config = data.get("config", {})
+        nodes[node_name] = {
+            "title": config.get("title", node_name),
+            "emoji": config.get("emoji", "📌"),
+            "topics": [
+                {field: topic[field] for field in TOPIC_FIELDS if field in topic}
+                for topic in data["topics"]
+            ],
+        }
+    return {"date": day, "overview": daily_overview, "nodes": nodes}
+
+
+def generate_archive(all_data: Dict[str, Dict], output_dir: str = "output",
+                     daily_overview: str = "", day: Optional[str] = None) -> bool:
+    """写入当天的 JSON 汇总并更新索引分片
+
+    Args:
+        all_data: 与 generate_rss 相同的数据
+        output_dir: 输出目录（归档写入其下的 archive/）
+        daily_overview: 今日概览
+        day: 日期（YYYY-MM-DD），默认今天
+
+    Returns:
+        bool: 是否成功
+    """
+    day = day or now().strftime("%Y-%m-%d")
+    month = day[:7]
+    writer = ArchiveWriter(output_dir)
+
+    try:
+        digest = _day_digest(all_data, day, daily_overview)
+        writer.save(f"days/{day}.json", digest)
+        topic_count = sum(len(node["topics"]) for node in digest["nodes"].values())
+
+        # 日期索引
+        months = writer.load("index/months.json", [])
+        month_days = writer.load(f"index/date/{month}.json", [])
+        month_days = [d for d in month_days if d["date"] != day]
+        month_days.append({"date": day, "count": topic_count, "overview": daily_overview})
+        month_days.sort(key=lambda d: d["date"], reverse=True)
+        writer.save(f"index/date/{month}.json", month_days)
+
+        months = [m for m in months if m["month"] != month]
+        months.append({"month": month, "days": len(month_days)})
+        months.sort(key=lambda m: m["month"], reverse=True)
+        writer.save("index/months.json", months)
+
+        # 节点索引（同一帖子再次出现时按 ID 去重，保留最新日期）
+        nodes_index = writer.load("index/nodes.json", {})
+        for node_name, node in digest["nodes"].items():
+            rel_path = f"index/node/{_safe_name(node_name)}/{month}.json"
+            entries = writer.load(rel_path, [])
+            ids = {topic["id"] for topic in node["topics"]}
+            entries = [e for e in entries if e[1] not in ids]
+            entries += [[day, topic["id"], topic["title"]] for topic in node["topics"]]
+            entries.sort(key=lambda e: (e[0], e[1]), reverse=True)
+            writer.save(rel_path, entries)
+
+            info = nodes_index.setdefault(node_name, {"months": []})
+            info["title"] = node["title"]
+            info["emoji"] = node["emoji"]
+            info["file"] = _safe_name(node_name)
+            if month not in info["months"]:
+                info["months"] = sorted(info["months"] + [month], reverse=True)
+        writer.save("index/nodes.json", nodes_index)
+
+        # 关键词倒排索引：只更新本次标题涉及的分片
+        postings: Dict[str, Dict[str, List]] = {}
+        seen = set()
+        for node in digest["nodes"].values():
+            for topic in node["topics"]:
+                if topic["id"] in seen:
+                    continue
+                seen.add(topic["id"])
+                for token in tokenize(topic["title"]):
+                    shard = postings.setdefault(keyword_shard(token), {})
+                    shard.setdefault(token, []).append([day, topic["id"]])
+
+        for shard_name, tokens in sorted(postings.items()):
+            rel_path = f"index/kw/{shard_name}.json"
+            shard = writer.load(rel_path, {})
+            for token, new_entries in tokens.items():
+                ids = {e[1] for e in new_entries}
+                entries = new_entries + [e for e in shard.get(token, []) if e[1] not in ids]
+                entries.sort(key=lambda e: (e[0], e[1]), reverse=True)
+                shard[token] = entries[:KEYWORD_POSTINGS]
+            writer.save(rel_path, dict(sorted(shard.items())))
+
+        write_if_changed(os.path.join(writer.archive_dir, "index.html"), ARCHIVE_HTML,
+                         root=output_dir)
+        print(f"✅ Archive updated: {writer.archive_dir} "
+              f"({writer.changed}/{writer.written} files changed)")
+        return True
+
+    except Exception as e:
+        print(f"❌ Failed to update archive: {e}")
+        return False
+
+
+# 静态外壳：只加载当前视图需要的 JSON
+ARCHIVE_HTML = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>V2EX 每日汇总 - 归档</title>
+<style>
+body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; max-width: 760px; margin: 0 auto; padding: 16px; color: #333; line-height: 1.6; }
+header { display: flex; gap: 8px; flex-wrap: wrap; align-items: center; margin-bottom: 16px; }
+select, input { padding: 4px 8px; font-size: 14px; }
+a { color: #4a90d9; text-decoration: none; }
+.overview { background: #f5f7fa; padding: 8px 12px; border-radius: 6px; }
+.topic { padding: 8px 0; border-bottom: 1px solid #eee; }
+.meta, .muted { color: #999; font-size: 12px; }
+.summary { font-size: 14px; color: #555; }
+</style>
+</head>
+<body>
+<h1>📰 V2EX 每日汇总</h1>
+<header>
+  <select id="month"></select>
+  <select id="day"></select>
+  <select id="node"><option value="">按节点浏览…</option></select>
+  <input id="q" type="search" placeholder="搜索标题关键词">
+</header>
+<main id="main" class="muted">加载中…</main>
+<script>
+const cache = {};
+const load = (path) => cache[path] || (cache[path] = fetch(path).then(r => r.ok ? r.json() : null));
+const $ = (id) => document.getElementById(id);
+const esc = (s) => String(s == null ? "" : s).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+
+// 与 web_generator.tokenize / keyword_shard 保持一致
+function tokenize(text) {
+  text = text.toLowerCase();
+  const tokens = new Set(text.match(/[a-z0-9][a-z0-9+#.]*[a-z0-9+#]/g) || []);
+  for (const run of text.match(/[\\u4e00-\\u9fff]{2,}/g) || []) {
+    for (let i = 0; i < run.length - 1; i++) tokens.add(run.slice(i, i + 2));
+  }
+  return [...tokens];
+}
+function shardOf(token) {
+  let h = 0x811c9dc5;
+  for (const b of new TextEncoder().encode(token)) h = Math.imul(h ^ b, 0x01000193) >>> 0;
+  return String(h % 64).padStart(2, "0");
+}
+
+function topicHtml(t, day) {
+  const summary = t.summary ? `<div class="summary">💡 ${esc(t.summary)}</div>` : "";
+  const meta = day ? `<div class="meta">${esc(day)}</div>` : "";
+  return `<div class="topic"><a href="${esc(t.url || "https://www.v2ex.com/t/" + t.id)}">${esc(t.title)}</a>${meta}${summary}</div>`;
+}
+
+async function showDay(day) {
+  const digest = await load(`days/${day}.json`);
+  if (!digest) { $("main").textContent = "没有这一天的汇总"; return; }
+  let html = digest.overview ? `<p class="overview">${esc(digest.overview)}</p>` : "";
+  for (const [name, node] of Object.entries(digest.nodes)) {
+    html += `<h2>${esc(node.emoji)} ${esc(node.title)}</h2>` + node.topics.map(t => topicHtml(t)).join("");
+  }
+  $("main").innerHTML = html;
+}
+
+async function showMonth(month) {
+  const days = await load(`index/date/${month}.json`) || [];
+  $("day").innerHTML = days.map(d => `<option value="${d.date}">${d.date}（${d.count}）</option>`).join("");
+  if (days.length) showDay(days[0].date);
+}
+
+async function showNode(name) {
+  const nodes = await load("index/nodes.json");
+  const info = nodes[name];
+  const month = $("month").value;
+  const entries = await load(`index/node/${info.file}/${month}.json`) || [];
+  $("main").innerHTML = `<h2>${esc(info.emoji)} ${esc(info.title)} · ${esc(month)}</h2>` +
+    (entries.map(([day, id, title]) => topicHtml({id, title}, day)).join("") || `<p class="muted">本月没有帖子</p>`);
+}
+
+async function search(query) {
+  const tokens = tokenize(query);
+  if (!tokens.length) return;
+  const lists = await Promise.all(tokens.map(async t => ((await load(`index/kw/${shardOf(t)}.json`)) || {})[t] || []));
+  let hits = lists[0];
+  for (const list of lists.slice(1)) {
+    const ids = new Set(list.map(e => e[1]));
+    hits = hits.filter(e => ids.has(e[1]));
+  }
+  hits = hits.slice(0, 20);
+  // 只加载命中结果所在的日期文件
+  const days = {};
+  for (const [day] of hits) days[day] = days[day] || load(`days/${day}.json`);
+  const html = [];
+  for (const [day, id] of hits) {
+    const digest = await days[day];
+    const topic = digest && Object.values(digest.nodes).flatMap(n => n.topics).find(t => t.id === id);
+    if (topic) html.push(topicHtml(topic, day));
+  }
+  $("main").innerHTML = html.join("") || `<p class="muted">没有找到相关帖子</p>`;
+}
+
+(async () => {
+  const [months, nodes] = await Promise.all([load("index/months.json"), load("index/nodes.json")]);
+  if (!months || !months.length) { $("main").textContent = "还没有归档"; return; }
+  $("month").innerHTML = months.map(m => `<option>${m.month}</option>`).join("");
+  $("node").innerHTML += Object.entries(nodes || {}).map(([name, n]) => `<option value="${esc(name)}">${esc(n.emoji)} ${esc(n.title)}</option>`).join("");
+  $("month").onchange = () => showMonth($("month").value);
+  $("day").onchange = () => showDay($("day").value);
+  $("node").onchange = () => $("node").value ? showNode($("node").value) : showDay($("day").value);
+  $("q").onkeydown = (e) => { if (e.key === "Enter") search($("q").value); };
+  showMonth(months[0].month);
+})();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,369 @@
+"""任务队列模式 - 把抓取和摘要拆成任务，由多个 worker 进程并行领取
+
+队列存放在一个 SQLite 文件中，多个 worker（各自使用自己的 AZURE_OPENAI_KEY 等凭据）
+通过租约领取任务：执行期间 worker 定期续约，worker 退出或卡死导致租约过期的任务会被
+其他 worker 重新领取；失败的任务按指数退避重试，超过最大次数后标记为失败。
+没有模型凭据的 worker 只领取抓取任务。
+
+只支持单机部署：队列文件必须在本地磁盘上。WAL 模式和 SQLite 的文件锁在 NFS / SMB 等
+网络文件系统上不可靠，不要把队列文件放在共享存储上让多台机器同时访问。
+
+coordinator 负责：
+1. 为全站热门和每个节点各入队一个抓取任务
+2. 抓取全部完成后按配置顺序去重，为每个节点入队一个摘要任务
+3. 摘要全部完成后组装 all_data，生成 RSS 并发送邮件
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 租约时长（秒），超时未续约的任务可被其他 worker 领取
+LEASE_SECONDS = 300
+
+# 执行任务期间的续约间隔（秒）
+HEARTBEAT_SECONDS = LEASE_SECONDS / 3
+
+# 每个任务最多尝试次数
+MAX_ATTEMPTS = 3
+
+# 失败重试的基础退避（秒），按 2^n 增长
+RETRY_BACKOFF = 10
+
+# worker 空闲轮询间隔（秒）
+POLL_INTERVAL = 2
+
+# 任务状态
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# 任务类型
+TASK_KINDS = ("fetch", "summarize")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    UNIQUE (run_id, kind, key)
+)
+"""
+
+
+class WorkQueue:
+    """基于 SQLite 的任务队列"""
+
+    def __init__(self, path: str):
+        output_dir = os.path.dirname(path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        # isolation_level=None：手动控制事务，领取任务时用 BEGIN IMMEDIATE 加写锁
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(_SCHEMA)
+
+    def enqueue(self, run_id: str, kind: str, key: str, payload: Dict):
+        """入队任务
+
+        同一 (run_id, kind, key) 只保留一条：已完成或正在执行的任务保持不变（沿用同一个
+        run_id 可以续跑），已失败的任务用新的 payload 重新排队，重试次数清零
+        """
+        self.conn.execute(
+            """INSERT INTO tasks (run_id, kind, key, payload) VALUES (?, ?, ?, ?)
+               ON CONFLICT (run_id, kind, key) DO UPDATE
+               SET payload = excluded.payload, status = ?, attempts = 0, available_at = 0,
+                   error = NULL, worker = NULL
+               WHERE status = ?""",
+            (run_id, kind, key, json.dumps(payload, ensure_ascii=False), PENDING, FAILED),
+        )
+
+    def claim(self, worker: str, lease_seconds: int = LEASE_SECONDS,
+              kinds: Tuple[str, ...] = TASK_KINDS) -> Optional[Dict]:
+        """领取一个可执行的任务（待执行，或租约已过期），没有则返回 None
+
+        kinds 限定可领取的任务类型（如没有模型凭据的 worker 只领取抓取任务）
+        """
+        now = time.time()
+        placeholders = ", ".join("?" * len(kinds))
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                f"""SELECT * FROM tasks
+                   WHERE ((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))
+                     AND kind IN ({placeholders})
+                   ORDER BY id LIMIT 1""",
+                (PENDING, now, LEASED, now, *kinds),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (LEASED, worker, now + lease_seconds, row["id"]),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        task = dict(row)
+        task["attempts"] += 1
+        task["payload"] = json.loads(task["payload"])
+        return task
+
+    def extend_lease(self, task: Dict, worker: str, lease_seconds: int = LEASE_SECONDS) -> bool:
+        """续约；租约已被其他 worker 接管时返回 False"""
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time() + lease_seconds, task["id"], worker, LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, task: Dict, worker: str):
+        """放回任务且不计入重试次数（本 worker 无法处理，留给其他 worker）"""
+        self.conn.execute(
+            "UPDATE tasks SET status = ?, attempts = attempts - 1, worker = NULL "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (PENDING, task["id"], worker, LEASED),
+        )
+
+    def complete(self, task: Dict, worker: str, result) -> bool:
+        """提交结果；租约已被其他 worker 接管时返回 False"""
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = ?, result = ?, error = NULL WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, json.dumps(result, ensure_ascii=False), task["id"], worker, LEASED),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, task: Dict, worker: str, error: str, max_attempts: int = MAX_ATTEMPTS):
+        """记录失败：未超过最大次数时退避后重新排队，否则标记为失败"""
+        if task["attempts"] < max_attempts:
+            status = PENDING
+            available_at = time.time() + RETRY_BACKOFF * 2 ** (task["attempts"] - 1)
+        else:
+            status = FAILED
+            available_at = 0
+        self.conn.execute(
+            "UPDATE tasks SET status = ?, available_at = ?, error = ? WHERE id = ? AND worker = ? AND status = ?",
+            (status, available_at, error, task["id"], worker, LEASED),
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def counts(self, run_id: str, kind: str) -> Dict[str, int]:
+        """统计某次运行中某类任务各状态的数量"""
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) AS n FROM tasks WHERE run_id = ? AND kind = ? GROUP BY status",
+            (run_id, kind),
+        ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def results(self, run_id: str, kind: str) -> Dict[str, Optional[object]]:
+        """返回 {key: 结果}，失败的任务结果为 None"""
+        rows = self.conn.execute(
+            "SELECT key, status, result FROM tasks WHERE run_id = ? AND kind = ?",
+            (run_id, kind),
+        ).fetchall()
+        return {
+            row["key"]: json.loads(row["result"]) if row["status"] == DONE else None
+            for row in rows
+        }
+
+
+class MissingCredentials(RuntimeError):
+    """当前 worker 没有执行该任务所需的凭据"""
+
+
+def has_llm_credentials() -> bool:
+    return bool(os.environ.get("AZURE_OPENAI_KEY"))
+
+
+def claimable_kinds() -> Tuple[str, ...]:
+    """当前 worker 可以领取的任务类型"""
+    if has_llm_credentials():
+        return TASK_KINDS
+    return tuple(kind for kind in TASK_KINDS if kind != "summarize")
+
+
+def execute_task(task: Dict):
+    """执行单个任务，返回可 JSON 序列化的结果，失败时抛出异常"""
+    kind = task["kind"]
+    payload = task["payload"]
+
+    if kind == "fetch":
+        from config import NodePolicy
+        from scraper import fetch_policy_topics
+
+        # 策略随任务一起下发，worker 与 coordinator 的配置不一致也没关系
+        return fetch_policy_topics(NodePolicy(**payload["policy"]), raise_errors=True)
+
+    if kind == "summarize":
+        from summarizer import summarize_topics
+
+        if not has_llm_credentials():
+            raise MissingCredentials("AZURE_OPENAI_KEY not set on this worker")
+        # 有帖子没有得到摘要时抛出异常，由队列退避重试，而不是把降级结果记为完成
+        return summarize_topics(payload["topics"], is_hot=payload["tier"] == "hot", raise_errors=True)
+
+    raise ValueError(f"Unknown task kind: {kind}")
+
+
+class LeaseHeartbeat:
+    """执行任务期间在后台线程中定期续约（SQLite 连接不能跨线程共用，单独打开一个）"""
+
+    def __init__(self, queue_path: str, task: Dict, worker: str, interval: float = HEARTBEAT_SECONDS):
+        self.queue_path = queue_path
+        self.task = task
+        self.worker = worker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        queue = WorkQueue(self.queue_path)
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    if not queue.extend_lease(self.task, self.worker):
+                        print(f"  ⚠️ Lease on {self.task['key']} was taken over while running")
+                        return
+                except sqlite3.Error as e:
+                    # 偶发的锁冲突不影响任务本身，下一轮再续
+                    print(f"  ⚠️ Lease heartbeat for {self.task['key']} failed: {e}")
+        finally:
+            queue.close()
+
+
+def run_worker(queue_path: str, idle_exit: float = 60) -> int:
+    """worker 主循环，连续空闲 idle_exit 秒后退出（<= 0 表示一直运行）
+
+    返回: 完成的任务数
+    """
+    queue = WorkQueue(queue_path)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    kinds = claimable_kinds()
+    print(f"👷 Worker {worker} polling {queue_path} ({', '.join(kinds)})")
+
+    done = 0
+    idle_since = time.time()
+    while True:
+        task = queue.claim(worker, kinds=kinds)
+        if task is None:
+            if idle_exit > 0 and time.time() - idle_since > idle_exit:
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        print(f"  ▶ [{task['kind']}] {task['key']} (attempt {task['attempts']})")
+        try:
+            with LeaseHeartbeat(queue_path, task, worker):
+                result = execute_task(task)
+        except MissingCredentials as e:
+            print(f"  ↩ [{task['kind']}] {task['key']}: {e}, released")
+            queue.release(task, worker)
+        except Exception as e:
+            print(f"  ✗ [{task['kind']}] {task['key']}: {e}")
+            queue.fail(task, worker, str(e))
+        else:
+            if queue.complete(task, worker, result):
+                done += 1
+            else:
+                print(f"  ⚠️ Lease on {task['key']} expired, result discarded")
+        idle_since = time.time()
+
+    print(f"👷 Worker {worker} finished {done} tasks")
+    return done
+
+
+def wait_for(queue: WorkQueue, run_id: str, kind: str, timeout: float) -> bool:
+    """等待某类任务全部结束（完成或失败），超时返回 False"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        counts = queue.counts(run_id, kind)
+        if not counts.get(PENDING) and not counts.get(LEASED):
+            return True
+        time.sleep(POLL_INTERVAL)
+    return False
+
+
+def coordinate(queue_path: str, run_id: str, timeout: float = 3600) -> Optional[Dict[str, Dict]]:
+    """入队抓取和摘要任务并等待完成，返回组装好的 all_data（超时返回 None）"""
+    from config import get_config
+
+    queue = WorkQueue(queue_path)
+    try:
+        policies = get_config().all_policies()
+
+        # 1. 抓取任务
+        print(f"📡 Enqueueing {len(policies)} fetch tasks (run {run_id})...")
+        for policy in policies:
+            queue.enqueue(run_id, "fetch", policy.name, {"policy": policy.as_dict()})
+        if not wait_for(queue, run_id, "fetch", timeout):
+            print("❌ Timed out waiting for fetch tasks")
+            return None
+
+        # 2. 按优先级顺序去重（与 scraper.iter_nodes 一致），入队摘要任务
+        fetched = queue.results(run_id, "fetch")
+        all_data = {}
+        seen_ids = set()
+        enqueued = set()
+        for policy in policies:
+            node_name = policy.name
+            topics = fetched.get(node_name)
+            if topics is None:
+                print(f"  ⚠️ Fetch failed for {node_name}")
+                topics = []
+            if node_name != "_hot":
+                topics = [t for t in topics if t["id"] not in seen_ids][:policy.limit]
+            seen_ids.update(t["id"] for t in topics)
+            all_data[node_name] = {"config": policy.as_dict(), "topics": topics}
+
+            if topics and policy.summary != "none":
+                queue.enqueue(run_id, "summarize", node_name,
+                              {"topics": topics, "tier": policy.summary})
+                enqueued.add(node_name)
+
+        print("🤖 Waiting for summarize tasks...")
+        if not wait_for(queue, run_id, "summarize", timeout):
+            print("❌ Timed out waiting for summarize tasks")
+            return None
+
+        # 3. 组装结果，摘要失败的节点保留未摘要的帖子
+        # 续跑同一个 run_id 时，队列中可能有上次运行（配置不同）留下的摘要结果，只取本次入队的节点
+        summarized = queue.results(run_id, "summarize")
+        for node_name, topics in summarized.items():
+            if node_name not in enqueued:
+                print(f"  ⚠️ Ignoring stale summarize result for {node_name}")
+                continue
+            if topics is None:
+                print(f"  ⚠️ Summarize failed for {node_name}, using raw topics")
+                continue
+            all_data[node_name]["topics"] = topics
+        return all_data
+    finally:
+        queue.close()
@@ -0,0 +1,5 @@
+"""src/ 下是平铺的模块（main.py 直接运行），测试时把它加入导入路径"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
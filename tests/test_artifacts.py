@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+import artifacts
+from artifacts import MANIFEST_NAME, content_hash, save_manifest, write_if_changed
+from rss_generator import generate_rss
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    artifacts.reset()
+    yield
+    artifacts.reset()
+
+
+def feed(build_date: str) -> str:
+    return f"<rss><channel><lastBuildDate>{build_date}</lastBuildDate><item>x</item></channel></rss>"
+
+
+def test_hash_ignores_volatile_fields_only_for_xml():
+    assert content_hash(feed("a").encode(), "f.xml") == content_hash(feed("b").encode(), "f.xml")
+    assert content_hash(feed("a").encode(), "f.html") != content_hash(feed("b").encode(), "f.html")
+
+
+def test_unchanged_content_is_not_rewritten(tmp_path):
+    path = str(tmp_path / "feed.xml")
+    assert write_if_changed(path, feed("Mon"))
+    assert save_manifest(str(tmp_path))
+    mtime = os.path.getmtime(path)
+
+    assert not write_if_changed(path, feed("Tue"))
+    assert not save_manifest(str(tmp_path))
+    assert os.path.getmtime(path) == mtime
+
+    assert write_if_changed(path, feed("Tue").replace("x", "y"))
+    assert save_manifest(str(tmp_path))
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert set(manifest["files"]) == {"feed.xml"}
+
+
+def test_missing_file_is_written_but_not_changed(tmp_path):
+    path = str(tmp_path / "feed.xml")
+    write_if_changed(path, feed("Mon"))
+    save_manifest(str(tmp_path))
+    os.remove(path)
+    # 已发布的 manifest 中哈希相同：本地缺失的文件照常写出，但不算变化
+    assert not write_if_changed(path, feed("Tue"))
+    assert os.path.exists(path)
+    assert "Tue" in open(path, encoding="utf-8").read()
+    assert not save_manifest(str(tmp_path))
+
+
+def test_existing_file_with_same_hash_is_not_rewritten(tmp_path):
+    path = str(tmp_path / "feed.xml")
+    write_if_changed(path, feed("Mon"))
+    save_manifest(str(tmp_path))
+    assert not write_if_changed(path, feed("Tue"))
+    assert "Mon" in open(path, encoding="utf-8").read()
+
+
+def test_subdirectory_paths_are_relative_to_root(tmp_path):
+    write_if_changed(str(tmp_path / "archive" / "days" / "d.json"), "{}", root=str(tmp_path))
+    save_manifest(str(tmp_path))
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert "archive/days/d.json" in manifest["files"]
+
+
+def test_reset_drops_writes_from_failed_run(tmp_path):
+    write_if_changed(str(tmp_path / "stale.xml"), feed("Mon"))
+    artifacts.reset()
+    write_if_changed(str(tmp_path / "fresh.xml"), feed("Mon"))
+    save_manifest(str(tmp_path))
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    assert set(manifest["files"]) == {"fresh.xml"}
+
+
+def test_rss_without_timestamps_is_stable(tmp_path):
+    all_data = {"_hot": {"config": {"name": "_hot"}, "topics": [
+        {"id": 1, "title": "t", "url": "https://www.v2ex.com/t/1", "replies": 0},
+    ]}}
+    path = str(tmp_path / "v2ex-digest.xml")
+    generate_rss(all_data, path)
+    save_manifest(str(tmp_path))
+    generate_rss(all_data, path)
+    assert not save_manifest(str(tmp_path))
@@ -0,0 +1,70 @@
+import pytest
+
+from comment_ranker import is_noise, normalize, pick_featured, rank_replies
+
+
+def reply(content, author="someone"):
+    return {"content": content, "author": author}
+
+
+def test_normalize_strips_mentions_links_and_punctuation():
+    assert normalize("@alice 看这里 https://example.com/x?y=1 ！！OK") == "看这里ok"
+
+
+@pytest.mark.parametrize("text", ["+1", "mark", "Mark!!", "@bob", "👍👍👍", "感谢分享～", "dd"])
+def test_noise(text):
+    assert is_noise(text)
+
+
+@pytest.mark.parametrize("text", ["我们组用的是 PostgreSQL", "内存泄漏是因为缓存没有上限"])
+def test_not_noise(text):
+    assert not is_noise(text)
+
+
+def test_noise_and_near_duplicates_are_dropped():
+    replies = [
+        reply("+1"),
+        reply("这个方案在高并发下会有锁竞争的问题", "a"),
+        reply("这个方案在高并发下会有锁竞争的问题！", "b"),
+        reply("mark"),
+        reply("可以换成无锁队列试试", "c"),
+    ]
+    ranked = rank_replies(replies)
+    assert sorted(r["author"] for r in ranked) == ["a", "c"]
+
+
+def test_reply_repeating_the_post_scores_lower():
+    context = "Python 的 GIL 什么时候会被移除"
+    scores = {r["author"]: r["score"] for r in rank_replies([
+        reply("Python 的 GIL 什么时候会被移除", "echo"),
+        reply("3.13 已经有实验性的 free-threaded 构建了", "fresh"),
+    ], context)}
+    assert scores["fresh"] > scores["echo"]
+
+
+def test_mentioned_authors_score_higher():
+    replies = [
+        reply("我觉得应该先压测再决定要不要拆服务", "alice"),
+        reply("我们去年拆完服务运维成本翻了一倍", "bob"),
+        reply("@alice 同意，压测数据最有说服力", "carol"),
+        reply("@alice 压测用什么工具比较好呢", "dave"),
+    ]
+    scores = {r["author"]: r["score"] for r in rank_replies(replies)}
+    assert scores["alice"] > scores["bob"]
+
+
+def test_limit_and_order():
+    replies = [reply(f"第 {i} 条评论" + "内容" * i, str(i)) for i in range(1, 12)]
+    ranked = rank_replies(replies, limit=3)
+    assert len(ranked) == 3
+    assert [r["score"] for r in ranked] == sorted((r["score"] for r in ranked), reverse=True)
+
+
+def test_pick_featured_ranks_raw_replies_and_keeps_model_format():
+    replies = [reply("+1"), reply("换成 uvloop 之后吞吐提升了三成", "a")]
+    assert pick_featured(replies) == [{"author": "a", "content": "换成 uvloop 之后吞吐提升了三成"}]
+
+
+def test_pick_featured_uses_ranked_order_as_is():
+    ranked = [{"content": "第二", "author": "b", "score": 2}, {"content": "第一", "author": "a", "score": 1}]
+    assert [r["author"] for r in pick_featured(ranked, limit=1)] == ["b"]
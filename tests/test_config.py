@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+import config
+from config import HOT_NODE, ConfigError, NodePolicy, compile_config
+
+
+def test_list_form_uses_defaults():
+    compiled = compile_config([{"name": "programmer"}])
+    policy = compiled.policy("programmer")
+    assert policy == NodePolicy(name="programmer", title="programmer")
+    assert policy.fetch_limit == 20
+    assert compiled.policy(HOT_NODE) is compiled.hot
+
+
+def test_defaults_hot_and_priority_order():
+    compiled = compile_config({
+        "defaults": {"limit": 5, "window_hours": 24, "summary": "none"},
+        "hot": {"limit": 10},
+        "nodes": [
+            {"name": "a"},
+            {"name": "b", "priority": 5, "summary": "hot"},
+            {"name": "c"},
+        ],
+    })
+    assert [p.name for p in compiled.nodes] == ["b", "a", "c"]
+    assert compiled.hot.limit == 10 and compiled.hot.summary == "hot"
+    b = compiled.policy("b")
+    assert (b.limit, b.window_hours, b.summary) == (5, 24.0, "hot")
+    assert [p.name for p in compiled.all_policies()] == [HOT_NODE, "b", "a", "c"]
+
+
+@pytest.mark.parametrize("raw, message", [
+    ("nodes", "expected an object or a list"),
+    ({"nodes": {}}, "nodes: expected a list"),
+    ({"nodes": [{}]}, "nodes[0].name: required"),
+    ({"nodes": [{"name": "a"}, {"name": "a"}]}, "duplicate node"),
+    ({"nodes": [{"name": HOT_NODE}]}, "duplicate node"),
+    ({"nodes": [{"name": "a", "limt": 3}]}, "unknown field(s) limt"),
+    ({"nodes": [{"name": "a", "limit": "3"}]}, "nodes[0].limit: expected an integer"),
+    ({"nodes": [{"name": "a", "limit": True}]}, "expected an integer"),
+    ({"nodes": [{"name": "a", "limit": -1}]}, "must be >= 0"),
+    ({"nodes": [{"name": "a", "window_hours": 0}]}, "expected a positive number"),
+    ({"nodes": [{"name": "a", "sort": "votes"}]}, "nodes[0].sort"),
+    ({"nodes": [{"name": "a", "summary": "long"}]}, "nodes[0].summary"),
+    ({"nodes": [{"name": "a", "theme": 1}]}, "nodes[0].theme: expected a string"),
+    ({"defaults": {"name": "x"}}, "defaults.name: not allowed"),
+    ({"hot": {"name": "x"}}, "hot.name: not allowed"),
+    ({"hot": []}, "hot: expected an object"),
+])
+def test_invalid_configs(raw, message):
+    with pytest.raises(ConfigError) as info:
+        compile_config(raw)
+    assert message in str(info.value)
+
+
+def test_get_config_reads_env_and_recompiles(monkeypatch):
+    monkeypatch.setattr(config, "_compiled", None)
+    monkeypatch.setenv("V2EX_NODES", json.dumps([{"name": "a"}]))
+    first = config.get_config()
+    assert config.get_config() is first
+    monkeypatch.setenv("V2EX_NODES", json.dumps([{"name": "b"}]))
+    assert [p.name for p in config.get_config().nodes] == ["b"]
+
+    monkeypatch.setenv("V2EX_NODES", "[oops")
+    with pytest.raises(ConfigError, match="V2EX_NODES: invalid JSON"):
+        config.get_config()
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from daemon import CronSchedule
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_daily_schedule():
+    schedule = CronSchedule("0 8 * * *")
+    assert schedule.next_after(utc(2026, 3, 1, 8, 0)) == utc(2026, 3, 2, 8, 0)
+    assert schedule.next_after(utc(2026, 3, 1, 7, 59, 30)) == utc(2026, 3, 1, 8, 0)
+
+
+def test_day_of_month_or_weekday_when_both_restricted():
+    # 每月 1 日，或每周一
+    schedule = CronSchedule("0 8 1 * 1")
+    assert schedule.matches(utc(2026, 3, 1, 8, 0))    # 周日，1 日
+    assert schedule.matches(utc(2026, 3, 2, 8, 0))    # 周一
+    assert not schedule.matches(utc(2026, 3, 3, 8, 0))
+
+
+def test_star_field_keeps_and_semantics():
+    schedule = CronSchedule("0 8 * * 1")
+    assert not schedule.matches(utc(2026, 3, 1, 8, 0))
+    assert schedule.matches(utc(2026, 3, 2, 8, 0))
+    # 以 * 开头的步长也视为不限定
+    schedule = CronSchedule("0 8 */2 * 1")
+    assert schedule.matches(utc(2026, 3, 9, 8, 0))      # 周一，9 日
+    assert not schedule.matches(utc(2026, 3, 2, 8, 0))  # 周一，2 日
+
+
+def test_ranges_steps_and_sunday_as_seven():
+    schedule = CronSchedule("*/15 9-17 * * 7")
+    assert schedule.matches(utc(2026, 3, 1, 9, 45))
+    assert not schedule.matches(utc(2026, 3, 1, 9, 50))
+    assert not schedule.matches(utc(2026, 3, 2, 9, 45))
+
+
+@pytest.mark.parametrize("expr", ["0 8 * *", "60 8 * * *", "0 8 * * 8", "0 8 */0 * *"])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        CronSchedule(expr)
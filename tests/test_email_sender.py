@@ -0,0 +1,115 @@
+import sys
+import time
+import types
+
+import pytest
+
+from email_sender import _byte_size, build_digest_emails, send_html_email
+
+
+class FakeStats:
+    """render_stats_section 需要的最小接口，产出较大的统计区"""
+    days = {"2026-01-01": {}}
+
+    def node_stats(self, node, days=7):
+        return {"topics": 10, "daily_volume": 1.4, "median_replies": 3}
+
+    def top_authors(self, days=7, limit=5):
+        return [(f"author{i}" * 5, i) for i in range(limit)]
+
+
+def make_data(nodes: int, topics: int = 10, themes=None):
+    now = int(time.time())
+    all_data = {"_hot": {"config": {"name": "_hot"}, "topics": [
+        {"id": i, "title": f"热门 {i}", "url": f"https://www.v2ex.com/t/{i}", "replies": 10,
+         "created": now, "author": "a", "summary": "摘要" * 50, "featured_comments": []}
+        for i in range(5)
+    ]}}
+    for n in range(nodes):
+        name = f"node{n}"
+        config = {"name": name, "title": name, "emoji": "📌"}
+        if themes:
+            config["theme"] = themes[n % len(themes)]
+        all_data[name] = {"config": config, "topics": [
+            {"id": 1000 * (n + 1) + i, "title": f"{name} 帖子 {i}", "url": "https://www.v2ex.com/t/1",
+             "replies": i, "created": now, "author": "a", "summary": "内容" * 60}
+            for i in range(topics)
+        ]}
+    return all_data
+
+
+@pytest.mark.parametrize("nodes", [1, 20, 80])
+def test_folded_email_stays_within_budget_with_stats(nodes):
+    budget = 100 * 1024
+    emails = build_digest_emails(make_data(nodes), "概览", stats=FakeStats(), budget=budget)
+    assert len(emails) == 1
+    assert _byte_size(emails[0]) <= budget
+    assert "社区统计" in emails[0] and "共收录" in emails[0]
+
+
+def test_small_budget_folds_nodes_into_rss_link():
+    emails = build_digest_emails(make_data(30), budget=40 * 1024, stats=FakeStats())
+    assert _byte_size(emails[0]) <= 40 * 1024
+    assert "在 RSS 中查看完整内容" in emails[0]
+
+
+def test_split_parts_stay_within_budget():
+    budget = 60 * 1024
+    emails = build_digest_emails(make_data(40), split=True, stats=FakeStats(), budget=budget)
+    assert len(emails) > 1
+    assert all(_byte_size(html) <= budget for html in emails)
+    assert "社区统计" in emails[-1]
+
+
+def test_split_groups_nodes_by_theme():
+    emails = build_digest_emails(make_data(4, topics=2, themes=["技术", "生活"]), split=True,
+                                 budget=None)
+    assert len(emails) == 2
+    # 技术：node0、node2；生活：node1、node3
+    assert "node-node0" in emails[0] and "node-node2" in emails[0]
+    assert "node-node1" in emails[1] and "node-node3" in emails[1]
+    assert "热门" in emails[0]
+
+
+def test_without_themes_split_matches_single_email_when_it_fits():
+    data = make_data(3, topics=2)
+    assert len(build_digest_emails(data, split=True)) == 1
+
+
+def fake_resend(monkeypatch, send):
+    """用假的 resend 模块替换 SDK，send 的签名与 resend>=2.8.0 的 Emails.send 一致"""
+    module = types.ModuleType("resend")
+    module.Emails = type("Emails", (), {"send": staticmethod(send)})
+    monkeypatch.setitem(sys.modules, "resend", module)
+    monkeypatch.setenv("RESEND_API_KEY", "re_test")
+    return module
+
+
+def test_send_passes_idempotency_key(monkeypatch):
+    calls = []
+
+    def send(params, options=None):
+        calls.append((params, options))
+        return {"id": "email-1"}
+
+    module = fake_resend(monkeypatch, send)
+    assert send_html_email("a@example.com", "<p>hi</p>", 3)
+    assert module.api_key == "re_test"
+    params, options = calls[0]
+    assert params["to"] == ["a@example.com"]
+    assert len(options["idempotency_key"]) == 64
+
+
+def test_retry_reuses_idempotency_key(monkeypatch):
+    calls = []
+
+    def send(params, options=None):
+        calls.append(options["idempotency_key"])
+        if len(calls) == 1:
+            raise ConnectionError("reset by peer")
+        return {"id": "email-1"}
+
+    fake_resend(monkeypatch, send)
+    monkeypatch.setattr("resilience.time.sleep", lambda seconds: None)
+    assert send_html_email("a@example.com", "<p>hi</p>", 3)
+    assert len(calls) == 2 and calls[0] == calls[1]
@@ -0,0 +1,86 @@
+import importlib
+import json
+
+import pytest
+
+import fast_json
+import scraper
+
+TOPIC = {
+    "id": 1, "title": "标题", "replies": 3, "created": 1700000000, "content": "正文",
+    "member": {"username": "alice", "avatar_large": "x"},
+    "node": {"name": "python", "title": "Python", "topics": 10},
+}
+
+# 每个用例：在完整帖子的基础上覆盖（None 表示显式的 null）或删除的字段
+CASES = {
+    "full": ({}, ()),
+    "null_replies_and_member": ({"replies": None, "member": None}, ()),
+    "null_node": ({"node": None}, ()),
+    "null_content_and_created": ({"content": None, "created": None}, ()),
+    "null_username": ({"member": {"username": None}}, ()),
+    "missing_member_and_node": ({}, ("member", "node")),
+    "missing_scalars": ({}, ("replies", "created", "content")),
+    "empty_member": ({"member": {}}, ()),
+}
+
+
+def make_payload(overrides, missing) -> bytes:
+    topic = {**TOPIC, **overrides}
+    for key in missing:
+        topic.pop(key)
+    return json.dumps([topic], ensure_ascii=False).encode("utf-8")
+
+
+def load_backend(monkeypatch, backend):
+    monkeypatch.setenv("V2EX_JSON_BACKEND", backend)
+    module = importlib.reload(fast_json)
+    if module.BACKEND != backend:
+        pytest.skip(f"{backend} not installed")
+    return module
+
+
+@pytest.fixture(autouse=True)
+def restore_backend(monkeypatch):
+    yield
+    monkeypatch.delenv("V2EX_JSON_BACKEND", raising=False)
+    importlib.reload(fast_json)
+
+
+@pytest.mark.parametrize("backend", ["orjson", "msgspec"])
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_topics_decode_like_stdlib(monkeypatch, backend, case):
+    payload = make_payload(*CASES[case])
+    expected = load_backend(monkeypatch, "stdlib").decode_topics(payload)
+    decoded = load_backend(monkeypatch, backend).decode_topics(payload)
+
+    fields = ("id", "title", "replies", "created", "content", "member", "node")
+    for key in fields:
+        assert (key in decoded[0]) == (key in expected[0])
+        if key in ("member", "node") and isinstance(expected[0].get(key), dict):
+            # msgspec 只保留需要的子字段
+            for sub, value in decoded[0][key].items():
+                assert expected[0][key][sub] == value
+        else:
+            assert decoded[0].get(key) == expected[0].get(key)
+    assert scraper.parse_topic(decoded[0]) == scraper.parse_topic(expected[0])
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_parse_topic_treats_null_like_missing(case):
+    topic = json.loads(make_payload(*CASES[case]))[0]
+    parsed = scraper.parse_topic(topic)
+    assert isinstance(parsed["author"], str) and parsed["author"]
+    assert isinstance(parsed["replies"], int)
+    assert isinstance(parsed["created"], int)
+    assert isinstance(parsed["content"], str)
+    assert isinstance(parsed["node"], str)
+
+
+@pytest.mark.parametrize("backend", ["stdlib", "orjson", "msgspec"])
+def test_replies_with_null_member(monkeypatch, backend):
+    payload = b'[{"content": "hi", "created": 1, "member": null}, {"content": null}, {}]'
+    replies = load_backend(monkeypatch, backend).decode_replies(payload)
+    assert replies[0]["member"] is None
+    assert replies[1]["content"] is None
+    assert "content" not in replies[2]
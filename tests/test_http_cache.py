@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import zlib
+
+import pytest
+import requests
+
+import http_cache
+from http_cache import HTTPCache
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+
+class FakeSession:
+    """按顺序返回预设响应，记录每次请求的头"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, headers or {}))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(http_cache.time, "time", lambda: now[0])
+    return now
+
+
+def body(value) -> bytes:
+    return json.dumps(value).encode("utf-8")
+
+
+def cache_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def test_fresh_entry_is_served_without_request(tmp_path, clock):
+    cache = HTTPCache(str(tmp_path))
+    session = FakeSession(FakeResponse(body=body([1])))
+    assert cache.get_json(session, "https://x/a", ttl=60) == [1]
+    clock[0] += 30
+    assert cache.get_json(session, "https://x/a", ttl=60) == [1]
+    assert len(session.requests) == 1
+
+
+def test_expired_entry_is_revalidated_with_validators(tmp_path, clock):
+    cache = HTTPCache(str(tmp_path))
+    headers = {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2026 00:00:00 GMT"}
+    session = FakeSession(FakeResponse(body=body([1]), headers=headers),
+                          FakeResponse(status_code=304))
+    cache.get_json(session, "https://x/a", ttl=60)
+    clock[0] += 120
+    assert cache.get_json(session, "https://x/a", ttl=60) == [1]
+    sent = session.requests[1][1]
+    assert sent["If-None-Match"] == '"v1"'
+    assert sent["If-Modified-Since"] == headers["Last-Modified"]
+
+    # 304 刷新了存储时间，TTL 内不再请求
+    clock[0] += 30
+    assert cache.get_json(session, "https://x/a", ttl=60) == [1]
+    assert len(session.requests) == 2
+
+
+def test_changed_response_replaces_entry(tmp_path, clock):
+    cache = HTTPCache(str(tmp_path))
+    session = FakeSession(FakeResponse(body=body([1]), headers={"ETag": '"v1"'}),
+                          FakeResponse(body=body([2]), headers={"ETag": '"v2"'}))
+    cache.get_json(session, "https://x/a", ttl=60)
+    clock[0] += 120
+    assert cache.get_json(session, "https://x/a", ttl=60) == [2]
+    assert HTTPCache(str(tmp_path))._entry(cache_key("https://x/a"))["etag"] == '"v2"'
+
+
+def test_stale_entry_served_when_request_fails(tmp_path, clock):
+    cache = HTTPCache(str(tmp_path))
+    session = FakeSession(FakeResponse(body=body([1])), requests.ConnectionError("down"))
+    cache.get_json(session, "https://x/a", ttl=60)
+    clock[0] += 120
+    assert cache.get_json(session, "https://x/a", ttl=60) == [1]
+
+
+def test_eviction_drops_least_recently_used(tmp_path, clock):
+    payload = os.urandom(4000)
+    size = len(zlib.compress(payload, 6))
+    cache = HTTPCache(str(tmp_path), max_bytes=size * 2)
+    for url in ("https://x/a", "https://x/b"):
+        clock[0] += 1
+        cache.get_json(FakeSession(FakeResponse(body=payload)), url, ttl=600, decode=bytes)
+
+    # 命中 a 后 b 成为最久未访问的条目；访问时间写入索引，换一个实例也能看到
+    clock[0] += 1
+    cache.get_json(FakeSession(), "https://x/a", ttl=600, decode=bytes)
+    other = HTTPCache(str(tmp_path), max_bytes=size * 2)
+    clock[0] += 1
+    other.get_json(FakeSession(FakeResponse(body=payload)), "https://x/c", ttl=600, decode=bytes)
+
+    assert other._entry(cache_key("https://x/b")) is None
+    assert not os.path.exists(other._body_path(cache_key("https://x/b")))
+    assert other._entry(cache_key("https://x/a")) is not None
+    assert other._entry(cache_key("https://x/c")) is not None
+
+
+def test_instances_sharing_a_directory_keep_each_others_entries(tmp_path, clock):
+    first = HTTPCache(str(tmp_path))
+    second = HTTPCache(str(tmp_path))
+    first.get_json(FakeSession(FakeResponse(body=body("a"))), "https://x/a", ttl=60)
+    second.get_json(FakeSession(FakeResponse(body=body("b"))), "https://x/b", ttl=60)
+    first.get_json(FakeSession(FakeResponse(body=body("c"))), "https://x/c", ttl=60)
+
+    reopened = HTTPCache(str(tmp_path))
+    for url, value in (("https://x/a", "a"), ("https://x/b", "b"), ("https://x/c", "c")):
+        assert reopened.get_json(FakeSession(), url, ttl=60) == value
+
+
+def test_legacy_json_index_is_imported(tmp_path, clock):
+    key = cache_key("https://x/a")
+    compressed = zlib.compress(body([1]), 6)
+    (tmp_path / f"{key}.z").write_bytes(compressed)
+    (tmp_path / "index.json").write_text(json.dumps({key: {
+        "url": "https://x/a", "etag": None, "last_modified": None, "stored_at": clock[0],
+        "last_access": clock[0], "ttl": 60, "size": len(compressed),
+    }}))
+    cache = HTTPCache(str(tmp_path))
+    assert not (tmp_path / "index.json").exists()
+    assert cache.get_json(FakeSession(), "https://x/a", ttl=60) == [1]
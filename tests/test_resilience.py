@@ -0,0 +1,150 @@
+import time
+
+import pytest
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, call_with_retry
+
+
+class FlakyTimeout(Exception):
+    """可重试的错误（按类名中的 Timeout 判断）"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_run_deadline", None)
+    monkeypatch.setattr(resilience.time, "sleep", lambda _: None)
+
+
+def open_breaker(name: str) -> CircuitBreaker:
+    breaker = resilience.get_breaker(name)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.is_open
+    return breaker
+
+
+def expire(breaker: CircuitBreaker):
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def fail(_timeout):
+    raise FlakyTimeout("boom")
+
+
+def test_opens_after_threshold_and_rejects():
+    with pytest.raises(FlakyTimeout):
+        call_with_retry(fail, "b", max_attempts=3)
+    assert resilience.get_breaker("b").is_open
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(lambda t: "ok", "b")
+
+
+def test_half_open_probe_success_closes():
+    breaker = open_breaker("b")
+    expire(breaker)
+    assert call_with_retry(lambda t: "ok", "b") == "ok"
+    assert not breaker.is_open and not breaker.probing and breaker.failures == 0
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = open_breaker("b")
+    expire(breaker)
+    with pytest.raises(FlakyTimeout):
+        call_with_retry(fail, "b", max_attempts=1)
+    assert breaker.is_open and not breaker.probing
+
+
+def test_only_one_probe_at_a_time():
+    breaker = open_breaker("b")
+    expire(breaker)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_deadline_does_not_leak_probe():
+    breaker = open_breaker("b")
+    expire(breaker)
+    with pytest.raises(DeadlineExceeded):
+        call_with_retry(lambda t: "ok", "b", deadline=time.monotonic() - 1)
+    assert not breaker.probing
+    assert call_with_retry(lambda t: "ok", "b") == "ok"
+
+
+def test_non_retryable_error_does_not_close_open_breaker():
+    breaker = open_breaker("b")
+    expire(breaker)
+
+    def bad_request(_timeout):
+        raise ValueError("bad params")
+
+    with pytest.raises(ValueError):
+        call_with_retry(bad_request, "b")
+    # 试探名额已释放，但熔断器没有被当作成功而关闭
+    assert not breaker.probing and breaker.opened_at is not None
+    assert breaker.failures == breaker.failure_threshold
+
+
+def test_non_retryable_error_is_not_retried():
+    calls = []
+
+    def bad_request(_timeout):
+        calls.append(1)
+        raise ValueError("bad params")
+
+    with pytest.raises(ValueError):
+        call_with_retry(bad_request, "b", max_attempts=3)
+    assert len(calls) == 1
+
+
+def test_retry_then_success_resets_failures():
+    attempts = []
+
+    def flaky(_timeout):
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise FlakyTimeout("once")
+        return "ok"
+
+    assert call_with_retry(flaky, "b", max_attempts=3) == "ok"
+    assert resilience.get_breaker("b").failures == 0
+
+
+def test_retryable_classification():
+    assert resilience.is_retryable(TimeoutError())
+    assert resilience.is_retryable(ConnectionError())
+    assert not resilience.is_retryable(ValueError())
+
+    class HTTPError(Exception):
+        def __init__(self, status):
+            self.status_code = status
+
+    assert resilience.is_retryable(HTTPError(503))
+    assert resilience.is_retryable(HTTPError(429))
+    assert not resilience.is_retryable(HTTPError(404))
+
+
+def test_local_io_errors_are_not_retryable():
+    import errno
+    import socket
+
+    import requests
+
+    assert not resilience.is_retryable(OSError(errno.ENOSPC, "No space left on device"))
+    assert not resilience.is_retryable(PermissionError(errno.EACCES, "Permission denied"))
+    assert not resilience.is_retryable(FileNotFoundError())
+    assert resilience.is_retryable(socket.gaierror(-3, "Temporary failure in name resolution"))
+    assert resilience.is_retryable(requests.ConnectionError("reset"))
+    assert resilience.is_retryable(requests.exceptions.ChunkedEncodingError("truncated"))
+    assert not resilience.is_retryable(requests.exceptions.InvalidURL("bad url"))
+
+
+def test_disk_full_does_not_open_breaker():
+    def write_cache(_timeout):
+        raise OSError(28, "No space left on device")
+
+    for _ in range(resilience.FAILURE_THRESHOLD + 1):
+        with pytest.raises(OSError):
+            call_with_retry(write_cache, "v2ex", max_attempts=3)
+    assert not resilience.get_breaker("v2ex").is_open
@@ -0,0 +1,59 @@
+import re
+import time
+
+import main
+import rss_generator
+import scraper
+import stats
+import summarizer
+from rss_generator import generate_rss, select_items
+
+
+def make_data(nodes: int = 4, topics: int = 12):
+    """节点内按回复数排列，发布时间打乱，热门在前"""
+    now = int(time.time())
+    all_data = {}
+    for n, name in enumerate(["_hot"] + [f"node{i}" for i in range(nodes)]):
+        all_data[name] = {"config": {"name": name, "title": name, "emoji": "📌"}, "topics": [
+            {"id": 100 * n + i, "title": f"{name} 帖子 {i}", "url": f"https://www.v2ex.com/t/{100 * n + i}",
+             "replies": topics - i, "created": now - ((n * 7 + i * 5) % 23) * 3600, "author": "a",
+             "summary": f"摘要 {name} {i}"}
+            for i in range(topics)
+        ]}
+    return all_data
+
+
+def feed_items(path: str):
+    with open(path, encoding="utf-8") as f:
+        return re.findall(r"<item>.*?</item>", f.read(), re.S)
+
+
+def test_select_items_caps_in_node_order_then_sorts_newest_first():
+    topics = [{"id": i, "created": c} for i, c in enumerate([10, 30, 20, 50])]
+    selected = select_items(topics, max_items=3)
+    assert [t["id"] for t in selected] == [1, 2, 0]
+
+
+def test_select_items_window_filters_before_capping():
+    now = int(time.time())
+    topics = [{"id": 0, "created": now - 10 * 3600}, {"id": 1, "created": now - 3600},
+              {"id": 2, "created": now - 7200}]
+    assert [t["id"] for t in select_items(topics, max_items=1, window_hours=5)] == [1]
+
+
+def test_streaming_feed_matches_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "iter_nodes", lambda: iter(make_data().items()))
+    monkeypatch.setattr(summarizer, "get_client", lambda: None)
+    monkeypatch.setattr(summarizer, "summarize_node", lambda name, data: data["topics"])
+    store_path = str(tmp_path / "state" / "stats.json")
+    monkeypatch.setattr(stats, "StatsStore", lambda cls=stats.StatsStore: cls(store_path))
+    monkeypatch.setattr(main, "DEFAULT_RENDER_DIR", str(tmp_path / "streaming"))
+
+    assert main.run_digest_streaming("a@example.com", dry_run=True)
+    batch_path = str(tmp_path / "batch.xml")
+    assert generate_rss(make_data(), batch_path)
+
+    streaming = feed_items(str(tmp_path / "streaming" / "v2ex-digest.xml"))
+    batch = feed_items(batch_path)
+    assert len(batch) == rss_generator.DEFAULT_MAX_ITEMS
+    assert streaming == batch
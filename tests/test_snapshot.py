@@ -0,0 +1,17 @@
+from snapshot import load_snapshot, save_snapshot
+
+
+def test_missing_created_falls_back_to_snapshot_time(tmp_path):
+    path = str(tmp_path / "snap.json.gz")
+    all_data = {"n": {"config": {"name": "n"}, "topics": [
+        {"id": 1, "title": "old", "url": "u"},
+        {"id": 2, "title": "new", "url": "u", "created": 1700000000},
+    ]}}
+    save_snapshot(path, all_data, rising=[all_data["n"]["topics"][1]])
+
+    first, _, rising = load_snapshot(path)
+    second, _, _ = load_snapshot(path)
+    old, new = first["n"]["topics"]
+    assert old["created"] > 0 and old["created"] == second["n"]["topics"][0]["created"]
+    assert new["created"] == 1700000000
+    assert rising == [new]
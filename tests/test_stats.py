@@ -0,0 +1,61 @@
+import json
+import time
+
+from stats import StatsStore
+
+
+def topic(topic_id, replies, node="programmer", author="alice", hours_ago=1):
+    return {"id": topic_id, "replies": replies, "node": node, "author": author,
+            "created": int(time.time() - hours_ago * 3600)}
+
+
+def data(*topics):
+    return {"programmer": {"config": {}, "topics": list(topics)}}
+
+
+def test_new_topics_counted_once(tmp_path):
+    store = StatsStore(str(tmp_path / "stats.json"))
+    assert store.update(data(topic(1, 0), topic(2, 4))) == 2
+    assert store.update(data(topic(1, 0), topic(2, 4))) == 0
+    stats = store.node_stats("programmer")
+    assert stats["topics"] == 2
+    assert store.top_authors() == [("alice", 2)]
+
+
+def test_reply_counts_follow_later_runs(tmp_path):
+    path = str(tmp_path / "stats.json")
+    store = StatsStore(path)
+    store.update(data(topic(1, 0), topic(2, 0), topic(3, 0)))
+    assert store.node_stats("programmer")["median_replies"] == 0
+    store.save()
+
+    store = StatsStore(path)
+    store.update(data(topic(1, 10), topic(2, 20), topic(3, 30)))
+    stats = store.node_stats("programmer")
+    assert stats["median_replies"] == 20
+    assert stats["topics"] == 3
+
+
+def test_old_topics_outside_retention_ignored(tmp_path):
+    store = StatsStore(str(tmp_path / "stats.json"))
+    assert store.update(data(topic(1, 5, hours_ago=24 * 200))) == 0
+    assert store.days == {}
+
+
+def test_loads_legacy_format(tmp_path):
+    path = tmp_path / "stats.json"
+    store = StatsStore(str(path))
+    store.update(data(topic(1, 0)))
+    day = next(iter(store.days))
+    path.write_text(json.dumps({
+        "days": {day: {"nodes": {"programmer": {"count": 2, "replies": [3, 5]}}, "authors": {"bob": 2}}},
+        "seen": {"1": day, "2": day},
+    }))
+
+    store = StatsStore(str(path))
+    assert store.update(data(topic(1, 50), topic(9, 7))) == 1
+    stats = store.node_stats("programmer")
+    assert stats["topics"] == 3
+    assert stats["median_replies"] == 5
+    store.save()
+    assert StatsStore(str(path)).node_stats("programmer") == stats
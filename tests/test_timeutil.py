@@ -0,0 +1,59 @@
+import importlib
+from datetime import timedelta
+
+import pytest
+
+import timeutil
+
+# 2026-01-01 00:30:00 UTC
+TS = 1767227400
+
+
+@pytest.fixture
+def load_tz(monkeypatch):
+    """按 DIGEST_TZ 重新加载 timeutil，结束后恢复默认时区"""
+    def load(name):
+        monkeypatch.setenv("DIGEST_TZ", name)
+        return importlib.reload(timeutil)
+    yield load
+    monkeypatch.delenv("DIGEST_TZ", raising=False)
+    importlib.reload(timeutil)
+
+
+def test_default_display_timezone_is_shanghai(load_tz, monkeypatch):
+    monkeypatch.delenv("DIGEST_TZ", raising=False)
+    module = importlib.reload(timeutil)
+    assert module.format_created({"created": TS}) == "2026-01-01 08:30"
+
+
+def test_display_timezone_from_env(load_tz):
+    module = load_tz("UTC")
+    assert module.format_created({"created": TS}) == "2026-01-01 00:30"
+    assert module.topic_datetime({"created": TS}).utcoffset() == timedelta(0)
+
+
+def test_unknown_timezone_falls_back_to_utc8(load_tz):
+    module = load_tz("Not/AZone")
+    assert module.TZ.utcoffset(None) == timedelta(hours=8)
+    assert module.format_created({"created": TS}) == "2026-01-01 08:30"
+
+
+def test_legacy_string_created_is_parsed_in_display_timezone(load_tz):
+    module = load_tz("Asia/Shanghai")
+    assert module.created_ts({"created": "2026-01-01 08:30"}) == TS
+    module = load_tz("UTC")
+    assert module.created_ts({"created": "2026-01-01 00:30"}) == TS
+
+
+@pytest.mark.parametrize("created", [None, 0, "", "not a date"])
+def test_missing_or_invalid_created(created):
+    assert timeutil.created_ts({"created": created}) == 0
+    assert timeutil.format_created({"created": created}) == ""
+
+
+def test_dst_offset_follows_timestamp(load_tz):
+    module = load_tz("America/New_York")
+    winter = module.to_datetime(1767227400)  # 2026-01-01
+    summer = module.to_datetime(1782864000)  # 2026-07-01
+    assert winter.utcoffset() == timedelta(hours=-5)
+    assert summer.utcoffset() == timedelta(hours=-4)
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+import trending
+from trending import RETENTION_SECONDS, compact, compute_trends, record_snapshot, update_trending
+
+NOW = 1_800_000_000
+HOUR = 3600
+
+
+def snapshot(path, replies_by_id, ts):
+    all_data = {"node": {"topics": [{"id": i, "replies": r} for i, r in replies_by_id.items()]}}
+    record_snapshot(all_data, path, ts)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "trending.bin")
+
+
+def test_velocity_and_acceleration_from_last_three_snapshots(path):
+    # 第 1 小时 +2，第 2 小时 +6：速度 6/小时，加速度 (6 - 2) / 1 小时
+    for offset, replies in ((-3 * HOUR, 0), (-2 * HOUR, 10), (-HOUR, 12), (0, 18)):
+        snapshot(path, {1: replies}, NOW + offset)
+    trend = compute_trends([1], path, NOW)[1]
+    assert trend["points"] == 3
+    assert trend["velocity"] == pytest.approx(6)
+    assert trend["acceleration"] == pytest.approx(4)
+
+
+def test_snapshots_outside_retention_are_ignored(path):
+    snapshot(path, {1: 0}, NOW - RETENTION_SECONDS - HOUR)
+    snapshot(path, {1: 50, 2: 1}, NOW - HOUR)
+    snapshot(path, {1: 53}, NOW)
+    trends = compute_trends([1, 2], path, NOW)
+    assert trends[1]["points"] == 2
+    assert trends[1]["velocity"] == pytest.approx(3)
+    assert trends[2]["points"] == 1
+
+
+def test_first_at_or_after_finds_window_start(path):
+    for hour in range(10):
+        snapshot(path, {1: hour, 2: hour}, NOW + hour * HOUR)
+    with open(path, "rb") as f:
+        count = trending._record_count(f)
+        assert count == 20
+        assert trending._first_at_or_after(f, count, NOW) == 0
+        assert trending._first_at_or_after(f, count, NOW + 4 * HOUR) == 8
+        assert trending._first_at_or_after(f, count, NOW + 4 * HOUR + 1) == 10
+        assert trending._first_at_or_after(f, count, NOW + 100 * HOUR) == 20
+
+
+def test_partial_record_is_ignored(path):
+    snapshot(path, {1: 1}, NOW - HOUR)
+    snapshot(path, {1: 4}, NOW)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert compute_trends([1], path, NOW)[1]["velocity"] == pytest.approx(3)
+    # 之后追加的记录不会错位
+    snapshot(path, {1: 10}, NOW + HOUR)
+    assert compute_trends([1], path, NOW + HOUR)[1]["velocity"] == pytest.approx(6)
+
+
+def test_compact_keeps_file_when_under_half_expired(path):
+    snapshot(path, {1: 0}, NOW - RETENTION_SECONDS - HOUR)
+    snapshot(path, {1: 1, 2: 1}, NOW)
+    compact(path, NOW)
+    assert os.path.getsize(path) == 3 * trending._RECORD.size
+
+
+def test_compact_drops_expired_records(path):
+    snapshot(path, {3: 0, 4: 0, 5: 0}, NOW - RETENTION_SECONDS - HOUR)
+    snapshot(path, {1: 1, 2: 1}, NOW)
+    compact(path, NOW)
+    assert os.path.getsize(path) == 2 * trending._RECORD.size
+    assert set(compute_trends([1, 2, 3], path, NOW)) == {1, 2}
+
+
+def test_update_trending_estimates_new_topics_from_age(path, monkeypatch):
+    monkeypatch.setattr(trending.time, "time", lambda: NOW)
+    all_data = {"node": {"topics": [
+        {"id": 1, "replies": 20, "created": NOW - 10 * HOUR},
+        {"id": 2, "replies": 0, "created": NOW - HOUR},
+    ]}}
+    rising = update_trending(all_data, path)
+    assert [t["id"] for t in rising] == [1]
+    assert rising[0]["velocity"] == pytest.approx(2)
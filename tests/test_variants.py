@@ -0,0 +1,48 @@
+import pytest
+
+from variants import DEFAULT_VARIANT, get_variants, select_variant
+
+
+@pytest.mark.parametrize("env, expected", [
+    (None, ["zh"]),
+    ("en", ["en"]),
+    ("zh, en ,tldr", ["zh", "en", "tldr"]),
+    ("en,en,zh", ["en", "zh"]),
+    ("fr,en", ["en"]),
+    ("fr", [DEFAULT_VARIANT]),
+    (",", [DEFAULT_VARIANT]),
+])
+def test_get_variants(monkeypatch, env, expected):
+    if env is None:
+        monkeypatch.delenv("DIGEST_SUMMARY_VARIANTS", raising=False)
+    else:
+        monkeypatch.setenv("DIGEST_SUMMARY_VARIANTS", env)
+    assert get_variants() == expected
+
+
+def make_data():
+    return {"python": {"config": {"name": "python"}, "topics": [
+        {"id": 1, "summary": "中文摘要", "comments_summary": "中文评论", "featured_comments": [{"content": "好"}],
+         "variants": {"en": {"summary": "English", "comments_summary": "Comments"}}},
+        {"id": 2, "summary": "没有英文结果"},
+    ]}}
+
+
+def test_select_variant_swaps_summary_fields_without_mutating():
+    all_data = make_data()
+    selected = select_variant(all_data, "en")
+    first, second = selected["python"]["topics"]
+    assert first["summary"] == "English"
+    assert first["comments_summary"] == "Comments"
+    # 变体结果缺少的字段置空，不沿用主变体的内容
+    assert first["featured_comments"] == []
+    # 没有该变体结果的帖子保持主变体摘要
+    assert second["summary"] == "没有英文结果"
+    assert selected["python"]["config"] == {"name": "python"}
+    assert all_data["python"]["topics"][0]["summary"] == "中文摘要"
+
+
+@pytest.mark.parametrize("variant", [None, ""])
+def test_select_primary_variant_returns_data_unchanged(variant):
+    all_data = make_data()
+    assert select_variant(all_data, variant) is all_data
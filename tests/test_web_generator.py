@@ -0,0 +1,135 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import artifacts
+from web_generator import ARCHIVE_HTML, KEYWORD_SHARDS, generate_archive, keyword_shard, tokenize
+
+TITLES = ["Python 3.12 的 GIL 移除计划", "C++ 和 C# 怎么选？", "家用 NAS 推荐"]
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.delenv("DIGEST_ARCHIVE_URL", raising=False)
+    artifacts.reset()
+    yield
+    artifacts.reset()
+
+
+def make_data(ids, node="python"):
+    return {node: {"config": {"name": node, "title": node.title(), "emoji": "🐍"}, "topics": [
+        {"id": i, "title": f"{TITLES[i % len(TITLES)]} {i}", "url": f"https://www.v2ex.com/t/{i}",
+         "summary": "摘要", "content": "不归档的正文"}
+        for i in ids
+    ]}}
+
+
+def read(tmp_path, rel_path):
+    return json.loads((tmp_path / "archive" / rel_path).read_text(encoding="utf-8"))
+
+
+def test_tokenize_ascii_words_and_cjk_bigrams():
+    assert tokenize("Python 3.12 的 GIL 移除计划，C++ 和 C# 怎么看？") == [
+        "3.12", "c#", "c++", "gil", "python", "么看", "怎么", "移除", "计划", "除计"]
+    assert tokenize("a 的") == []
+
+
+def test_keyword_shard_is_fnv1a_mod_shards():
+    # FNV-1a("a") = 0xe40c292c
+    assert keyword_shard("a") == f"{0xe40c292c % KEYWORD_SHARDS:02d}"
+    shards = {keyword_shard(token) for title in TITLES for token in tokenize(title)}
+    assert all(len(s) == 2 and 0 <= int(s) < KEYWORD_SHARDS for s in shards)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_client_tokenizer_and_shards_match_python():
+    script = ARCHIVE_HTML[ARCHIVE_HTML.index("function tokenize"):ARCHIVE_HTML.index("function topicHtml")]
+    script += "for (const t of %s) console.log(JSON.stringify([tokenize(t).sort(), tokenize(t).sort().map(shardOf)]));" \
+        % json.dumps(TITLES, ensure_ascii=False)
+    output = subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout
+    for title, line in zip(TITLES, output.splitlines()):
+        tokens, shards = json.loads(line)
+        assert tokens == tokenize(title)
+        assert shards == [keyword_shard(t) for t in tokens]
+
+
+def test_archive_writes_day_and_indexes(tmp_path):
+    assert generate_archive(make_data([1, 2]), str(tmp_path), "概览", day="2026-01-02")
+
+    digest = read(tmp_path, "days/2026-01-02.json")
+    topic = digest["nodes"]["python"]["topics"][0]
+    assert "content" not in topic and topic["summary"] == "摘要"
+    assert read(tmp_path, "index/months.json") == [{"month": "2026-01", "days": 1}]
+    assert read(tmp_path, "index/nodes.json")["python"]["months"] == ["2026-01"]
+    token = tokenize(TITLES[1])[0]
+    assert read(tmp_path, f"index/kw/{keyword_shard(token)}.json")[token] == [["2026-01-02", 1]]
+
+
+def test_second_day_merges_and_dedupes(tmp_path):
+    generate_archive(make_data([1, 2]), str(tmp_path), day="2026-01-02")
+    generate_archive(make_data([2, 3]), str(tmp_path), day="2026-01-03")
+
+    assert [d["date"] for d in read(tmp_path, "index/date/2026-01.json")] == ["2026-01-03", "2026-01-02"]
+    # 再次出现的帖子只保留最新日期
+    entries = read(tmp_path, "index/node/python/2026-01.json")
+    assert [(e[0], e[1]) for e in entries] == [("2026-01-03", 3), ("2026-01-03", 2), ("2026-01-02", 1)]
+    token = tokenize(TITLES[2])[0]
+    assert [e[1] for e in read(tmp_path, f"index/kw/{keyword_shard(token)}.json")[token]] == [2]
+
+
+def test_rerun_with_same_data_changes_nothing(tmp_path, capsys):
+    generate_archive(make_data([1, 2]), str(tmp_path), day="2026-01-02")
+    artifacts.save_manifest(str(tmp_path))
+    artifacts.reset()
+    generate_archive(make_data([1, 2]), str(tmp_path), day="2026-01-02")
+    assert "(0/" in capsys.readouterr().out
+    assert not artifacts.save_manifest(str(tmp_path))
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    def __init__(self, published):
+        self.published = published
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        rel_path = url.split("/archive/", 1)[1]
+        if rel_path in self.published:
+            return FakeResponse(200, self.published[rel_path])
+        return FakeResponse(404)
+
+
+def test_missing_shards_are_merged_with_published_copy(tmp_path, monkeypatch):
+    session = FakeSession({"index/months.json": [{"month": "2025-12", "days": 31}]})
+    monkeypatch.setenv("DIGEST_ARCHIVE_URL", "https://example.com/archive/")
+    monkeypatch.setattr("scraper.get_session", lambda: session)
+
+    assert generate_archive(make_data([1]), str(tmp_path), day="2026-01-02")
+    assert [m["month"] for m in read(tmp_path, "index/months.json")] == ["2026-01", "2025-12"]
+    assert "https://example.com/archive/index/months.json" in session.urls
+
+
+def test_failed_shard_download_aborts_without_overwriting(tmp_path, monkeypatch):
+    class BrokenSession(FakeSession):
+        def get(self, url, timeout=None):
+            return FakeResponse(503)
+
+    monkeypatch.setenv("DIGEST_ARCHIVE_URL", "https://example.com/archive")
+    monkeypatch.setattr("scraper.get_session", lambda: BrokenSession({}))
+    assert not generate_archive(make_data([1]), str(tmp_path), day="2026-01-02")
+    assert not (tmp_path / "archive" / "index" / "months.json").exists()
@@ -0,0 +1,155 @@
+import json
+import time
+
+import pytest
+
+import work_queue
+from work_queue import DONE, FAILED, LEASED, PENDING, LeaseHeartbeat, WorkQueue
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue.db")
+
+
+@pytest.fixture
+def queue(queue_path):
+    return WorkQueue(queue_path)
+
+
+def status(queue, task_id):
+    return dict(queue.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone())
+
+
+def test_claim_counts_attempts_and_fail_backs_off(queue):
+    queue.enqueue("r", "fetch", "n1", {})
+    task = queue.claim("w1")
+    assert task["attempts"] == 1 and task["payload"] == {}
+    assert queue.claim("w2") is None
+
+    queue.fail(task, "w1", "boom")
+    row = status(queue, task["id"])
+    assert row["status"] == PENDING and row["available_at"] > time.time()
+    # 退避期间不能领取
+    assert queue.claim("w1") is None
+
+
+def test_fail_marks_failed_after_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(work_queue, "RETRY_BACKOFF", 0)
+    queue.enqueue("r", "fetch", "n1", {})
+    for attempt in range(1, work_queue.MAX_ATTEMPTS + 1):
+        task = queue.claim("w")
+        assert task["attempts"] == attempt
+        queue.fail(task, "w", "boom")
+    assert status(queue, task["id"])["status"] == FAILED
+    assert queue.claim("w") is None
+    assert queue.results("r", "fetch") == {"n1": None}
+
+
+def test_expired_lease_is_reclaimed_and_stale_complete_rejected(queue):
+    queue.enqueue("r", "fetch", "n1", {})
+    first = queue.claim("w1", lease_seconds=-1)
+    second = queue.claim("w2")
+    assert second["id"] == first["id"] and second["attempts"] == 2
+    assert not queue.complete(first, "w1", [])
+    assert queue.complete(second, "w2", [1])
+    assert queue.results("r", "fetch") == {"n1": [1]}
+
+
+def test_extend_lease_only_for_owner(queue):
+    queue.enqueue("r", "fetch", "n1", {})
+    task = queue.claim("w1", lease_seconds=1)
+    assert queue.extend_lease(task, "w1", lease_seconds=600)
+    assert status(queue, task["id"])["lease_until"] > time.time() + 500
+    assert not queue.extend_lease(task, "w2")
+
+
+def test_heartbeat_keeps_long_task_leased(queue_path, queue):
+    queue.enqueue("r", "fetch", "n1", {})
+    task = queue.claim("w1", lease_seconds=1)
+    with LeaseHeartbeat(queue_path, task, "w1", interval=0.05):
+        time.sleep(0.2)
+        queue.conn.execute("UPDATE tasks SET lease_until = ? WHERE id = ?", (time.time() - 1, task["id"]))
+        time.sleep(0.2)
+        assert queue.claim("w2") is None
+    assert status(queue, task["id"])["status"] == LEASED
+
+
+def test_release_does_not_count_attempt(queue):
+    queue.enqueue("r", "summarize", "n1", {})
+    task = queue.claim("w1")
+    queue.release(task, "w1")
+    row = status(queue, task["id"])
+    assert row["status"] == PENDING and row["attempts"] == 0
+
+
+def test_claim_filters_kinds(queue):
+    queue.enqueue("r", "summarize", "n1", {})
+    queue.enqueue("r", "fetch", "n2", {})
+    task = queue.claim("w", kinds=("fetch",))
+    assert task["kind"] == "fetch"
+    assert queue.claim("w", kinds=("fetch",)) is None
+
+
+def test_keyless_worker_only_claims_fetch(monkeypatch):
+    monkeypatch.delenv("AZURE_OPENAI_KEY", raising=False)
+    assert work_queue.claimable_kinds() == ("fetch",)
+    monkeypatch.setenv("AZURE_OPENAI_KEY", "k")
+    assert work_queue.claimable_kinds() == work_queue.TASK_KINDS
+
+
+def test_enqueue_requeues_failed_but_keeps_done(queue, monkeypatch):
+    monkeypatch.setattr(work_queue, "MAX_ATTEMPTS", 1)
+    queue.enqueue("r", "fetch", "failed", {"v": 1})
+    queue.enqueue("r", "fetch", "done", {"v": 1})
+    failed = queue.claim("w")
+    queue.fail(failed, "w", "boom", max_attempts=1)
+    done = queue.claim("w")
+    queue.complete(done, "w", ["kept"])
+
+    queue.enqueue("r", "fetch", "failed", {"v": 2})
+    queue.enqueue("r", "fetch", "done", {"v": 2})
+    row = status(queue, failed["id"])
+    assert row["status"] == PENDING and row["attempts"] == 0 and row["error"] is None
+    assert status(queue, done["id"])["status"] == DONE
+    task = queue.claim("w")
+    assert task["key"] == "failed" and task["payload"] == {"v": 2}
+
+
+def test_summarize_task_without_key_raises_missing_credentials(monkeypatch):
+    monkeypatch.delenv("AZURE_OPENAI_KEY", raising=False)
+    with pytest.raises(work_queue.MissingCredentials):
+        work_queue.execute_task({"kind": "summarize", "payload": {"topics": [{"id": 1}], "tier": "compact"}})
+
+
+def finish(queue, run_id, kind, key, result):
+    """直接把任务写成已完成（模拟上次运行的结果）"""
+    queue.enqueue(run_id, kind, key, {})
+    queue.conn.execute(
+        "UPDATE tasks SET status = ?, result = ? WHERE run_id = ? AND kind = ? AND key = ?",
+        (DONE, json.dumps(result), run_id, kind, key),
+    )
+
+
+def test_coordinate_resume_skips_removed_nodes_and_closes_queue(queue_path, queue, monkeypatch):
+    import config
+    from config import NodePolicy
+
+    topic = {"id": 1, "title": "t", "replies": 1, "created": 0}
+    # 上次运行时配置了 python 和 gone 两个节点
+    for node in ("python", "gone"):
+        finish(queue, "r1", "fetch", node, [{**topic, "id": len(node)}])
+        finish(queue, "r1", "summarize", node, [{**topic, "id": len(node), "summary": "s"}])
+
+    # 续跑时 gone 已从配置中删除
+    policies = [NodePolicy(name="python")]
+    monkeypatch.setattr(config, "get_config",
+                        lambda: type("Config", (), {"all_policies": lambda self: policies})())
+    closed = []
+    original_close = WorkQueue.close
+    monkeypatch.setattr(WorkQueue, "close", lambda self: closed.append(1) or original_close(self))
+
+    all_data = work_queue.coordinate(queue_path, "r1", timeout=5)
+    assert list(all_data) == ["python"]
+    assert all_data["python"]["topics"][0]["summary"] == "s"
+    assert closed == [1]